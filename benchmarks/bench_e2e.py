@@ -0,0 +1,412 @@
+"""
+Offline end-to-end benchmark: runs the real `src.main` pipeline against a
+synthetic trips.json with every external service replaced by a local stand-in.
+
+- Open-Meteo, the WhatsApp Graph API and Telegram are served by a local HTTP
+  server, reached through the shared transport's host overrides.
+- DuckDuckGo, Tavily and Gemini are SDK calls, so they are replaced at their
+  import seam (`search.DDGS`, the `tavily` module, `LLMClient.model`) by fakes
+  that sleep and fail the same way.
+
+Every stand-in has configurable latency, error rate and 429 rate. Each scale
+runs in a fresh interpreter (clean caches, scheduler and peak RSS), and the
+report can be written as JSON for diffing between versions. The run's date is
+pinned to BENCH_DATE (a Monday, so weekly planning trips are active too) so
+results don't depend on the day they were taken.
+
+    python -m benchmarks.bench_e2e --trips 1,10,100 --output bench.json
+    python -m benchmarks.bench_e2e --trips 500 --latency gemini=300,search=150 --rate-limit gemini=0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+BENCH_DATE = date(2026, 2, 16) # A Monday
+
+SERVICES = ["weather", "whatsapp", "telegram", "search", "tavily", "gemini"]
+DEFAULT_LATENCY_MS = {"weather": 40, "whatsapp": 60, "telegram": 40, "search": 120, "tavily": 300, "gemini": 150}
+RESULT_MARKER = "BENCH_RESULT:"
+WORDS = ("powder groomer gondola chairlift couloir summit glacier piste mogul apres fondue chalet "
+         "webcam avalanche snowpark halfpipe kicker freeride backcountry telemark raclette vin chaud "
+         "bluebird whiteout cornice traverse schuss slalom ticket pass village valley ridge bowl").split()
+
+def parse_spec(spec: str, cast=float) -> Dict[str, float]:
+    """Parse "gemini=300,search=0.1"; a bare number applies to every service."""
+    values = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep:
+            values.update({service: cast(name) for service in SERVICES})
+        else:
+            values[name.strip()] = cast(value)
+    return values
+
+class Faults:
+    """Latency and failure injection shared by all stand-ins, plus call counters."""
+    def __init__(self, latency_ms: Dict[str, float], error_rate: Dict[str, float],
+                 rate_limit: Dict[str, float], seed: int = 0):
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **latency_ms}
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, Dict[str, int]] = {}
+
+    def hit(self, service: str) -> str:
+        """Sleep for the service's latency and return "ok", "error" or "429"."""
+        with self._lock:
+            roll = self._rng.random()
+            outcome = "ok"
+            if roll < self.rate_limit.get(service, 0):
+                outcome = "429"
+            elif roll < self.rate_limit.get(service, 0) + self.error_rate.get(service, 0):
+                outcome = "error"
+            counts = self.calls.setdefault(service, {"total": 0, "ok": 0, "error": 0, "429": 0})
+            counts["total"] += 1
+            counts[outcome] += 1
+        time.sleep(self.latency_ms.get(service, 0) / 1000)
+        return outcome
+
+def _text(seed: str, words: int = 30) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+# --- HTTP stand-ins -------------------------------------------------------
+
+def _location(lat: float, lon: float, params: Dict[str, List[str]]) -> Dict:
+    rng = random.Random(f"{lat},{lon}")
+    location = {"latitude": lat, "longitude": lon}
+    if "current" in params:
+        location["current"] = {name: round(rng.uniform(-15, 150), 1) for name in params["current"][0].split(",")}
+    today = BENCH_DATE
+    if "daily" in params:
+        location["daily"] = {name: [round(rng.uniform(0, 30), 1) for _ in range(7)]
+                             for name in params["daily"][0].split(",")}
+        location["daily"]["time"] = [str(today + timedelta(days=d)) for d in range(7)]
+    if "hourly" in params:
+        location["hourly"] = {name: [round(rng.uniform(-10, 80), 1) for _ in range(7 * 24)]
+                              for name in params["hourly"][0].split(",")}
+        location["hourly"]["time"] = [f"{today + timedelta(days=h // 24)}T{h % 24:02d}:00" for h in range(7 * 24)]
+    return location
+
+def make_handler(faults: Faults):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, payload, headers: Dict[str, str] = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _fault(self, service: str) -> bool:
+            outcome = faults.hit(service)
+            if outcome == "429":
+                self._reply(429, {"error": "rate limited"}, {"Retry-After": "0"})
+            elif outcome == "error":
+                self._reply(503, {"error": "unavailable"})
+            return outcome != "ok"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if not parts.path.startswith("/weather/"):
+                return self._reply(404, {})
+            if self._fault("weather"):
+                return
+            params = parse_qs(parts.query)
+            lats = [float(x) for x in params["latitude"][0].split(",")]
+            lons = [float(x) for x in params["longitude"][0].split(",")]
+            locations = [_location(lat, lon, params) for lat, lon in zip(lats, lons)]
+            self._reply(200, locations[0] if len(locations) == 1 else locations)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            if self.path.startswith("/whatsapp/"):
+                if not self._fault("whatsapp"):
+                    self._reply(200, {"messages": [{"id": f"wamid.{time.time_ns()}"}]})
+            elif self.path.startswith("/telegram/"):
+                if not self._fault("telegram"):
+                    self._reply(200, {"ok": True, "result": {"message_id": time.time_ns() % 10**9}})
+            else:
+                self._reply(404, {})
+    return StubHandler
+
+# --- SDK stand-ins --------------------------------------------------------
+
+def install_sdk_fakes(faults: Faults):
+    import src.integrations.search as search
+    import src.integrations.llm as llm
+    from google.api_core import exceptions
+
+    class FakeDDGS:
+        def _results(self, query, max_results):
+            outcome = faults.hit("search")
+            if outcome == "429":
+                raise Exception("https://duckduckgo.com 202 Ratelimit")
+            if outcome == "error":
+                raise Exception("DDG request failed")
+            return [(f"https://example.com/{zlib.crc32(query.encode())}/{n}", _text(f"{query}/{n}"))
+                    for n in range(max_results)]
+
+        def text(self, query, max_results=3, timelimit=None):
+            return [{"title": f"{query} #{n}", "href": url, "body": body}
+                    for n, (url, body) in enumerate(self._results(query, max_results))]
+
+        def videos(self, query, max_results=3, timelimit=None):
+            return [{"title": f"{query} video #{n}", "content": url.replace("example.com", "video.example.com"),
+                     "description": body} for n, (url, body) in enumerate(self._results(query, max_results))]
+
+    class FakeTavilyClient:
+        def __init__(self, api_key=None):
+            pass
+
+        def search(self, query, search_depth="basic", max_results=3):
+            if faults.hit("tavily") != "ok":
+                raise Exception("Tavily request failed")
+            return {"results": [{"title": f"{query} (tavily) #{n}", "content": _text(f"tavily/{query}/{n}"),
+                                 "url": f"https://tavily.example.com/{zlib.crc32(query.encode())}/{n}"}
+                                for n in range(max_results)]}
+
+    class FakeResponse:
+        def __init__(self, text, prompt):
+            self.text = text
+            self.chunks = [text[i:i + 40] for i in range(0, len(text), 40)]
+            self.usage_metadata = types.SimpleNamespace(
+                prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4,
+                total_token_count=(len(prompt) + len(text)) // 4)
+
+        def __iter__(self): # stream=True
+            return iter(types.SimpleNamespace(text=chunk) for chunk in self.chunks)
+
+    class FakeModel:
+        def generate_content(self, prompt, **kwargs):
+            outcome = faults.hit("gemini")
+            if outcome == "429":
+                raise exceptions.ResourceExhausted("Quota exceeded. Please retry in 0.05s.")
+            if outcome == "error":
+                raise exceptions.ServiceUnavailable("The model is overloaded.")
+            if "Discovery Brain" in prompt:
+                enough = random.Random(prompt).random() < 0.5
+                return FakeResponse("ENOUGH" if enough else '["webcam live", "apres ski menu"]', prompt)
+            if "APPROVED" in prompt:
+                return FakeResponse("APPROVED", prompt)
+            urls = [w.strip("()") for w in prompt.split() if w.startswith("(http")]
+            link = f"\nMore: {urls[0]}" if urls else ""
+            message = (f"*Snow report* ❄️\nSummit 180cm, base 95cm, -8°C.{link}\n\n"
+                       f"--- 💡 SKI NERD TRIVIA ---\n{_text(prompt, 14)}\n")
+            return FakeResponse(message, prompt)
+
+    search.DDGS = FakeDDGS
+    sys.modules["tavily"] = types.SimpleNamespace(TavilyClient=FakeTavilyClient)
+    llm.LLMClient.model = lambda self, model_name=None: FakeModel()
+
+# --- Synthetic trips --------------------------------------------------------
+
+def trip_for_phase(phase_value: str, index: int, today: date) -> Dict:
+    d = lambda days: (today + timedelta(days=days)).isoformat()
+    offsets = {
+        "wait": (120, 121, 126, 127),
+        "planning_weekly": (30, 31, 36, 37),
+        "hype_daily": (5, 6, 11, 12),
+        "logistics_out": (1, 2, 7, 8),
+        "active": (-2, -1, 3, 4),
+        "logistics_back": (-6, -5, -1, 1),
+        "travel": (0, 1, 5, 6),
+        "post": (-10, -9, -4, -3),
+    }
+    out, start, end, back = offsets[phase_value]
+    rng = random.Random(index)
+    return {
+        "resort_name": f"Bench Resort {index}",
+        "flight_out_date": d(out), "ski_start_date": d(start), "ski_end_date": d(end), "flight_back_date": d(back),
+        "lat": round(rng.uniform(44, 47.5), 4), "lon": round(rng.uniform(5, 14), 4), "road_check": "check",
+        "summit_elevation": rng.randint(2500, 3600), "base_elevation": rng.randint(1000, 2000),
+        "airport_lat": round(rng.uniform(44, 48), 4), "airport_lon": round(rng.uniform(5, 14), 4),
+    }
+
+# Phases that produce a message come first (the heaviest, with refined search,
+# leading), so even `--trips 1` exercises the whole pipeline; idle ones last.
+PHASE_CYCLE = ["hype_daily", "active", "logistics_out", "logistics_back", "travel", "planning_weekly",
+               "post", "wait"]
+
+def synthetic_trips(count: int, today: date, per_resort: int = 1) -> List[Dict]:
+    """`count` trips cycling through every phase (in PHASE_CYCLE order); with
+    `per_resort` > 1, that many groups travel to each resort on the same dates."""
+    phases = PHASE_CYCLE
+    trips = []
+    for i in range(count):
+        resort = i // per_resort
+        trip = trip_for_phase(phases[resort % len(phases)], resort, today)
+        if per_resort > 1:
+            trip["group"] = f"Group {i % per_resort}"
+        trips.append(trip)
+    return trips
+
+# --- Worker -----------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_worker(config: Dict) -> Dict:
+    faults = Faults(config["latency_ms"], config["error_rate"], config["rate_limit"], config["seed"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(faults))
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    workdir = tempfile.mkdtemp(prefix="brrrnando-bench-")
+    os.chdir(workdir)
+    os.environ.update({
+        "BRRRNANDO_HTTP_OVERRIDES": f"api.open-meteo.com={base}/weather,graph.facebook.com={base}/whatsapp,"
+                                    f"api.telegram.org={base}/telegram",
+        "BRRRNANDO_CACHE": "off",
+        "GEMINI_API_KEY": "bench", "TAVILY_API_KEY": "bench",
+        "GEMINI_RPM": str(config["gemini_rpm"]), "GEMINI_TPM": str(config["gemini_rpm"] * 100000),
+        "WHATSAPP_TOKEN": "bench", "WHATSAPP_PHONE_ID": "1", "RECIPIENT_PHONE": "1",
+        "TELEGRAM_BOT_TOKEN": "bench", "TELEGRAM_CHAT_ID": "1",
+    })
+    if config["concurrency"]:
+        os.environ["BRRRNANDO_STAGE_LIMITS"] = config["concurrency"]
+
+    from src.executor import DagExecutor
+    install_sdk_fakes(faults)
+    executors = []
+    original_run = DagExecutor.run
+    def recording_run(self, stages):
+        executors.append(self)
+        return original_run(self, stages)
+    DagExecutor.run = recording_run
+
+    with open("trips.json", "w") as f:
+        json.dump(synthetic_trips(config["trips"], BENCH_DATE, config.get("per_resort", 1)), f)
+
+    import src.main
+    src.main.today = lambda: BENCH_DATE
+    sys.argv = ["main", "--mode", config["mode"]] + (["--dry-run"] if config["dry_run"] else [])
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        src.main.main()
+    wall = time.perf_counter() - start
+    server.shutdown()
+
+    stages: Dict[str, List[float]] = {}
+    active = set()
+    for executor in executors:
+        for key, seconds in executor.durations.items():
+            owner, name = key.split("/", 1)
+            if owner == "run": # Run-wide stages such as the batched weather fetch
+                name = key
+            elif owner == "shared": # Searches and evaluation shared by a resort's trips
+                name = f"shared/{key.rsplit('/', 1)[-1]}"
+            else:
+                active.add(owner)
+            stages.setdefault(name, []).append(seconds)
+    errors = sum(len(e.errors) for e in executors)
+    return {
+        "trips": config["trips"],
+        "active_trips": len(active),
+        "wall_seconds": round(wall, 3),
+        "stage_errors": errors,
+        "stages": {name: {"count": len(values), "p50": round(statistics.median(values), 4),
+                          "p95": round(percentile(values, 0.95), 4), "total": round(sum(values), 3)}
+                   for name, values in sorted(stages.items())},
+        "calls": faults.calls,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+# --- Driver -----------------------------------------------------------------
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_report(result: Dict):
+    print(f"\n{result['trips']} trips ({result['active_trips']} active): {result['wall_seconds']:.2f}s wall, "
+          f"peak RSS {result['peak_rss_mb']} MB, {result['stage_errors']} stage errors")
+    print(f"  {'stage':<22} {'count':>6} {'p50 (s)':>9} {'p95 (s)':>9}")
+    for name, s in result["stages"].items():
+        print(f"  {name:<22} {s['count']:>6} {s['p50']:>9.3f} {s['p95']:>9.3f}")
+    calls = ", ".join(f"{service}={c['total']} ({c['error']} err, {c['429']} 429)"
+                      for service, c in sorted(result["calls"].items()))
+    print(f"  calls: {calls}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--trips", default="1,10,100", help="Comma-separated trip counts (1-500)")
+    parser.add_argument("--per-resort", type=int, default=1,
+                        help="Trips (groups) per resort, to measure work sharing")
+    parser.add_argument("--mode", choices=["morning", "evening"], default="morning")
+    parser.add_argument("--dry-run", action="store_true", help="Print messages instead of delivering them")
+    parser.add_argument("--latency", default="", help="Per-service latency in ms, e.g. 'gemini=300,search=150'")
+    parser.add_argument("--error-rate", default="", help="Per-service error rate, e.g. 'search=0.1'")
+    parser.add_argument("--rate-limit", default="", help="Per-service 429 rate, e.g. 'gemini=0.05'")
+    parser.add_argument("--gemini-rpm", type=float, default=100000,
+                        help="Client-side Gemini quota (high by default so pacing doesn't dominate)")
+    parser.add_argument("--concurrency", default=None, help="Stage limits, as for src.main --concurrency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(json.loads(args.worker))
+        print(RESULT_MARKER + json.dumps(result))
+        return
+
+    base_config = {
+        "mode": args.mode, "dry_run": args.dry_run, "per_resort": args.per_resort, "seed": args.seed, "gemini_rpm": args.gemini_rpm,
+        "concurrency": args.concurrency, "latency_ms": parse_spec(args.latency),
+        "error_rate": parse_spec(args.error_rate), "rate_limit": parse_spec(args.rate_limit),
+    }
+    report = {"revision": git_revision(), "python": sys.version.split()[0], "config": base_config, "results": []}
+    for count in [int(n) for n in args.trips.split(",") if n.strip()]:
+        config = {**base_config, "trips": count}
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_e2e", "--worker", json.dumps(config)],
+                              cwd=ROOT, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_MARKER)]
+        if proc.returncode != 0 or not lines:
+            print(f"Benchmark with {count} trips failed:\n{proc.stderr[-2000:]}")
+            sys.exit(1)
+        result = json.loads(lines[-1][len(RESULT_MARKER):])
+        report["results"].append(result)
+        print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
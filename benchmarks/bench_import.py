@@ -0,0 +1,69 @@
+"""
+Startup benchmark: how long `import src.main` takes, and which heavy SDKs it
+pulls in. Uses `python -X importtime` in fresh interpreters so nothing is
+already cached in sys.modules.
+
+    python -m benchmarks.bench_import --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only load once a stage needs them.
+HEAVY_MODULES = ["google.generativeai", "google.api_core", "duckduckgo_search", "tavily", "requests", "pytz",
+                 "pydantic", "numpy"]
+# Regression threshold for the median `import src.main`, in milliseconds.
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "600"))
+
+def import_times(module: str = "src.main") -> Dict[str, float]:
+    """Cumulative import time (ms) per module from one fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+def median_import_ms(module: str = "src.main", runs: int = 3) -> float:
+    return statistics.median(import_times(module)[module] for _ in range(runs))
+
+def loaded_heavy_modules(code: str = "import src.main") -> List[str]:
+    """Heavy modules present in sys.modules after running `code` in a fresh interpreter."""
+    probe = f"{code}\nimport sys\nprint('HEAVY:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    line = proc.stdout.strip().splitlines()[-1]
+    return [m for m in line[len("HEAVY:"):].split(",") if m]
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Show the slowest N imports of the last run")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        times = import_times()
+        samples.append(times["src.main"])
+    median = statistics.median(samples)
+
+    print(f"import src.main: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(samples):.1f}, max {max(samples):.1f}, budget {STARTUP_BUDGET_MS:.0f} ms)")
+    print(f"Heavy modules loaded at import: {', '.join(loaded_heavy_modules()) or 'none'}")
+    print("\nSlowest imports (cumulative ms):")
+    top_level = {name: ms for name, ms in times.items() if name != "src.main"}
+    for name, ms in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f}  {name}")
+    if median > STARTUP_BUDGET_MS:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
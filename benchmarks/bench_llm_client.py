@@ -0,0 +1,61 @@
+"""
+Microbenchmark: per-call client overhead of the Gemini integration.
+
+Compares the old pattern (genai.configure + new GenerativeModel on every call,
+which also drops the SDK's cached service client and its channel) against a
+long-lived LLMClient. The RPC itself is stubbed out, so the numbers are pure
+client-side setup cost and run without network access or an API key.
+
+    python -m benchmarks.bench_llm_client --calls 200
+"""
+import argparse
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+
+from src.integrations.llm import LLMClient, MODEL_NAME
+
+def _stub_response(*args, **kwargs):
+    return glm.GenerateContentResponse(candidates=[
+        {"content": {"parts": [{"text": "APPROVED"}], "role": "model"}, "finish_reason": 1}
+    ])
+
+def per_call_setup(calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        genai.configure(api_key="bench-key")
+        model = genai.GenerativeModel(MODEL_NAME)
+        model.generate_content("ping")
+    return (time.perf_counter() - start) / calls
+
+def reused_client(calls: int) -> float:
+    client = LLMClient(api_key="bench-key")
+    start = time.perf_counter()
+    for _ in range(calls):
+        client.generate_content("ping")
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client overhead microbenchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with patch.object(glm.GenerativeServiceClient, "generate_content", _stub_response):
+        # Warm up imports and lazy SDK state
+        per_call_setup(3)
+        reused_client(3)
+        before = per_call_setup(args.calls)
+        after = reused_client(args.calls)
+
+    print(f"Per-call overhead, configure every call: {before * 1000:.3f} ms")
+    print(f"Per-call overhead, reused LLMClient:     {after * 1000:.3f} ms")
+    print(f"Speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: loading trips and finding the active ones at 10k trips.
+
+Compares the old path (validate every entry with pydantic, then check each
+trip's phase in a loop) against the TripRegistry (columnar dates, interval
+index, lazy validation), and times building and reloading the cached plan.
+
+    python -m benchmarks.bench_registry --trips 10000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import Trip
+from src.logic import determine_phase, Phase
+from src.planner import build_plan, load_plan, scheduled_runs, run_modes
+from src.registry import TripRegistry
+
+def synthetic_trips(count: int, start: date, span_days: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    trips = []
+    for i in range(count):
+        out = start + timedelta(days=rng.randrange(span_days))
+        length = rng.randrange(4, 12)
+        trips.append({"resort_name": f"Resort {i}", "flight_out_date": str(out),
+                      "ski_start_date": str(out + timedelta(days=1)),
+                      "ski_end_date": str(out + timedelta(days=length - 1)),
+                      "flight_back_date": str(out + timedelta(days=length)),
+                      "lat": 45.0, "lon": 6.0, "road_check": "check"})
+    return trips
+
+def linear_active(trips: list, day: date, mode: str) -> list:
+    return [i for i, trip in enumerate(trips) if mode in run_modes(determine_phase(trip, day), day)]
+
+def timed(func, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Trip registry benchmark")
+    parser.add_argument("--trips", type=int, default=10000)
+    parser.add_argument("--span-days", type=int, default=730, help="Spread flight dates over this many days")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    start = date(2026, 1, 1)
+    records = synthetic_trips(args.trips, start, args.span_days)
+    rng = random.Random(1)
+    days = [start + timedelta(days=rng.randrange(args.span_days)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trips.json")
+        with open(path, "w") as f:
+            json.dump(records, f)
+        cache = os.path.join(tmp, "plan.json")
+
+        load_pydantic, trips = timed(lambda: [Trip(**item) for item in json.load(open(path))])
+        load_registry, registry = timed(lambda: TripRegistry.load(path))
+        query_linear, _ = timed(lambda: [linear_active(trips, d, "morning") for d in days])
+        query_registry, _ = timed(lambda: [scheduled_runs(registry, d, "morning") for d in days])
+        for d in days[:20]:
+            assert [r.trip_index for r in scheduled_runs(registry, d, "morning")] == linear_active(trips, d, "morning")
+
+        build, plan = timed(lambda: build_plan(registry))
+        load_plan(path, cache)
+        reload, _ = timed(lambda: load_plan(path, cache), repeat=5)
+        size = os.path.getsize(cache)
+
+    per_query = args.queries
+    print(f"{args.trips} trips over {args.span_days} days, {args.queries} date queries")
+    print(f"{'step':<32} {'time (ms)':>10}")
+    print(f"{'load + validate all (pydantic)':<32} {load_pydantic * 1000:>10.1f}")
+    print(f"{'load registry':<32} {load_registry * 1000:>10.1f}")
+    print(f"{'active trips, linear scan':<32} {query_linear / per_query * 1000:>10.3f}  per query")
+    print(f"{'active trips, interval index':<32} {query_registry / per_query * 1000:>10.3f}  per query")
+    print(f"{'build plan':<32} {build * 1000:>10.1f}  ({len(plan.days)} days)")
+    print(f"{'load cached plan':<32} {reload * 1000:>10.1f}  ({size / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: seen-item bookkeeping at 10k+ items per resort.
+
+Compares the legacy layout (JSON lists, linear `in` scans, whole-file indented
+rewrite on every save) against the sharded JSON and SQLite StateStore backends.
+Each "run" marks a handful of new URLs for one resort and saves, which is what
+a real run does.
+
+    python -m benchmarks.bench_state --items 10000 --resorts 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.state import JsonShardStore, SqliteStore, SEEN_URLS, migrate_legacy_state, is_url_seen, mark_url_seen
+
+NEW_PER_RUN = 10
+
+def legacy_state(resorts: int, items: int) -> dict:
+    return {f"resort{r}": {"seen_urls": [f"https://example.com/{r}/{i}" for i in range(items)],
+                           "seen_trivia": [], "seen_challenges": [], "last_run": None}
+            for r in range(resorts)}
+
+def bench_legacy(state: dict, path: str, probes: list, runs: int):
+    seen = state["resort0"]["seen_urls"]
+    start = time.perf_counter()
+    for url in probes:
+        _ = url in seen
+    lookup = (time.perf_counter() - start) / len(probes)
+
+    start = time.perf_counter()
+    for run in range(runs):
+        for i in range(NEW_PER_RUN):
+            url = f"https://example.com/new/{run}/{i}"
+            if url not in seen:
+                seen.append(url)
+        with open(path, "w") as f:
+            json.dump(state, f, indent=2)
+    save = (time.perf_counter() - start) / runs
+    return lookup, save
+
+def bench_store(store, probes: list, runs: int):
+    resort = store.resort("resort0")
+    start = time.perf_counter()
+    for url in probes:
+        is_url_seen(resort, url)
+    lookup = (time.perf_counter() - start) / len(probes)
+
+    start = time.perf_counter()
+    for run in range(runs):
+        for i in range(NEW_PER_RUN):
+            mark_url_seen(resort, f"https://example.com/new/{run}/{i}")
+        store.save()
+    save = (time.perf_counter() - start) / runs
+    return lookup, save
+
+def main():
+    parser = argparse.ArgumentParser(description="State store benchmark")
+    parser.add_argument("--items", type=int, default=10000, help="Seen URLs per resort")
+    parser.add_argument("--resorts", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    # Half hits, half misses, spread across the history
+    probes = [f"https://example.com/0/{i}" for i in range(0, args.items, max(1, args.items // 500))]
+    probes += [f"https://example.com/missing/{i}" for i in range(len(probes))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "state.json")
+        state = legacy_state(args.resorts, args.items)
+        with open(legacy_path, "w") as f:
+            json.dump(state, f, indent=2)
+
+        results = {"legacy state.json": bench_legacy(state, os.path.join(tmp, "rewrite.json"), probes, args.runs)}
+        for name, store in [("sharded JSON", JsonShardStore(os.path.join(tmp, "state"))),
+                            ("SQLite", SqliteStore(os.path.join(tmp, "state.db")))]:
+            start = time.perf_counter()
+            migrate_legacy_state(store, legacy_path)
+            print(f"{name}: migrated in {time.perf_counter() - start:.2f}s, "
+                  f"{len(store.resort('resort0').items(SEEN_URLS))} URLs in resort0")
+            results[name] = bench_store(store, probes, args.runs)
+            store.close()
+
+    print(f"\n{args.resorts} resorts x {args.items} seen URLs, {NEW_PER_RUN} new URLs per run")
+    print(f"{'backend':<20} {'lookup (us)':>12} {'mark+save (ms)':>15}")
+    for name, (lookup, save) in results.items():
+        print(f"{name:<20} {lookup * 1e6:>12.2f} {save * 1000:>15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
 import os
-import requests
+import sys
 import time
 from dotenv import load_dotenv
 
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.integrations.transport import get_transport
+
 load_dotenv()
 
 def get_telegram_updates():
@@ -20,7 +25,7 @@ def get_telegram_updates():
     
     for _ in range(10): # Try for 30 seconds
         try:
-            response = requests.get(url, timeout=10)
+            response = get_transport().get(url)
             data = response.json()
             
             if data.get("ok") and data.get("result"):
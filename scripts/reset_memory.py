@@ -1,20 +1,29 @@
 import os
+import shutil
 import sys
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.state import STATE_FILE, STATE_DIR, STATE_DB
+
 def reset_memory():
-    state_file = "state.json"
-    if os.path.exists(state_file):
-        print(f"Deleting {state_file}...")
-        os.remove(state_file)
+    found = False
+    for base in [".", "src"]: # Also check if running from within src
+        for name in [STATE_FILE, STATE_DIR, STATE_DB]:
+            path = os.path.join(base, name)
+            if os.path.isdir(path):
+                print(f"Deleting {path}/...")
+                shutil.rmtree(path)
+                found = True
+            elif os.path.exists(path):
+                print(f"Deleting {path}...")
+                os.remove(path)
+                found = True
+
+    if found:
         print("✅ Memory reset successfully. The agent will re-discover all insights on the next run.")
     else:
-        print(f"ℹ️ {state_file} not found. Memory is already fresh (or in a different directory).")
-
-    # Also check if running from within src
-    if os.path.exists(os.path.join("src", state_file)):
-        print(f"Deleting src/{state_file}...")
-        os.remove(os.path.join("src", state_file))
-        print("✅ Memory reset successfully.")
+        print("ℹ️ No state found. Memory is already fresh (or in a different directory).")
 
 if __name__ == "__main__":
     reset_memory()
@@ -0,0 +1,153 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+CACHE_DIR = os.getenv("BRRRNANDO_CACHE_DIR", ".cache")
+DEFAULT_MAX_ENTRIES = 1000
+
+_MISSING = object()
+_caches: Dict[str, "DiskCache"] = {}
+_registry_lock = threading.Lock()
+_enabled = os.getenv("BRRRNANDO_CACHE", "on").lower() not in ("off", "0", "false")
+
+class DiskCache:
+    """
+    A small persistent key/value cache stored as one JSON file.
+
+    Every entry has its own TTL. When the cache grows past `max_entries`,
+    expired entries are dropped first, then the least recently used ones.
+    Changes are kept in memory until `flush()` (called automatically at exit).
+    """
+    def __init__(self, name: str, max_entries: int = DEFAULT_MAX_ENTRIES, cache_dir: str = None,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.path = os.path.join(cache_dir or CACHE_DIR, f"{name}.json")
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _load(self) -> "OrderedDict[str, Dict]":
+        if self._entries is None:
+            self._entries = OrderedDict()
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as f:
+                        self._entries.update(json.load(f))
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"Error loading cache {self.name}: {e}")
+        return self._entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or `default` if missing or expired."""
+        if not _enabled:
+            return default
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None or entry["expires_at"] <= self.clock():
+                if entry is not None:
+                    del entries[key]
+                    self._dirty = True
+                self.misses += 1
+                return default
+            entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            return entry["value"]
+
+    def contains(self, key: str) -> bool:
+        """Check for a fresh entry without touching the hit/miss counters."""
+        if not _enabled:
+            return False
+        with self._lock:
+            entry = self._load().get(key)
+            return entry is not None and entry["expires_at"] > self.clock()
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for `ttl` seconds."""
+        if not _enabled or ttl <= 0:
+            return
+        with self._lock:
+            entries = self._load()
+            now = self.clock()
+            entries[key] = {"value": value, "stored_at": now, "expires_at": now + ttl}
+            entries.move_to_end(key)
+            self._dirty = True
+            self._evict(now)
+
+    def _evict(self, now: float):
+        entries = self._entries
+        if len(entries) <= self.max_entries:
+            return
+        for key in [k for k, e in entries.items() if e["expires_at"] <= now]:
+            del entries[key]
+            self.evictions += 1
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def flush(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except IOError as e:
+                print(f"Error saving cache {self.name}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = len(self._entries) if self._entries is not None else 0
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": size}
+
+def get_cache(name: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> DiskCache:
+    """Return the process-wide cache with this name."""
+    with _registry_lock:
+        if name not in _caches:
+            _caches[name] = DiskCache(name, max_entries=max_entries)
+        return _caches[name]
+
+def set_cache_enabled(enabled: bool):
+    """Turn all caches on or off for this process (e.g. for --no-cache)."""
+    global _enabled
+    _enabled = enabled
+
+def flush_all():
+    for cache in list(_caches.values()):
+        cache.flush()
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def env_seconds(name: str, default: float) -> float:
+    """Read a TTL (in seconds) from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Invalid value for {name}: {value}. Using {default}.")
+        return default
+
+atexit.register(flush_all)
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Tuple
+
+from .state import STATE_DIR
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join(STATE_DIR, "checkpoints"))
+# A run that hasn't finished within this window is not worth resuming (the next
+# scheduled run covers it), so older checkpoints are ignored and deleted.
+CHECKPOINT_TTL_HOURS = float(os.getenv("CHECKPOINT_TTL_HOURS", "12"))
+
+class CheckpointStore:
+    """
+    Stage results for one (date, mode) run, keyed by trip and stage name and
+    written to disk as each stage finishes. With `resume=True`, `get` returns
+    results saved by an earlier attempt of the same run; otherwise it only
+    records them.
+    """
+    def __init__(self, run_date: date, mode: str, resume: bool = False, directory: str = None,
+                 ttl_hours: float = None, clock=time.time):
+        self.directory = directory or CHECKPOINT_DIR
+        self.path = os.path.join(self.directory, f"{run_date.isoformat()}-{mode}.json")
+        self.resume = resume
+        self.ttl = (ttl_hours if ttl_hours is not None else CHECKPOINT_TTL_HOURS) * 3600
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.purge_expired()
+        self._data: Dict[str, Dict[str, Dict]] = self._load() if resume else {}
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading checkpoints: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except (IOError, TypeError) as e:
+            print(f"Error saving checkpoints: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete checkpoint files older than the TTL. Returns how many were removed."""
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = self.clock() - self.ttl
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def get(self, trip_id: str, stage: str) -> Tuple[bool, Any]:
+        """(found, value) for a stage completed by an earlier attempt; never found unless resuming."""
+        if not self.resume:
+            return False, None
+        with self._lock:
+            entry = self._data.get(trip_id, {}).get(stage)
+        if entry is None or entry["saved_at"] < self.clock() - self.ttl:
+            return False, None
+        return True, entry["value"]
+
+    def put(self, trip_id: str, stage: str, value: Any):
+        with self._lock:
+            self._data.setdefault(trip_id, {})[stage] = {"saved_at": self.clock(), "value": value}
+            self._save()
+
+    def completed(self, trip_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return {stage: entry["value"] for stage, entry in self._data.get(trip_id, {}).items()}
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+from typing import Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Max differing bits (out of 64) for two fingerprints to count as the same content.
+# On search snippets and one-line trivia, rewordings land around 2-9 bits apart
+# and unrelated texts about the same resort 15+.
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "10"))
+# Texts shorter than this are compared exactly; SimHash is noisy on a handful of words.
+MIN_FINGERPRINT_TOKENS = 8
+FINGERPRINT_BITS = 64
+
+# Only names that are tracking everywhere; generic ones like ref or feature are
+# real content parameters on many sites.
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+                   "ref_src", "ref_url", "spm", "_ga", "yclid"}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+AMP_PARAMS = {"amp", "outputtype", "usqp"}
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so tracking-parameter, AMP and mobile variants of the same
+    page compare equal: https scheme, lowercase host without one www/m/amp
+    prefix, no tracking params or fragment, sorted query, no trailing slash.
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        # Never down to a bare TLD: mobile.de and amp.dev are sites of their own
+        if host.startswith(prefix) and "." in host[len(prefix):]:
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if host == "youtu.be" and path.strip("/"):
+        return f"https://youtube.com/watch?v={path.strip('/')}"
+    # AMP variants: /amp, /amp/, /article.amp, /amp/article
+    path = re.sub(r"/amp(?=/|$)", "", path)
+    path = re.sub(r"\.amp(?=\.html?$|$)", "", path)
+    path = re.sub(r"/{2,}", "/", path).rstrip("/") or "/"
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PREFIXES)
+             and k.lower() not in TRACKING_PARAMS and k.lower() not in AMP_PARAMS]
+    return urlunsplit(("https", host, path if path != "/" else "", urlencode(sorted(query)), ""))
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash over words. Returns None for texts too short to
+    fingerprint reliably.
+    """
+    tokens = tokenize(text)
+    if len(tokens) < MIN_FINGERPRINT_TOKENS:
+        return None
+    weights = [0] * FINGERPRINT_BITS
+    for token in tokens:
+        h = _hash64(token)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def normalize_text(text: str) -> str:
+    return " ".join(tokenize(text))
+
+class SimHashIndex:
+    """
+    Near-duplicate lookup over 64-bit fingerprints. The fingerprint is split
+    into max_distance + 1 bands; two fingerprints within max_distance bits
+    must agree on at least one band, so only same-band candidates are compared.
+    Short texts fall back to exact matching on normalized text.
+    """
+    def __init__(self, max_distance: int = None):
+        self.max_distance = DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        self._bands = self.max_distance + 1
+        self._band_bits = FINGERPRINT_BITS // self._bands
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(self._bands)]
+        self._exact: set = set()
+        self.size = 0
+
+    def _band_keys(self, fp: int) -> List[int]:
+        keys = []
+        for band in range(self._bands):
+            width = self._band_bits if band < self._bands - 1 else FINGERPRINT_BITS - self._band_bits * band
+            keys.append(fp >> (band * self._band_bits) & ((1 << width) - 1))
+        return keys
+
+    def add_fingerprint(self, fp: int):
+        if self.find(fp) == fp:
+            return
+        for band, key in enumerate(self._band_keys(fp)):
+            self._buckets[band].setdefault(key, []).append(fp)
+        self.size += 1
+
+    def find(self, fp: int) -> Optional[int]:
+        """The closest stored fingerprint within max_distance, if any."""
+        best, best_distance = None, self.max_distance + 1
+        for band, key in enumerate(self._band_keys(fp)):
+            for candidate in self._buckets[band].get(key, ()):
+                distance = hamming(fp, candidate)
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def add(self, text: str):
+        fp = simhash(text)
+        if fp is None:
+            self._exact.add(normalize_text(text))
+        else:
+            self.add_fingerprint(fp)
+
+    def contains(self, text: str) -> bool:
+        fp = simhash(text)
+        if fp is None:
+            return normalize_text(text) in self._exact
+        return self.find(fp) is not None
+
+def fingerprint_hex(text: str) -> Optional[str]:
+    fp = simhash(text)
+    return f"{fp:016x}" if fp is not None else None
+
+T = TypeVar("T")
+
+def unique_insights(insights: Iterable[T], limit: int = None, max_distance: int = None) -> List[T]:
+    """
+    Keep the first of any insights sharing a canonical URL or a near-duplicate
+    body (same article syndicated under different URLs).
+    """
+    seen_urls = set()
+    bodies = SimHashIndex(max_distance)
+    unique = []
+    for insight in insights:
+        url = canonicalize_url(insight.url)
+        if url and url in seen_urls:
+            continue
+        fp = simhash(insight.content)
+        if fp is not None and bodies.find(fp) is not None:
+            print(f"Skipping near-duplicate insight: {insight.url}")
+            continue
+        unique.append(insight)
+        seen_urls.add(url)
+        if fp is not None:
+            bodies.add_fingerprint(fp)
+        if limit and len(unique) >= limit:
+            break
+    return unique
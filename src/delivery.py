@@ -0,0 +1,265 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+from .tracing import span
+
+OUTBOX_FILE = "outbox.json"
+# Pending sends older than this are not retried any more (a stale briefing is worse than none).
+OUTBOX_MAX_AGE_HOURS = float(os.getenv("OUTBOX_MAX_AGE_HOURS", "12"))
+# Finished entries are kept this long so reruns of the same day stay idempotent.
+OUTBOX_RETENTION_DAYS = 3
+MAX_SEND_ATTEMPTS = 5
+
+PENDING = "pending"
+SENT = "sent"
+UNCONFIGURED = "unconfigured"
+EXPIRED = "expired"
+
+# A channel sends a message and returns a truthy API response on success,
+# {} on failure and None when it is not configured.
+Channel = Callable[[str], Optional[Dict]]
+
+def default_channels() -> Dict[str, Channel]:
+    from .integrations.whatsapp import send_whatsapp_message
+    from .integrations.telegram import send_telegram_message
+    return {"whatsapp": send_whatsapp_message, "telegram": send_telegram_message}
+
+def content_hash(message: str) -> str:
+    return hashlib.sha256(message.encode("utf-8")).hexdigest()[:16]
+
+class Outbox:
+    """
+    Durable record of every send, one entry per (trip, date, mode, channel).
+    An entry is written as pending before the send is attempted, so a crash or
+    API error leaves it for the next run to retry, and a sent entry makes
+    reruns of the same mode and day skip that channel.
+    """
+    def __init__(self, path: str = OUTBOX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading outbox: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            print(f"Error saving outbox: {e}")
+
+    @staticmethod
+    def key(trip_id: str, run_date: date, mode: str, channel: str) -> str:
+        return f"{trip_id}|{run_date.isoformat()}|{mode}|{channel}"
+
+    def enqueue(self, trip_id: str, run_date: date, mode: str, channel: str, message: str) -> Optional[str]:
+        """
+        Record a pending send. Returns the entry key, or None if this slot was
+        already sent (or the channel is known to be unconfigured).
+        """
+        key = self.key(trip_id, run_date, mode, channel)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry["status"] in (SENT, UNCONFIGURED):
+                return None
+            self.entries[key] = {
+                "trip": trip_id,
+                "date": run_date.isoformat(),
+                "mode": mode,
+                "channel": channel,
+                "content_hash": content_hash(message),
+                "message": message,
+                "status": PENDING,
+                "attempts": entry["attempts"] if entry else 0,
+                "last_error": entry.get("last_error") if entry else None,
+                "created_at": entry["created_at"] if entry else time.time(),
+                "updated_at": time.time(),
+            }
+            self._save()
+            return key
+
+    def attach(self, key: str, message: str) -> bool:
+        """
+        Replace the text of a pending entry whose send is already in flight, so
+        a retry (should that send fail) carries the newer message. Returns
+        whether anything changed.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry or entry["status"] != PENDING or entry["content_hash"] == content_hash(message):
+                return False
+            entry["message"] = message
+            entry["content_hash"] = content_hash(message)
+            entry["updated_at"] = time.time()
+            self._save()
+            return True
+
+    def update(self, key: str, status: str, error: str = None):
+        with self._lock:
+            entry = self.entries[key]
+            entry["status"] = status
+            entry["attempts"] += 1
+            entry["last_error"] = error
+            entry["updated_at"] = time.time()
+            if status != PENDING:
+                entry.pop("message", None) # No need to keep delivered text around
+            self._save()
+
+    def pending(self, max_age_hours: float = OUTBOX_MAX_AGE_HOURS) -> List[str]:
+        """Keys still waiting to be sent; entries too old to be useful are expired."""
+        cutoff = time.time() - max_age_hours * 3600
+        keys = []
+        with self._lock:
+            changed = False
+            for key, entry in self.entries.items():
+                if entry["status"] != PENDING:
+                    continue
+                if entry["created_at"] < cutoff or entry["attempts"] >= MAX_SEND_ATTEMPTS:
+                    entry["status"] = EXPIRED
+                    entry.pop("message", None)
+                    changed = True
+                else:
+                    keys.append(key)
+            if changed:
+                self._save()
+        return keys
+
+    def prune(self, today: date, retention_days: int = OUTBOX_RETENTION_DAYS):
+        cutoff = (today - timedelta(days=retention_days)).isoformat()
+        with self._lock:
+            stale = [k for k, e in self.entries.items() if e["date"] < cutoff and e["status"] != PENDING]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self._save()
+
+class DeliveryService:
+    """
+    Sends messages to every channel concurrently in the background. `submit`
+    returns immediately; `drain` waits for outstanding sends at the end of the run.
+    A slot (trip, date, mode, channel) has at most one send in flight at a time.
+    """
+    def __init__(self, run_date: date, mode: str, outbox: Outbox = None,
+                 channels: Dict[str, Channel] = None, max_workers: int = 4):
+        self.run_date = run_date
+        self.mode = mode
+        self.outbox = outbox or Outbox()
+        self._channels = channels
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="delivery")
+        self._futures: List[Future] = []
+        self._in_flight: Dict[str, Future] = {}
+        # Reentrant: a send that is already done runs its callback inside _dispatch
+        self._lock = threading.RLock()
+
+    @property
+    def channels(self) -> Dict[str, Channel]:
+        # Resolved on first use so a run with nothing to send never imports the integrations
+        if self._channels is None:
+            self._channels = default_channels()
+        return self._channels
+
+    def _send(self, key: str) -> str:
+        entry = self.outbox.entries[key]
+        channel = self.channels.get(entry["channel"])
+        if channel is None:
+            self.outbox.update(key, UNCONFIGURED, "unknown channel")
+            return UNCONFIGURED
+        with span("delivery", channel=entry["channel"], trip=entry["trip"],
+                  attempt=entry["attempts"] + 1) as s:
+            try:
+                result = channel(entry["message"])
+            except Exception as e:
+                result, error = {}, str(e)
+            else:
+                error = None if result else "send failed"
+            if result is None:
+                status = UNCONFIGURED
+            else:
+                status = SENT if result else PENDING
+            s.set(status=status, error=error)
+        self.outbox.update(key, status, error)
+        if status == PENDING:
+            print(f"Delivery to {entry['channel']} for {entry['trip']} failed; kept in outbox for retry.")
+        return status
+
+    def _dispatch(self, key: str) -> Future:
+        """Start sending `key`; the caller holds self._lock."""
+        future = self._pool.submit(contextvars.copy_context().run, self._send, key)
+        self._futures.append(future)
+        self._in_flight[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+
+    def _finished(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def submit(self, trip_id: str, message: str) -> Dict[str, Future]:
+        """
+        Queue a message for every channel; already-sent slots are skipped, and a
+        slot whose send is still in flight (e.g. a retry of an earlier run's
+        message) is not sent again.
+        """
+        futures = {}
+        for channel in self.channels:
+            key = Outbox.key(trip_id, self.run_date, self.mode, channel)
+            with self._lock:
+                in_flight = self._in_flight.get(key)
+                if in_flight is not None:
+                    if self.outbox.attach(key, message):
+                        print(f"Delivery of {trip_id} to {channel} already in flight; "
+                              f"newer message kept in outbox in case it fails.")
+                    else:
+                        print(f"Delivery of {trip_id} to {channel} already in flight; skipping.")
+                    futures[channel] = in_flight
+                    continue
+                if self.outbox.enqueue(trip_id, self.run_date, self.mode, channel, message) is None:
+                    print(f"Already delivered {trip_id} to {channel} for {self.mode} {self.run_date}; skipping.")
+                    continue
+                futures[channel] = self._dispatch(key)
+        return futures
+
+    def retry_pending(self) -> int:
+        """Re-send anything earlier runs failed to deliver."""
+        self.outbox.prune(self.run_date)
+        keys = self.outbox.pending()
+        with self._lock:
+            keys = [key for key in keys if key not in self._in_flight]
+            for key in keys:
+                entry = self.outbox.entries[key]
+                print(f"Retrying pending delivery: {entry['trip']} -> {entry['channel']} "
+                      f"({entry['mode']} {entry['date']}, attempt {entry['attempts'] + 1})")
+                self._dispatch(key)
+        return len(keys)
+
+    def drain(self, timeout: float = None) -> Dict[str, int]:
+        """Wait for all queued sends and return a count per final status."""
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = wait(futures, timeout=timeout)
+        # Joining the workers also waits for the futures' done-callbacks (e.g.
+        # the deliver checkpoint), which run on them right after each send
+        self._pool.shutdown(wait=not not_done)
+        counts: Dict[str, int] = {}
+        for future in futures:
+            status = future.result() if future.done() and not future.exception() else PENDING
+            counts[status] = counts.get(status, 0) + 1
+        return counts
@@ -1,10 +1,11 @@
-from typing import List, Dict
+from typing import List
 from dataclasses import dataclass
 from .models import Trip
-from .logic import Phase, PHASE_SEARCH_INTENT
-from .integrations.search import search_web, search_videos
+from .logic import Phase, PHASE_SEARCH_INTENT, search_ttl
+from .integrations.search import search_web, search_videos, set_concurrency
 
-from .state import is_url_seen
+from .state import ResortState, is_url_seen, is_content_seen
+from .dedup import unique_insights
 
 @dataclass
 class Insight:
@@ -14,96 +15,99 @@ class Insight:
     url: str = ""
 
 class DiscoveryEngine:
-    def __init__(self):
-        pass
+    def __init__(self, search_concurrency: int = None):
+        # Calls in flight per search provider; the run passes its `search` stage limit
+        if search_concurrency is not None:
+            set_concurrency(search_concurrency)
 
-    def discover_insights(self, trip: Trip, phase: Phase, resort_state: Dict = None) -> List[Insight]:
+    def discover_insights(self, trip: Trip, phase: Phase, resort_state: ResortState = None) -> List[Insight]:
         """
         Orchestrates web search and video discovery based on the trip's current phase.
         """
-        intents = PHASE_SEARCH_INTENT.get(phase, [])
-        if not intents:
-            return []
+        return filter_unseen(self.search_insights(trip.resort_name, phase), resort_state, limit=5)
 
+    def search_insights(self, resort: str, phase: Phase) -> List[Insight]:
+        """
+        Everything the phase's searches return for a resort, before any
+        per-trip filtering, so one search can serve several trips.
+        """
+        intents = PHASE_SEARCH_INTENT.get(phase, [])
         insights = []
-        resort = trip.resort_name
-
         for intent in intents:
             query = f"{resort} {intent}"
+            ttl = search_ttl(intent)
             
             # For HYPE_DAILY or ACTIVE, try to find videos
             if phase in [Phase.HYPE_DAILY, Phase.ACTIVE]:
-                video_results = search_videos(query, max_results=1, timelimit='m')
+                video_results = search_videos(query, max_results=1, timelimit='m', ttl=ttl)
                 for res in video_results:
-                    url = res["content"]
-                    if resort_state and is_url_seen(resort_state, url):
-                        print(f"Skipping seen video: {url}")
-                        continue
-                        
                     insights.append(Insight(
                         title=res["title"],
                         content=res["description"],
                         type="video",
-                        url=url
+                        url=res["content"]
                     ))
 
             # Always try to find some text insights
-            text_results = search_web(query, max_results=2)
+            text_results = search_web(query, max_results=2, ttl=ttl)
             for res in text_results:
-                url = res["href"]
-                if resort_state and is_url_seen(resort_state, url):
-                    print(f"Skipping seen text: {url}")
-                    continue
-
                 insights.append(Insight(
                     title=res["title"],
                     content=res["body"],
                     type="text",
-                    url=url
+                    url=res["href"]
                 ))
+        return insights
 
-        # Deduplicate and limit
-        seen_urls = set()
-        unique_insights = []
-        for insight in insights:
-            if insight.url not in seen_urls:
-                unique_insights.append(insight)
-                seen_urls.add(insight.url)
-        
-        return unique_insights[:5] # Limit to top 5 insights for the prompt
-    def perform_refined_search(self, queries: List[str], resort_state: Dict = None) -> List[Insight]:
+    def perform_refined_search(self, queries: List[str], resort_state: ResortState = None) -> List[Insight]:
         """
         Performs specific searches based on refined queries.
         """
+        return filter_unseen(self.refined_search(queries), resort_state, quiet=True)
+
+    def refined_search(self, queries: List[str]) -> List[Insight]:
+        """Results for the LLM's follow-up queries, before per-trip filtering."""
         refined_insights = []
         for query in queries:
             print(f"Refining discovery with query: {query}")
             # Try to find text results for specific queries
             text_results = search_web(query, max_results=2)
             for res in text_results:
-                url = res["href"]
-                if resort_state and is_url_seen(resort_state, url):
-                    continue
-                
                 refined_insights.append(Insight(
                     title=res["title"],
                     content=res["body"],
                     type="text",
-                    url=url
+                    url=res["href"]
                 ))
             
             # Special check for webcams in refined queries
             if "webcam" in query.lower():
                 video_results = search_videos(query, max_results=1)
                 for res in video_results:
-                    url = res["content"]
-                    if resort_state and is_url_seen(resort_state, url):
-                        continue
                     refined_insights.append(Insight(
                         title=f"Webcam/Live Update: {res['title']}",
                         content=res["description"],
                         type="video",
-                        url=url
+                        url=res["content"]
                     ))
         
         return refined_insights
+
+def filter_unseen(insights: List[Insight], resort_state: ResortState = None, limit: int = None,
+                  quiet: bool = False) -> List[Insight]:
+    """
+    Drop insights this resort's state has already seen (by URL or near-duplicate
+    body). With a `limit`, also deduplicate and keep the first `limit`.
+    """
+    unseen = []
+    for insight in insights:
+        if resort_state and (is_url_seen(resort_state, insight.url) or
+                             is_content_seen(resort_state, insight.content)):
+            if not quiet:
+                print(f"Skipping seen {insight.type}: {insight.url}")
+            continue
+        unseen.append(insight)
+    if limit is None:
+        return unseen
+    # Deduplicate (canonical URL or near-identical body) and limit
+    return unique_insights(unseen, limit=limit) # Limit to top 5 insights for the prompt
@@ -0,0 +1,187 @@
+import contextvars
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Max number of stages of each pool that may run at the same time.
+# Pools group stages by the external service they wait on.
+DEFAULT_STAGE_LIMITS = {
+    "weather": 4,
+    "search": 3,
+    "llm": 2,
+    # Speculative drafts may be thrown away, so they never take an "llm" slot
+    # from critical-path work such as another resort's evaluation.
+    "llm_speculative": 1,
+    "delivery": 2,
+}
+DEFAULT_POOL_LIMIT = 4
+
+@dataclass
+class Stage:
+    """
+    A unit of work in the run graph. `func` is called with the results of
+    `deps` as positional arguments, in the order they are listed.
+    """
+    key: str
+    func: Callable[..., Any]
+    deps: List[str] = field(default_factory=list)
+    pool: str = "default"
+
+class StageSkipped(Exception):
+    """Raised (recorded) for stages whose dependencies failed."""
+
+def parse_stage_limits(spec: Optional[str]) -> Dict[str, int]:
+    """
+    Parse a limits spec like "weather=4,llm=2" into a dict.
+    """
+    limits = {}
+    if not spec:
+        return limits
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.partition("=")
+        if not value:
+            raise ValueError(f"Invalid stage limit '{part}' (expected pool=N)")
+        limit = int(value)
+        if limit < 1:
+            raise ValueError(f"Stage limit for '{name}' must be >= 1")
+        limits[name.strip()] = limit
+    return limits
+
+def get_stage_limits(spec: Optional[str] = None) -> Dict[str, int]:
+    """
+    Resolve per-pool limits: defaults, then BRRRNANDO_STAGE_LIMITS, then `spec`.
+    """
+    limits = dict(DEFAULT_STAGE_LIMITS)
+    limits.update(parse_stage_limits(os.getenv("BRRRNANDO_STAGE_LIMITS")))
+    limits.update(parse_stage_limits(spec))
+    return limits
+
+class DagExecutor:
+    """
+    Runs a graph of stages on a bounded thread pool. A stage is started as soon
+    as all of its dependencies have finished and its pool has a free slot, so
+    independent stages (within one trip or across trips) overlap.
+    """
+    def __init__(self, limits: Dict[str, int] = None, max_workers: int = None):
+        self.limits = dict(limits) if limits is not None else get_stage_limits()
+        self.max_workers = max_workers or max(1, sum(self.limits.values()))
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.durations: Dict[str, float] = {}
+
+    def _limit(self, pool: str) -> int:
+        return self.limits.get(pool, DEFAULT_POOL_LIMIT)
+
+    def _validate(self, stages: Dict[str, Stage]):
+        for stage in stages.values():
+            for dep in stage.deps:
+                if dep not in stages:
+                    raise ValueError(f"Stage '{stage.key}' depends on unknown stage '{dep}'")
+
+        # Kahn's algorithm to reject cycles up front.
+        indegree = {key: len(stage.deps) for key, stage in stages.items()}
+        dependents = self._dependents(stages)
+        queue = deque(key for key, n in indegree.items() if n == 0)
+        visited = 0
+        while queue:
+            key = queue.popleft()
+            visited += 1
+            for child in dependents[key]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        if visited != len(stages):
+            raise ValueError("Stage graph contains a cycle")
+
+    @staticmethod
+    def _dependents(stages: Dict[str, Stage]) -> Dict[str, List[str]]:
+        dependents = {key: [] for key in stages}
+        for stage in stages.values():
+            for dep in stage.deps:
+                dependents[dep].append(stage.key)
+        return dependents
+
+    def _timed(self, stage: Stage, args: List[Any]):
+        start = time.perf_counter()
+        try:
+            return stage.func(*args)
+        finally:
+            self.durations[stage.key] = time.perf_counter() - start
+
+    def run(self, stages: List[Stage]) -> Dict[str, Any]:
+        """
+        Execute all stages and return their results keyed by stage key.
+        Failed stages are recorded in `self.errors`; their dependents are
+        skipped rather than aborting the whole run.
+        """
+        by_key: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.key in by_key:
+                raise ValueError(f"Duplicate stage key '{stage.key}'")
+            by_key[stage.key] = stage
+        self._validate(by_key)
+
+        dependents = self._dependents(by_key)
+        remaining = {key: set(stage.deps) for key, stage in by_key.items()}
+        ready = deque(stage.key for stage in stages if not stage.deps)
+        running = {}
+        pool_running = Counter()
+
+        def complete(key: str):
+            # Release dependents; skipped stages complete immediately.
+            stack = [key]
+            while stack:
+                done_key = stack.pop()
+                for child in dependents[done_key]:
+                    remaining[child].discard(done_key)
+                    if remaining[child]:
+                        continue
+                    failed = [d for d in by_key[child].deps if d in self.errors]
+                    if failed:
+                        self.errors[child] = StageSkipped(f"dependency failed: {', '.join(failed)}")
+                        stack.append(child)
+                    else:
+                        ready.append(child)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while ready or running:
+                deferred = deque()
+                while ready:
+                    key = ready.popleft()
+                    stage = by_key[key]
+                    if pool_running[stage.pool] >= self._limit(stage.pool):
+                        deferred.append(key)
+                        continue
+                    args = [self.results[dep] for dep in stage.deps]
+                    running[pool.submit(contextvars.copy_context().run, self._timed, stage, args)] = key
+                    pool_running[stage.pool] += 1
+                ready = deferred
+
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    pool_running[by_key[key].pool] -= 1
+                    try:
+                        self.results[key] = future.result()
+                    except Exception as e:
+                        print(f"Stage '{key}' failed: {e}")
+                        self.errors[key] = e
+                    complete(key)
+
+        return self.results
+
+    def summary(self) -> Dict[str, float]:
+        """Total seconds spent per stage name (the part of the key after '/')."""
+        totals = Counter()
+        for key, seconds in self.durations.items():
+            totals[key.rsplit("/", 1)[-1]] += seconds
+        return dict(totals)
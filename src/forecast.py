@@ -0,0 +1,229 @@
+import io
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .cache import CACHE_DIR
+from .integrations.weather import BLOCK_VARIABLES, WeatherPoint
+
+FORECAST_DIR = os.getenv("FORECAST_DIR", os.path.join(CACHE_DIR, "forecasts"))
+# Rows whose target time is older than this are dropped on every write.
+FORECAST_RETENTION_DAYS = int(os.getenv("FORECAST_RETENTION_DAYS", "21"))
+# The newest fetches keep their whole hourly horizon (for forecast-vs-forecast
+# comparisons); older ones keep only their first NOWCAST_HOURS, which is the
+# closest thing to observed conditions and all the history needs.
+FULL_HORIZON_FETCHES = 4
+NOWCAST_HOURS = 24
+# A forecast is compared against the newest one fetched at least this long before it.
+DELTA_MIN_HOURS = 20
+# Gusts (or sustained wind) at or above this usually close exposed lifts.
+WIND_HOLD_KMH = float(os.getenv("WIND_HOLD_KMH", "70"))
+
+TABLES = ("daily", "hourly")
+SECONDS_PER_HOUR = 3600
+
+def _variables(table: str):
+    return BLOCK_VARIABLES[table].split(",")
+
+def _empty(table: str) -> Dict[str, np.ndarray]:
+    columns = {"fetch": np.empty(0, np.int64), "target": np.empty(0, np.int64)}
+    columns.update({name: np.empty(0, np.float32) for name in _variables(table)})
+    return columns
+
+def _targets(table: str, block: Dict[str, Any], utc_offset: int) -> np.ndarray:
+    """Open-Meteo's local times as UTC epoch hours (hourly) or local epoch days (daily)."""
+    if table == "daily":
+        return np.array(block["time"], dtype="datetime64[D]").astype(np.int64)
+    local = np.array(block["time"], dtype="datetime64[h]").astype(np.int64)
+    return local - utc_offset // SECONDS_PER_HOUR
+
+def _rows(table: str, response: Dict[str, Any]) -> Optional[Dict[str, np.ndarray]]:
+    """One fetch of `table` as columns, or None if the response has no usable block."""
+    block = response.get(table)
+    fetched_at = response.get(f"{table}_fetched_at")
+    if not block or not block.get("time") or fetched_at is None:
+        return None
+    targets = _targets(table, block, int(response.get("utc_offset_seconds") or 0))
+    columns = {"fetch": np.full(len(targets), int(fetched_at), np.int64), "target": targets}
+    for name in _variables(table):
+        values = block.get(name) or [None] * len(targets)
+        # Open-Meteo reports gaps as null
+        columns[name] = np.array([np.nan if v is None else v for v in values], np.float32)
+    return columns
+
+def _select(columns: Dict[str, np.ndarray], keep: np.ndarray) -> Dict[str, np.ndarray]:
+    return {name: values[keep] for name, values in columns.items()}
+
+class ForecastArchive:
+    """
+    Append-only columnar store of every forecast fetched, one `.npz` file per
+    point (a resort, or its summit). Each table ("daily", "hourly") holds one
+    row per (fetch time, target time) with a float32 column per variable, so
+    the analytics below are plain array operations.
+
+    Size stays bounded over a season: rows older than the retention window
+    are dropped, and only the newest FULL_HORIZON_FETCHES keep their whole
+    hourly horizon.
+    """
+    def __init__(self, directory: str = None, retention_days: int = None):
+        self.directory = directory or FORECAST_DIR
+        self.retention_days = FORECAST_RETENTION_DAYS if retention_days is None else retention_days
+
+    def path(self, point: WeatherPoint) -> str:
+        lat, lon, elevation = point
+        return os.path.join(self.directory, f"{lat:.2f}_{lon:.2f}_{elevation if elevation is not None else 'auto'}.npz")
+
+    def load(self, point: WeatherPoint) -> Dict[str, Dict[str, np.ndarray]]:
+        tables = {table: _empty(table) for table in TABLES}
+        path = self.path(point)
+        if not os.path.exists(path):
+            return tables
+        try:
+            with np.load(path) as data:
+                for key in data.files:
+                    table, _, name = key.partition(".")
+                    if table in tables:
+                        tables[table][name] = data[key]
+        except (OSError, ValueError) as e:
+            print(f"Error loading forecast archive {path}: {e}")
+            return {table: _empty(table) for table in TABLES}
+        # Variables added since the file was written are missing for its older rows
+        for table, columns in tables.items():
+            for name in _variables(table):
+                if len(columns[name]) != len(columns["fetch"]):
+                    columns[name] = np.full(len(columns["fetch"]), np.nan, np.float32)
+        return tables
+
+    def record(self, point: WeatherPoint, response: Dict[str, Any],
+               now: float = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Append the fetches in `response` that aren't archived yet (a response
+        served from the weather cache is recorded only once), prune, and save.
+        Returns the updated tables.
+        """
+        now = time.time() if now is None else now
+        tables = self.load(point)
+        changed = False
+        for table in TABLES:
+            rows = _rows(table, response)
+            if rows is None or np.any(tables[table]["fetch"] == rows["fetch"][0]):
+                continue
+            tables[table] = {name: np.concatenate([tables[table][name], rows[name]]) for name in tables[table]}
+            changed = True
+        if changed:
+            tables = self._prune(tables, now)
+            self._save(point, tables)
+        return tables
+
+    def _prune(self, tables: Dict[str, Dict[str, np.ndarray]], now: float) -> Dict[str, Dict[str, np.ndarray]]:
+        daily, hourly = tables["daily"], tables["hourly"]
+        cutoff_hour = int(now // SECONDS_PER_HOUR) - self.retention_days * 24
+        daily = _select(daily, daily["target"] >= cutoff_hour // 24)
+
+        recent = np.unique(hourly["fetch"])[-FULL_HORIZON_FETCHES:]
+        fetch_hour = hourly["fetch"] // SECONDS_PER_HOUR
+        keep = (hourly["target"] >= cutoff_hour) & (np.isin(hourly["fetch"], recent)
+                                                     | (hourly["target"] < fetch_hour + NOWCAST_HOURS))
+        return {"daily": daily, "hourly": _select(hourly, keep)}
+
+    def _save(self, point: WeatherPoint, tables: Dict[str, Dict[str, np.ndarray]]):
+        path = self.path(point)
+        arrays = {f"{table}.{name}": values for table, columns in tables.items() for name, values in columns.items()}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            buffer = io.BytesIO()
+            np.savez_compressed(buffer, **arrays)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error saving forecast archive {path}: {e}")
+
+def _latest_per_target(columns: Dict[str, np.ndarray], name: str):
+    """(targets, values): for each target time, the value from the newest fetch that covers it."""
+    order = np.lexsort((columns["fetch"], columns["target"]))
+    targets, values = columns["target"][order], columns[name][order]
+    last = np.ones(len(targets), bool)
+    last[:-1] = targets[1:] != targets[:-1]
+    targets, values = targets[last], values[last]
+    valid = ~np.isnan(values)
+    return targets[valid], values[valid]
+
+def snowfall_delta(daily: Dict[str, np.ndarray], today: int) -> Optional[Dict[str, float]]:
+    """
+    Change in total forecast snowfall (cm) between the newest fetch and the
+    newest one at least DELTA_MIN_HOURS older, over the days from `today`
+    that both cover.
+    """
+    fetches = np.unique(daily["fetch"])
+    if len(fetches) < 2:
+        return None
+    latest = fetches[-1]
+    older = fetches[fetches <= latest - DELTA_MIN_HOURS * SECONDS_PER_HOUR]
+    if not len(older):
+        return None
+    reference = older[-1]
+    new, old = daily["fetch"] == latest, daily["fetch"] == reference
+    days = np.intersect1d(daily["target"][new], daily["target"][old])
+    days = days[days >= today]
+    if not len(days):
+        return None
+    snowfall = np.nan_to_num(daily["snowfall_sum"])
+    change = (snowfall[new & np.isin(daily["target"], days)].sum()
+              - snowfall[old & np.isin(daily["target"], days)].sum())
+    return {"snowfall_forecast_change_cm": round(float(change), 1),
+            "snowfall_forecast_change_hours": int((latest - reference) // SECONDS_PER_HOUR)}
+
+def snow_depth_trend(hourly: Dict[str, np.ndarray], now_hour: int, days: int = 7) -> Optional[Dict[str, float]]:
+    """Change in snow depth (cm) over the last `days`, from the best estimate for each past hour."""
+    targets, depth = _latest_per_target(hourly, "snow_depth")
+    window = (targets >= now_hour - days * 24) & (targets <= now_hour)
+    targets, depth = targets[window], depth[window]
+    if len(targets) < 2 or targets[-1] - targets[0] < 24:
+        return None
+    return {"snow_depth_change_cm": round(float(depth[-1] - depth[0]) * 100, 1), # Open-Meteo depth is in m
+            "snow_depth_change_days": round(float(targets[-1] - targets[0]) / 24, 1)}
+
+def upcoming_hours(hourly: Dict[str, np.ndarray], now_hour: int) -> Optional[Dict[str, float]]:
+    """Freeze/thaw cycles and wind-hold hours in the newest forecast from `now_hour` on."""
+    if not len(hourly["fetch"]):
+        return None
+    rows = (hourly["fetch"] == hourly["fetch"].max()) & (hourly["target"] >= now_hour)
+    if not rows.any():
+        return None
+    order = np.argsort(hourly["target"][rows])
+    temperature = hourly["temperature_2m"][rows][order]
+    wind = np.fmax(hourly["wind_gusts_10m"][rows][order], hourly["wind_speed_10m"][rows][order])
+    # A cycle is a thaw followed by a refreeze
+    thawed = temperature > 0
+    cycles = np.count_nonzero(thawed[:-1] & (temperature[1:] <= 0))
+    return {"freeze_thaw_cycles_7d": int(cycles),
+            "wind_hold_hours_7d": int(np.count_nonzero(wind >= WIND_HOLD_KMH))}
+
+def forecast_trends(tables: Dict[str, Dict[str, np.ndarray]], utc_offset: int = 0,
+                    now: float = None) -> Dict[str, float]:
+    """Every trend the archive supports so far; keys are absent until there's enough history."""
+    now = time.time() if now is None else now
+    now_hour = int(now // SECONDS_PER_HOUR)
+    today = int((now + utc_offset) // (24 * SECONDS_PER_HOUR))
+    trends = {}
+    for result in (snowfall_delta(tables["daily"], today), snow_depth_trend(tables["hourly"], now_hour),
+                   upcoming_hours(tables["hourly"], now_hour)):
+        trends.update(result or {})
+    return trends
+
+_archive: Optional[ForecastArchive] = None
+
+def get_archive() -> ForecastArchive:
+    global _archive
+    if _archive is None:
+        _archive = ForecastArchive()
+    return _archive
+
+def set_archive(archive: Optional[ForecastArchive]):
+    """Replace the process-wide archive (None rebuilds it from the environment)."""
+    global _archive
+    _archive = archive
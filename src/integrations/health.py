@@ -0,0 +1,201 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from ..cache import env_seconds
+
+# Circuit breaker: a provider whose recent calls mostly fail, or that signals
+# rate limiting several times in a row, is skipped for a cool-down. After it,
+# one probe call is let through (half-open); success closes the circuit,
+# failure reopens it for twice as long (up to CIRCUIT_MAX_COOLDOWN).
+CIRCUIT_WINDOW = 10 # recent outcomes considered per provider
+CIRCUIT_MIN_CALLS = 4
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_RATE_LIMITS = 2 # consecutive rate-limit signals
+CIRCUIT_COOLDOWN = env_seconds("CIRCUIT_COOLDOWN", 30 * 60)
+CIRCUIT_MAX_COOLDOWN = env_seconds("CIRCUIT_MAX_COOLDOWN", 6 * 60 * 60)
+LATENCY_WINDOW = 50
+
+# Name of the state document the registry is persisted under
+HEALTH_DOCUMENT = "provider_health"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+OK, ERROR, RATE_LIMITED = "ok", "error", "rate_limited"
+
+# DDG answers rate limiting with "202 Ratelimit"; HTTP APIs with 429.
+_RATE_LIMIT_RE = re.compile(r"rate ?limit|too many requests|\b(202|429)\b", re.IGNORECASE)
+
+def is_rate_limit(error: BaseException) -> bool:
+    return bool(_RATE_LIMIT_RE.search(f"{type(error).__name__} {error}"))
+
+class LatencyWindow:
+    """Recent successful call latencies of one provider."""
+    def __init__(self, samples: List[float] = (), size: int = LATENCY_WINDOW):
+        self._samples = deque(samples, maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def to_list(self) -> List[float]:
+        with self._lock:
+            return [round(s, 3) for s in self._samples]
+
+class ProviderHealth:
+    """Counters, recent outcomes, latencies and circuit state of one provider."""
+    def __init__(self, name: str, data: Dict = None):
+        data = data or {}
+        self.name = name
+        self.calls = data.get("calls", 0)
+        self.errors = data.get("errors", 0)
+        self.rate_limited = data.get("rate_limited", 0)
+        self.recent = deque(data.get("recent", []), maxlen=CIRCUIT_WINDOW)
+        self.latency = LatencyWindow(data.get("latencies", []))
+        self.state = data.get("state", CLOSED)
+        self.opened_at = data.get("opened_at")
+        self.cooldown = data.get("cooldown", CIRCUIT_COOLDOWN)
+        self.reason = data.get("reason", "")
+        # A half-open probe only lives within one process
+        self.probing = False
+
+    def error_rate(self) -> float:
+        failures = sum(1 for outcome in self.recent if outcome != OK)
+        return failures / len(self.recent) if self.recent else 0.0
+
+    def _trip_reason(self) -> Optional[str]:
+        recent = list(self.recent)
+        if len(recent) >= CIRCUIT_RATE_LIMITS and all(o == RATE_LIMITED for o in recent[-CIRCUIT_RATE_LIMITS:]):
+            return f"{CIRCUIT_RATE_LIMITS} rate limits in a row"
+        if len(recent) >= CIRCUIT_MIN_CALLS and self.error_rate() >= CIRCUIT_ERROR_RATE:
+            return f"{self.error_rate():.0%} of the last {len(recent)} calls failed"
+        return None
+
+    def to_dict(self) -> Dict:
+        return {"calls": self.calls, "errors": self.errors, "rate_limited": self.rate_limited,
+                "recent": list(self.recent), "latencies": self.latency.to_list(), "state": self.state,
+                "opened_at": self.opened_at, "cooldown": self.cooldown, "reason": self.reason}
+
+    def summary(self, now: float) -> str:
+        p50, p95 = self.latency.percentile(50), self.latency.percentile(95)
+        latency = f", p50 {p50:.2f}s p95 {p95:.2f}s" if p50 is not None else ""
+        line = (f"{self.name}: {self.state} ({self.calls} calls, {self.errors} errors, "
+                f"{self.rate_limited} rate-limited, recent error rate {self.error_rate():.0%}{latency})")
+        if self.state == OPEN:
+            remaining = max(0.0, self.opened_at + self.cooldown - now)
+            line += f" - {self.reason}, retry in {remaining / 60:.0f}m"
+        return line
+
+class HealthRegistry:
+    """
+    Health of every search provider, shared by all threads and persisted with
+    the state between runs (`to_dict` / `from_dict`), so a provider that was
+    rate-limiting at the end of one run is skipped at the start of the next.
+    """
+    def __init__(self, providers: Dict[str, ProviderHealth] = None, clock: Callable[[], float] = time.time):
+        self._providers = dict(providers or {})
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: Dict, clock: Callable[[], float] = time.time) -> "HealthRegistry":
+        return cls({name: ProviderHealth(name, entry) for name, entry in (data or {}).items()}, clock)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {name: health.to_dict() for name, health in self._providers.items()}
+
+    def provider(self, name: str) -> ProviderHealth:
+        with self._lock:
+            return self._provider(name)
+
+    def _provider(self, name: str) -> ProviderHealth:
+        if name not in self._providers:
+            self._providers[name] = ProviderHealth(name)
+        return self._providers[name]
+
+    def available(self, name: str) -> bool:
+        """Whether `allow` could let a call through now, without claiming the probe."""
+        with self._lock:
+            health = self._provider(name)
+            if health.state == OPEN:
+                return self.clock() >= health.opened_at + health.cooldown
+            return health.state == CLOSED or not health.probing
+
+    def allow(self, name: str) -> bool:
+        """
+        Whether a call to `name` may go out now. Once an open circuit's
+        cool-down is over, exactly one caller gets through as the probe.
+        """
+        with self._lock:
+            health = self._provider(name)
+            if health.state == CLOSED:
+                return True
+            if health.state == OPEN and self.clock() >= health.opened_at + health.cooldown:
+                health.state = HALF_OPEN
+                print(f"Circuit for {name} half-open: probing")
+            if health.state == HALF_OPEN and not health.probing:
+                health.probing = True
+                return True
+            return False
+
+    def record(self, name: str, outcome: str, latency: float = None):
+        with self._lock:
+            health = self._provider(name)
+            health.calls += 1
+            health.errors += outcome != OK
+            health.rate_limited += outcome == RATE_LIMITED
+            health.recent.append(outcome)
+            if outcome == OK and latency is not None:
+                health.latency.record(latency)
+
+            if health.state == HALF_OPEN and health.probing:
+                health.probing = False
+                if outcome == OK:
+                    health.state, health.cooldown, health.reason = CLOSED, CIRCUIT_COOLDOWN, ""
+                    health.recent.clear()
+                    print(f"Circuit for {name} closed: probe succeeded")
+                else:
+                    self._open(health, "probe failed", min(health.cooldown * 2, CIRCUIT_MAX_COOLDOWN))
+            elif health.state == CLOSED:
+                reason = health._trip_reason()
+                if reason:
+                    self._open(health, reason, CIRCUIT_COOLDOWN)
+
+    def _open(self, health: ProviderHealth, reason: str, cooldown: float):
+        health.state, health.opened_at, health.cooldown, health.reason = OPEN, self.clock(), cooldown, reason
+        print(f"Circuit for {health.name} opened: {reason}; skipping it for {cooldown / 60:.0f}m")
+
+    def summary_lines(self) -> List[str]:
+        now = self.clock()
+        with self._lock:
+            return [health.summary(now) for _, health in sorted(self._providers.items())]
+
+_health: Optional[HealthRegistry] = None
+_health_lock = threading.Lock()
+
+def get_health() -> HealthRegistry:
+    global _health
+    with _health_lock:
+        if _health is None:
+            _health = HealthRegistry()
+        return _health
+
+def set_health(registry: Optional[HealthRegistry]):
+    """Replace the process-wide registry (e.g. with one loaded from the state). None resets it."""
+    global _health
+    with _health_lock:
+        _health = registry
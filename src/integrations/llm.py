@@ -1,77 +1,396 @@
 import time
 import re
-from typing import List, Dict, Tuple, Any
-import google.generativeai as genai
-from google.api_core import exceptions
+import json
+import hashlib
+import threading
+from typing import Callable, List, Dict, Tuple, Any, Optional
 import os
 from dotenv import load_dotenv
 
+from ..cache import get_cache, env_seconds
+from ..prompting import PromptBuilder, estimate_tokens
+from ..tracing import span, current_span
+from ..validation import BANNED_WORDS, StreamChecker
+from .ratelimit import RequestScheduler, RateLimitTimeout, backoff_delay
+
 load_dotenv()
 
-def _get_model():
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.5-flash')
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Which functions may answer from the response cache. Drafting bypasses it by
+# default so every run gets a fresh message; evaluation and review of an
+# identical prompt can safely be reused. Override with LLM_CACHE_FUNCTIONS.
+LLM_CACHE_POLICY = {
+    "generate_draft": False,
+    "review_draft": True,
+    "evaluate_discovery": True,
+    "generate_summary": False,
+}
+if os.getenv("LLM_CACHE_FUNCTIONS") is not None:
+    _enabled_functions = {f.strip() for f in os.getenv("LLM_CACHE_FUNCTIONS").split(",")}
+    LLM_CACHE_POLICY = {name: name in _enabled_functions for name in LLM_CACHE_POLICY}
+LLM_CACHE_TTL = env_seconds("LLM_CACHE_TTL", 24 * 60 * 60)
+
+_cache = get_cache("llm", max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200")))
+
+# Client-side quota, shared by every thread in the process.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "10"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "2"))
+# Lower runs first when calls compete for quota.
+LLM_PRIORITY = {
+    "generate_draft": 0,
+    "review_draft": 1,
+    "evaluate_discovery": 2,
+    "generate_summary": 3,
+}
+EXPECTED_OUTPUT_TOKENS = 800
+LLM_MAX_ATTEMPTS = 4
+LLM_MAX_RETRY_DELAY = 120
+LLM_MAX_QUEUE_WAIT = 300
+# Streamed drafts cut short by a hard lint violation are regenerated with the
+# violation as feedback; after this many aborts the next attempt runs unchecked.
+DRAFT_STREAM_RETRIES = 2
+# google.api_core.exceptions names, resolved once the SDK is loaded
+RETRYABLE_ERRORS = ("ServiceUnavailable", "DeadlineExceeded", "InternalServerError")
+
+# The Gemini SDK takes most of a second to import, so it is loaded on the
+# first call rather than at import time (most runs never reach an LLM stage).
+genai = None
+exceptions = None
+
+def _sdk():
+    global genai, exceptions
+    if genai is None:
+        import google.generativeai as _genai
+        genai = _genai
+    if exceptions is None:
+        from google.api_core import exceptions as _exceptions
+        exceptions = _exceptions
+    return genai, exceptions
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+class LLMError(Exception):
+    """A Gemini call failed; the caller decides whether to degrade or abort."""
+
+class LLMRateLimitError(LLMError):
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class LLMRequestError(LLMError):
+    """Non-quota failure (bad request, blocked prompt, network...)."""
 
-def _call_with_retry(model_method, *args, **kwargs):
+class StreamAborted(LLMError):
+    """A streamed response was cancelled because its text already failed a check."""
+    def __init__(self, violation: str, text: str, tokens_saved: int, ms_saved: float):
+        super().__init__(violation)
+        self.violation = violation
+        self.text = text
+        self.tokens_saved = tokens_saved
+        self.ms_saved = ms_saved
+
+class StreamStats:
+    """Run-wide counters for streamed drafts and what early aborts saved."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.aborted = 0
+        self.tokens_saved = 0
+        self.ms_saved = 0.0
+        self._output_tokens = 0
+
+    def record_completed(self, output_tokens: int):
+        with self._lock:
+            self.completed += 1
+            self._output_tokens += output_tokens
+
+    def record_abort(self, tokens_saved: int, ms_saved: float):
+        with self._lock:
+            self.aborted += 1
+            self.tokens_saved += tokens_saved
+            self.ms_saved += ms_saved
+
+    @property
+    def expected_output_tokens(self) -> int:
+        """Average length of completed drafts so far (the fixed estimate until there is one)."""
+        with self._lock:
+            return self._output_tokens // self.completed if self.completed else EXPECTED_OUTPUT_TOKENS
+
+    def summary(self) -> str:
+        return (f"{self.completed} completed, {self.aborted} aborted early "
+                f"(~{self.tokens_saved} output tokens, {self.ms_saved / 1000:.1f}s saved)")
+
+def get_scheduler() -> RequestScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(GEMINI_RPM, GEMINI_TPM, burst=GEMINI_BURST)
+        return _scheduler
+
+def set_scheduler(scheduler: Optional[RequestScheduler]):
+    """Replace the shared scheduler (None rebuilds it from the environment)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+def set_cache_policy(**policy: bool):
+    """Opt functions in or out of the response cache, e.g. set_cache_policy(generate_draft=True)."""
+    for name, enabled in policy.items():
+        if name not in LLM_CACHE_POLICY:
+            raise ValueError(f"Unknown LLM function '{name}'")
+        LLM_CACHE_POLICY[name] = enabled
+
+class LLMClient:
     """
-    Helper to call Gemini with a single retry if rate limited (429) 
-    and the delay is <= 2 minutes.
+    Long-lived Gemini client. The SDK is configured once and one GenerativeModel
+    is kept per model name, so every call reuses the same underlying service
+    client (and its pooled gRPC/HTTP connection) instead of rebuilding it.
     """
-    try:
-        return model_method(*args, **kwargs)
-    except exceptions.ResourceExhausted as e:
-        message = str(e)
-        # Extract delay from "Please retry in 53.527820394s." or similar
-        match = re.search(r"retry in (\d+\.?\d*)s", message)
-        
-        delay = 65 # Default to slightly over 1 minute if not found
-        if match:
-            delay = float(match.group(1))
-        
-        if delay <= 120:
-            print(f"Rate limited (429). Waiting {delay:.1f} seconds to retry...")
-            time.sleep(delay + 2) # Buffer
-            try:
-                return model_method(*args, **kwargs)
-            except Exception as e2:
-                # If it fails again, we return the error string as before to 'proceed'
-                return type('obj', (object,), {'text': f"Error after retry: {str(e2)}"})
+    def __init__(self, api_key: str = None, model_name: str = MODEL_NAME,
+                 generation_config: Optional[Dict] = None, transport: str = None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or {})
+        # "grpc" (SDK default) or "rest"
+        self.transport = transport or os.getenv("GEMINI_TRANSPORT") or None
+        self._models: Dict[str, Any] = {}
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        api_key = self.api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found")
+        kwargs = {"transport": self.transport} if self.transport else {}
+        _sdk()[0].configure(api_key=api_key, **kwargs)
+        self._configured = True
+
+    def model(self, model_name: str = None):
+        """Return the cached GenerativeModel for `model_name` (default model if omitted)."""
+        name = model_name or self.model_name
+        with self._lock:
+            if not self._configured:
+                self._configure()
+            if name not in self._models:
+                self._models[name] = _sdk()[0].GenerativeModel(name)
+            return self._models[name]
+
+    def merged_config(self, generation_config: Optional[Dict] = None) -> Optional[Dict]:
+        """Client defaults overlaid with per-call settings."""
+        config = {**self.generation_config, **(generation_config or {})}
+        return config or None
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict] = None, model_name: str = None,
+                         stream: bool = False):
+        config = self.merged_config(generation_config)
+        kwargs = {"generation_config": config} if config else {}
+        if stream:
+            kwargs["stream"] = True
+        return self.model(model_name).generate_content(prompt, **kwargs)
+
+_default_client: Optional[LLMClient] = None
+_default_client_lock = threading.Lock()
+
+def get_client() -> LLMClient:
+    """Process-wide default client, created on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+        return _default_client
+
+def set_client(client: Optional[LLMClient]):
+    """Replace the default client (e.g. with a fake in tests). None resets it."""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+def _cache_key(model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> str:
+    payload = json.dumps({"model": model_name, "prompt": prompt, "config": generation_config},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _usage(response) -> Dict[str, int]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_token_count": getattr(usage, "prompt_token_count", 0),
+        "candidates_token_count": getattr(usage, "candidates_token_count", 0),
+        "total_token_count": getattr(usage, "total_token_count", 0),
+    }
+
+def _generate(function_name: str, prompt: str, generation_config: Optional[Dict] = None,
+              client: LLMClient = None, stream_check: Callable[[], StreamChecker] = None,
+              stream_stats: StreamStats = None) -> str:
+    """
+    Send a prompt to Gemini, answering from the response cache when the calling
+    function is opted in. Failures raise LLMError and are never cached.
+    With `stream_check`, the response is streamed through a fresh checker and
+    cancelled (StreamAborted) at its first violation.
+    """
+    client = client or get_client()
+    with span(f"llm.{function_name}", **{"gen_ai.request.model": client.model_name}) as s:
+        use_cache = LLM_CACHE_POLICY.get(function_name, False)
+        key = _cache_key(client.model_name, prompt, client.merged_config(generation_config))
+        if use_cache:
+            cached = _cache.get(key)
+            s.set(cache_hit=cached is not None)
+            if cached is not None:
+                print(f"LLM cache hit for {function_name} ({cached['usage'].get('total_token_count', 0)} tokens saved).")
+                return cached["text"]
+
+        try:
+            client.model() # Fail fast on missing credentials instead of spending quota first
+        except ValueError as e:
+            raise LLMRequestError(f"{function_name}: {e}") from e
+        if stream_check is None:
+            response = _call_with_retry(function_name, client.generate_content, prompt, generation_config)
+            text = response.text
+            usage = _usage(response)
         else:
-            print(f"Rate limit delay too long ({delay:.1f}s). Proceeding without retry.")
-            return type('obj', (object,), {'text': f"Rate limit exceeded (delay {delay:.1f}s)."})
+            text, usage = _stream(function_name, client, prompt, generation_config, stream_check(),
+                                  stream_stats or StreamStats())
+        s.set(**{"gen_ai.usage.input_tokens": usage.get("prompt_token_count"),
+                 "gen_ai.usage.output_tokens": usage.get("candidates_token_count")})
+        if use_cache:
+            _cache.set(key, {"model": client.model_name, "text": text, "usage": usage}, LLM_CACHE_TTL)
+        return text
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text
+    except ValueError: # A chunk with no text part (e.g. only the finish reason)
+        return ""
+
+def _cancel_stream(response):
+    """Stop a streaming response: cancel the gRPC call, or close the REST iterator."""
+    iterator = getattr(response, "_iterator", None)
+    for name in ("cancel", "close"):
+        stop = getattr(iterator, name, None)
+        if callable(stop):
+            stop()
+            return
+
+def _stream(function_name: str, client: LLMClient, prompt: str, generation_config: Optional[Dict],
+            checker: StreamChecker, stats: StreamStats) -> Tuple[str, Dict[str, int]]:
+    """
+    Stream a response through `checker`. On a violation the request is
+    cancelled and StreamAborted reports roughly how many output tokens and
+    milliseconds the rest of the response would have taken.
+    """
+    start = time.perf_counter()
+    response = _call_with_retry(function_name, client.generate_content, prompt, generation_config, stream=True)
+    usage = {}
+    try:
+        for chunk in response:
+            usage = _usage(chunk) or usage
+            violation = checker.feed(_chunk_text(chunk))
+            if violation:
+                _cancel_stream(response)
+                elapsed = time.perf_counter() - start
+                generated = usage.get("candidates_token_count") or estimate_tokens(checker.text)
+                tokens_saved = max(0, stats.expected_output_tokens - generated)
+                ms_saved = tokens_saved * elapsed / generated * 1000 if generated else 0.0
+                stats.record_abort(tokens_saved, ms_saved)
+                trace = current_span()
+                if trace:
+                    trace.add_event("stream_aborted", violation=violation, tokens_generated=generated,
+                                    tokens_saved=tokens_saved, ms_saved=round(ms_saved))
+                raise StreamAborted(violation, checker.text, tokens_saved, ms_saved)
+    except StreamAborted:
+        raise
     except Exception as e:
-        return type('obj', (object,), {'text': f"Error: {str(e)}"})
+        raise LLMRequestError(f"{function_name}: stream failed: {e}") from e
+    stats.record_completed(usage.get("candidates_token_count") or estimate_tokens(checker.text))
+    return checker.text, usage
 
-def generate_draft(trip_name: str, phase_name: str, weather_data: Dict, insights: List[Any], 
-                   seen_trivia: List[str] = None, seen_challenges: List[str] = None) -> str:
+def _call_with_retry(function_name: str, model_method, prompt: str, *args, **kwargs):
     """
-    Drafts a high-energy WhatsApp message based on context.
+    Call Gemini through the shared scheduler. Requests are paced against the
+    RPM/TPM quota up front; a 429 pauses every caller (honouring the server's
+    "retry in Ns" hint) and the call is retried with jittered exponential
+    backoff. Raises LLMRateLimitError / LLMRequestError instead of returning
+    error text.
     """
-    model = _get_model()
-    
-    insights_str = "\n".join([f"- {i.title}: {i.content} ({i.url})" for i in insights])
-    
-    seen_trivia_str = ""
-    if seen_trivia and len(seen_trivia) > 0:
-        seen_trivia_str = "\n\nPREVIOUSLY SHARED TRIVIA (DO NOT REPEAT):\n" + "\n".join([f"- {t}" for t in seen_trivia[-10:]])
-    
-    seen_challenges_str = ""
-    if seen_challenges and len(seen_challenges) > 0:
-        seen_challenges_str = "\n\nPREVIOUSLY SHARED CHALLENGES (DO NOT REPEAT):\n" + "\n".join([f"- {c}" for c in seen_challenges[-10:]])
-    
-    prompt = f"""
+    errors = _sdk()[1]
+    retryable = tuple(getattr(errors, name) for name in RETRYABLE_ERRORS)
+    scheduler = get_scheduler()
+    priority = LLM_PRIORITY.get(function_name, max(LLM_PRIORITY.values()) + 1)
+    reserved = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+    last_error = None
+    trace = current_span()
+    queue_wait = 0.0
+
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        waited = time.perf_counter()
+        try:
+            scheduler.acquire(priority, reserved, timeout=LLM_MAX_QUEUE_WAIT)
+        except RateLimitTimeout as e:
+            raise LLMRateLimitError(f"{function_name}: {e}") from e
+        queue_wait += time.perf_counter() - waited
+        if trace:
+            trace.set(attempts=attempt + 1, queue_wait_s=round(queue_wait, 3))
+
+        try:
+            response = model_method(prompt, *args, **kwargs)
+        except errors.ResourceExhausted as e:
+            # Extract delay from "Please retry in 53.527820394s." or similar
+            match = re.search(r"retry in (\d+\.?\d*)s", str(e))
+            retry_after = float(match.group(1)) if match else None
+            delay = backoff_delay(attempt, retry_after=retry_after)
+            if delay > LLM_MAX_RETRY_DELAY:
+                raise LLMRateLimitError(f"{function_name}: rate limit delay too long ({delay:.1f}s)",
+                                        retry_after=delay) from e
+            print(f"Rate limited (429) in {function_name}. Pausing Gemini calls for {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{LLM_MAX_ATTEMPTS})...")
+            scheduler.pause(delay)
+            if trace:
+                trace.add_event("rate_limited", attempt=attempt + 1, delay_s=round(delay, 3))
+            last_error = LLMRateLimitError(f"{function_name}: {e}", retry_after=delay)
+            continue
+        except retryable as e:
+            # Backed off through the scheduler like a 429: the retry queues again in
+            # priority order, and other callers hold off while Gemini is struggling.
+            delay = backoff_delay(attempt)
+            print(f"Transient Gemini error in {function_name}: {e}. Pausing Gemini calls for {delay:.1f}s...")
+            if trace:
+                trace.add_event("retry", attempt=attempt + 1, error=type(e).__name__, delay_s=round(delay, 3))
+            scheduler.pause(delay)
+            last_error = LLMRequestError(f"{function_name}: {e}")
+            continue
+        except Exception as e:
+            raise LLMRequestError(f"{function_name}: {e}") from e
+
+        scheduler.record_usage(reserved, _usage(response).get("total_token_count", 0))
+        return response
+
+    raise last_error
+
+_SHARED_LIST_HEADERS = {
+    "seen_trivia": "PREVIOUSLY SHARED TRIVIA (DO NOT REPEAT)",
+    "seen_challenges": "PREVIOUSLY SHARED CHALLENGES (DO NOT REPEAT)",
+}
+
+def _render_shared_list(name: str, items: List[str]) -> str:
+    if not items:
+        return ""
+    return f"\n\n{_SHARED_LIST_HEADERS[name]}:\n" + "\n".join([f"- {item}" for item in items])
+
+DRAFT_TEMPLATE = """
     You are Brrrnando, a thrilling and high-energy ski trip assistant.
     Your job is to draft an atmospheric and data-dense WhatsApp message for the group '{trip_name}'.
     
     CURRENT PHASE: {phase_name}
     WEATHER DATA: {weather_data}
     LOCAL INSIGHTS:
-    {insights_str}
-    {seen_trivia_str}
-    {seen_challenges_str}
+    {insights}
+    {seen_trivia}
+    {seen_challenges}
+    {feedback}
     
     If CURRENT PHASE is 'active', you MUST include a special engagement section at the end:
     EITHER '--- 🏆 BRRRNANDO'S DAILY CHALLENGE ---' (a fun, safe physical or social task)
@@ -85,22 +404,59 @@ def generate_draft(trip_name: str, phase_name: str, weather_data: Dict, insights
     3. Venue & Insights: You MUST mention at least one specific restaurant, bar, or local venue by name from 'LOCAL INSIGHTS' if available.
     4. Sourcing: aim to include at least one link/URL from 'LOCAL INSIGHTS' if available. Must if trip is 'active'.
     5. Anti-Filler: BAN generic paragraphs that contain no data (e.g., "The excitement is building..."). Every sentence must either deliver data or a specific local fact.
-    6. Banned Words: NEVER use "Legends", "Magic", "Wooohooo", "CHOO CHOO", "EPIC", "Woooooow".
+    6. Banned Words: NEVER use {banned}.
     7. Format: Use WhatsApp formatting (bolding, short paragraphs). Keep it punchy.
     8. DO NOT use placeholders.
     9. Ensure challenges/trivia are hyper-specific to {trip_name}.
     """
+
+def _draft_prompt(trip_name: str, phase_name: str, weather_data: Dict, insights: List[Any],
+                  seen_trivia: List[str] = None, seen_challenges: List[str] = None,
+                  feedback: List[str] = None) -> str:
+    feedback_str = ""
+    if feedback:
+        feedback_str = "\n\nYOUR PREVIOUS DRAFT WAS REJECTED. FIX ALL OF THESE:\n" + "\n".join([f"- {f}" for f in feedback])
     
-    response = _call_with_retry(model.generate_content, prompt)
-    return response.text
+    banned_str = ", ".join(f'"{w}"' for w in BANNED_WORDS)
+    fixed = {"trip_name": trip_name, "phase_name": phase_name, "weather_data": weather_data,
+             "feedback": feedback_str, "banned": banned_str}
+    lists = {"seen_trivia": (seen_trivia or [])[-10:], "seen_challenges": (seen_challenges or [])[-10:]}
+    return PromptBuilder("generate_draft").build(DRAFT_TEMPLATE, fixed, insights, lists=lists,
+                                                 render_list=_render_shared_list).text
+
+def generate_draft(trip_name: str, phase_name: str, weather_data: Dict, insights: List[Any], 
+                   seen_trivia: List[str] = None, seen_challenges: List[str] = None,
+                   client: LLMClient = None, feedback: List[str] = None,
+                   stream: bool = False, stream_stats: StreamStats = None) -> str:
+    """
+    Drafts a high-energy WhatsApp message based on context.
+    `feedback` lists problems found in a previous attempt that must be fixed.
 
-def review_draft(draft: str, trip_name: str, phase_name: str) -> Tuple[bool, str]:
+    With `stream`, the draft is checked while it is generated: a placeholder
+    or banned word cancels the request and it is retried right away with the
+    violation as feedback. After DRAFT_STREAM_RETRIES aborts, the next attempt
+    runs to completion and is left to the regular lint/review loop.
+    """
+    feedback = list(feedback or [])
+    for _ in range(DRAFT_STREAM_RETRIES if stream else 0):
+        prompt = _draft_prompt(trip_name, phase_name, weather_data, insights, seen_trivia, seen_challenges, feedback)
+        try:
+            return _generate("generate_draft", prompt, client=client, stream_check=StreamChecker,
+                             stream_stats=stream_stats)
+        except StreamAborted as e:
+            print(f"Draft for {trip_name} aborted mid-stream: {e.violation} "
+                  f"(~{e.tokens_saved} tokens, {e.ms_saved:.0f} ms saved). Retrying.")
+            feedback.append(e.violation)
+
+    prompt = _draft_prompt(trip_name, phase_name, weather_data, insights, seen_trivia, seen_challenges, feedback)
+    return _generate("generate_draft", prompt, client=client)
+
+def review_draft(draft: str, trip_name: str, phase_name: str, client: LLMClient = None) -> Tuple[bool, str]:
     """
     Reviews the draft for quality, clarity, and presence of placeholders.
     Returns (is_approved, finalized_content_or_feedback).
     """
-    model = _get_model()
-    
+
     prompt = f"""
     Review the following WhatsApp message draft for the trip '{trip_name}' in phase '{phase_name}'.
     
@@ -118,8 +474,7 @@ def review_draft(draft: str, trip_name: str, phase_name: str) -> Tuple[bool, str
     If it needs fixes, respond with 'REVISE' followed by specific instructions for the drafter.
     """
     
-    response = _call_with_retry(model.generate_content, prompt)
-    result = response.text.strip()
+    result = _generate("review_draft", prompt, client=client).strip()
     
     if result.startswith("APPROVED"):
         # Extract the message part
@@ -130,19 +485,11 @@ def review_draft(draft: str, trip_name: str, phase_name: str) -> Tuple[bool, str
     
     return False, result
 
-def evaluate_discovery(trip_name: str, insights: List[Any]) -> List[str]:
-    """
-    Evaluates the current insights and returns a list of specific follow-up queries
-    if more information is needed (e.g., webcams, specific menus).
-    """
-    model = _get_model()
-    insights_summary = "\n".join([f"- {i.title}: {i.content[:200]}" for i in insights])
-    
-    prompt = f"""
+EVALUATE_TEMPLATE = """
     You are Brrrnando's Discovery Brain. Analyze the current findings for the ski resort '{trip_name}'.
     
     CURRENT INSIGHTS:
-    {insights_summary}
+    {insights}
     
     TASK:
     Determine if we have enough "flavor" for a feature-packed report. We ideally want:
@@ -156,9 +503,24 @@ def evaluate_discovery(trip_name: str, insights: List[Any]) -> List[str]:
     Format your response as a JSON list of strings if you need more, or just the word 'ENOUGH'.
     Example: ["Livigno Bivio Club menu", "Livigno mottolino webcam live"]
     """
+
+def _snippet_line(insight: Any, content: str) -> str:
+    return f"- {insight.title}: {content[:200]}"
+
+def evaluate_discovery(trip_name: str, insights: List[Any], client: LLMClient = None) -> List[str]:
+    """
+    Evaluates the current insights and returns a list of specific follow-up queries
+    if more information is needed (e.g., webcams, specific menus).
+    """
+    prompt = PromptBuilder("evaluate_discovery").build(EVALUATE_TEMPLATE, {"trip_name": trip_name}, insights,
+                                                       line=_snippet_line).text
     
-    response = _call_with_retry(model.generate_content, prompt)
-    text = response.text.strip()
+    try:
+        text = _generate("evaluate_discovery", prompt, client=client).strip()
+    except LLMError as e:
+        # Follow-up queries are optional; draft with what we have
+        print(f"Discovery evaluation unavailable: {e}")
+        return []
     
     if "ENOUGH" in text.upper():
         return []
@@ -174,10 +536,8 @@ def evaluate_discovery(trip_name: str, insights: List[Any]) -> List[str]:
     
     return []
 
-def generate_summary(prompt: str) -> str:
+def generate_summary(prompt: str, client: LLMClient = None) -> str:
     """
     Legacy summary function.
     """
-    model = _get_model()
-    response = _call_with_retry(model.generate_content, prompt)
-    return response.text
+    return _generate("generate_summary", prompt, client=client)
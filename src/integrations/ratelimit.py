@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+class RateLimitTimeout(Exception):
+    """Raised when a request can't get quota within its timeout."""
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate_per_minute`, holds at most `capacity`.
+    The level may go negative when actual usage turns out higher than reserved,
+    which simply delays the next requests.
+    """
+    def __init__(self, rate_per_minute: float, capacity: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.clock = clock
+        self.level = self.capacity
+        self._updated = clock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float = None) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float = None):
+        now = self.clock() if now is None else now
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Correct a reservation once the real cost is known (positive delta = more used)."""
+        self.level = min(self.capacity, self.level - delta)
+
+class RequestScheduler:
+    """
+    Process-wide pacing for one API quota. Callers reserve a request and an
+    estimated token count; they are served strictly in priority order (lower
+    first, FIFO within a priority) as soon as both buckets allow it. A 429 from
+    the server pauses everyone via `pause()`, so concurrent trips back off
+    together instead of each hammering the API.
+    """
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, capacity=burst, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.total_wait = 0.0
+
+    def acquire(self, priority: int, tokens: int = 0, timeout: float = None) -> float:
+        """
+        Block until this caller may send a request. Returns the seconds waited.
+        """
+        start = self.clock()
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = self.clock()
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = max(self._paused_until - now,
+                                   self.requests.wait_time(1, now),
+                                   self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1, now)
+                            self.tokens.take(tokens, now)
+                            waited = now - start
+                            self.total_wait += waited
+                            return waited
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0 or (wait is not None and wait > remaining):
+                            raise RateLimitTimeout(f"No quota within {timeout:.0f}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds` (e.g. after a 429)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+            self._cond.notify_all()
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: int):
+        """Charge the difference between the reserved and the actual token cost."""
+        if not actual_tokens:
+            return
+        with self._cond:
+            self.tokens.adjust(actual_tokens - reserved_tokens)
+            self._cond.notify_all()
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0, retry_after: Optional[float] = None) -> float:
+    """
+    Jittered exponential backoff. A server-provided retry delay is treated as a
+    lower bound.
+    """
+    delay = min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
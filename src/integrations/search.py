@@ -1,11 +1,143 @@
+import contextvars
 import os
-from duckduckgo_search import DDGS
-from typing import List, Dict
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import List, Dict, Optional, Callable, Tuple
 from dotenv import load_dotenv
 
+from ..cache import get_cache, env_seconds
+from ..tracing import span, current_span
+from .health import OK, ERROR, RATE_LIMITED, get_health, is_rate_limit
+
 load_dotenv()
 
-def _tavily_search(query: str, max_results: int = 3, search_depth: str = "basic") -> List[Dict[str, str]]:
+DEFAULT_SEARCH_TTL = env_seconds("SEARCH_CACHE_TTL", 6 * 60 * 60)
+# Empty answers are cached briefly so a provider that just returned nothing
+# is skipped straight to the fallback on the next identical query.
+NEGATIVE_SEARCH_TTL = env_seconds("SEARCH_CACHE_NEGATIVE_TTL", 30 * 60)
+
+_cache = get_cache("search", max_entries=2000)
+
+# Hedging: if the preferred provider hasn't answered by the SEARCH_HEDGE_PERCENTILE
+# of its recent latencies, the next provider is started alongside it and the
+# first non-empty answer wins. SEARCH_HEDGE=off falls back only after a failure.
+SEARCH_HEDGE = os.getenv("SEARCH_HEDGE", "on").lower() not in ("off", "0", "false")
+SEARCH_HEDGE_PERCENTILE = float(os.getenv("SEARCH_HEDGE_PERCENTILE", "90"))
+# Deadline until a provider has enough samples, and the cap on the learned one
+# (a provider that is slow every time would otherwise never be hedged).
+SEARCH_HEDGE_DELAY = env_seconds("SEARCH_HEDGE_DELAY", 2.0)
+SEARCH_HEDGE_MIN_DELAY = 0.25
+MIN_LATENCY_SAMPLES = 10
+
+# duckduckgo_search is imported on first use, like Tavily, so importing this
+# module (and the pipeline) stays cheap.
+DDGS = None
+
+def _ddgs():
+    global DDGS
+    if DDGS is None:
+        from duckduckgo_search import DDGS as _DDGS
+        DDGS = _DDGS
+    return DDGS()
+
+# A provider returns a list of normalized results, None if it can't be asked
+# (missing credentials), or raises on failure. Failures are recorded in the
+# provider health registry and never cached.
+Provider = Callable[[str, int, Optional[str]], Optional[List[Dict[str, str]]]]
+
+def hedge_deadline(provider: str, percentile: float = None) -> float:
+    """Seconds to wait on `provider` before hedging: a percentile of its recent latencies, within bounds."""
+    percentile = SEARCH_HEDGE_PERCENTILE if percentile is None else percentile
+    latency = get_health().provider(provider).latency
+    if len(latency) < MIN_LATENCY_SAMPLES:
+        return SEARCH_HEDGE_DELAY
+    return min(max(latency.percentile(percentile), SEARCH_HEDGE_MIN_DELAY), SEARCH_HEDGE_DELAY)
+
+def _submit(func, *args) -> Future:
+    """
+    Run a provider call on its own daemon thread, inside the caller's trace
+    context. Not a pool: a slow call that lost a race must never hold up the
+    next one (or interpreter exit). How many calls reach a provider at once
+    is bounded by its slots instead.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(func, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="search", daemon=True).start()
+    return future
+
+# Live calls per provider: at most `_concurrency` run at once (the rest wait
+# for a slot), counted from submission until they finish. Calls still running
+# after their race was won elsewhere are "abandoned".
+DEFAULT_SEARCH_CONCURRENCY = 3
+_concurrency = DEFAULT_SEARCH_CONCURRENCY
+_slots: Dict[str, threading.BoundedSemaphore] = {}
+_running: Counter = Counter()
+_abandoned: Counter = Counter()
+_slots_lock = threading.Lock()
+
+def set_concurrency(limit: Optional[int]):
+    """
+    Calls each provider may have in flight, normally the run's `search` stage
+    limit. Calls already holding a slot keep it; new ones use the new size.
+    None restores the default.
+    """
+    global _concurrency
+    with _slots_lock:
+        _concurrency = max(1, limit or DEFAULT_SEARCH_CONCURRENCY)
+        _slots.clear()
+
+def _slot(provider: str) -> threading.BoundedSemaphore:
+    with _slots_lock:
+        if provider not in _slots:
+            _slots[provider] = threading.BoundedSemaphore(_concurrency)
+        return _slots[provider]
+
+def _busy(provider: str) -> Tuple[int, int]:
+    """(running, abandoned) live calls of `provider`."""
+    with _slots_lock:
+        return _running[provider], _abandoned[provider]
+
+def _finish(counter: Counter, provider: str):
+    with _slots_lock:
+        counter[provider] -= 1
+
+def _with_slot(provider: str, call: Callable[[], Optional[List[Dict[str, str]]]]):
+    with _slot(provider):
+        return call()
+
+def _start(name: str, call: Callable[[], Optional[List[Dict[str, str]]]], live: bool) -> Future:
+    if not live:
+        return _submit(call)
+    with _slots_lock:
+        _running[name] += 1
+    future = _submit(_with_slot, name, call)
+    future.add_done_callback(lambda _: _finish(_running, name))
+    return future
+
+def _abandon(name: str, future: Future):
+    with _slots_lock:
+        _abandoned[name] += 1
+    future.add_done_callback(lambda _: _finish(_abandoned, name))
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+def _cache_key(provider: str, kind: str, query: str, max_results: int, timelimit: Optional[str]) -> str:
+    return f"{provider}|{kind}|{normalize_query(query)}|{max_results}|{timelimit or ''}"
+
+def _tavily_search(query: str, max_results: int = 3, search_depth: str = "basic",
+                   raise_errors: bool = False) -> List[Dict[str, str]]:
     """
     Fallback search using Tavily API.
     """
@@ -14,12 +146,12 @@ def _tavily_search(query: str, max_results: int = 3, search_depth: str = "basic"
         print("⚠️ Tavily API key not found. Skipping fallback.")
         return []
 
-    print(f"🔄 DDG failed. Calling Tavily fallback for: {query}...")
+    print(f"🔄 Calling Tavily for: {query}...")
     try:
         from tavily import TavilyClient
         tavily = TavilyClient(api_key=api_key)
         response = tavily.search(query=query, search_depth=search_depth, max_results=max_results)
-        
+
         results = []
         for r in response.get("results", []):
             results.append({
@@ -30,32 +162,174 @@ def _tavily_search(query: str, max_results: int = 3, search_depth: str = "basic"
         print(f"✅ Tavily search successful. Found {len(results)} results.")
         return results
     except Exception as e:
+        if raise_errors: # The caller reports it
+            raise
         print(f"❌ Error searching Tavily: {e}")
         return []
 
-def search_web(query: str, max_results: int = 3) -> List[Dict[str, str]]:
+def _ddg_text(query: str, max_results: int, timelimit: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    results = _ddgs().text(query, max_results=max_results, timelimit=timelimit)
+    return [{"title": r["title"], "href": r["href"], "body": r["body"]} for r in results or []]
+
+def _ddg_videos(query: str, max_results: int, timelimit: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    results = _ddgs().videos(query, max_results=max_results, timelimit=timelimit)
+    return [{"title": r["title"], "content": r["content"], "description": r.get("description", "")}
+            for r in results or []]
+
+def _tavily_text(query: str, max_results: int, timelimit: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    if not os.getenv("TAVILY_API_KEY"):
+        print("⚠️ Tavily API key not found. Skipping fallback.")
+        return None
+    return _tavily_search(query, max_results=max_results, raise_errors=True)
+
+def _tavily_videos(query: str, max_results: int, timelimit: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    results = _tavily_text(query + " video", max_results, timelimit)
+    if results is None:
+        return None
+    # Same shape as DDG video results
+    return [{"title": r["title"], "content": r["href"], "description": r["body"]} for r in results]
+
+def _call_provider(name: str, provider: Provider, key: str, query: str, max_results: int,
+                   timelimit: Optional[str], ttl: float, force: bool = False) -> Optional[List[Dict[str, str]]]:
+    """
+    One live provider call, unless the provider's circuit is open (`force`
+    overrides that). The outcome goes to the health registry, and the answer
+    is cached here rather than by the caller, so a provider that loses a
+    hedged race still fills the cache.
+    """
+    health = get_health()
+    with span("search.provider", provider=name, cache="miss") as p:
+        if not force and not health.allow(name):
+            p.set(circuit="open")
+            return None
+        start = time.perf_counter()
+        try:
+            results = provider(query, max_results, timelimit)
+        except Exception as e:
+            outcome = RATE_LIMITED if is_rate_limit(e) else ERROR
+            print(f"Error searching ({name}): {e}")
+            health.record(name, outcome)
+            p.set(error=True, outcome=outcome)
+            return None
+        if results is None:
+            p.set(error=True)
+            return None
+        health.record(name, OK, time.perf_counter() - start)
+        p.set(results=len(results))
+        _cache.set(key, results, ttl if results else min(ttl, NEGATIVE_SEARCH_TTL))
+        return results
+
+def _race(calls: List[Tuple[str, Callable[[], Optional[List[Dict[str, str]]]], bool]],
+          hedge: bool) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    Run provider calls (name, call, live) in preference order and return the
+    first non-empty answer as (provider, results). The next call starts when
+    the running ones have all failed or come back empty, or, with `hedge`,
+    when the newest one has run past its deadline. Calls still running when
+    a winner is found finish in the background and only fill the cache.
+
+    Live calls never stack up on a struggling provider: one with an abandoned
+    call still running is skipped while another provider remains, and a
+    hedge is only sent to a provider with no call in flight.
+    """
+    trace = current_span()
+    pending: Dict[Future, Tuple[str, bool]] = {}
+    remaining = list(calls)
+
+    def start_next() -> str:
+        while True:
+            name, call, live = remaining.pop(0)
+            if live and remaining and _busy(name)[1]:
+                print(f"Search skipping {name}: an earlier call to it is still running")
+                continue
+            pending[_start(name, call, live)] = (name, live)
+            return name
+
+    newest = start_next()
+    while pending:
+        timeout = hedge_deadline(newest) if hedge and remaining else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            name, _, live = remaining[0]
+            if live and _busy(name)[0]:
+                # Kept as the fallback if the running calls fail
+                print(f"Search not hedged: {name} already has a call in flight")
+                hedge = False
+                continue
+            hedged = start_next()
+            print(f"Search hedged: {newest} slower than {timeout:.2f}s, also asking {hedged}")
+            if trace:
+                trace.add_event("hedged", slow=newest, started=hedged, after_s=round(timeout, 3))
+            newest = hedged
+            continue
+        for future in done:
+            name, _ = pending.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Error searching ({name}): {e}")
+                results = None
+            if results:
+                for loser, (loser_name, live) in pending.items():
+                    if live:
+                        _abandon(loser_name, loser)
+                return name, results
+        if not pending and remaining:
+            newest = start_next()
+    return None, []
+
+def _cached_search(kind: str, query: str, max_results: int, timelimit: Optional[str], ttl: Optional[float],
+                   providers: List[Tuple[str, Provider]], hedge: bool = None) -> List[Dict[str, str]]:
+    """
+    Answer from the cache of the first provider that has a non-empty entry;
+    otherwise race the rest through `_race`. Providers with a fresh empty
+    answer cached are skipped, and a later provider's cached answer stands in
+    for its live call. Providers whose circuit is open are left out while
+    another one can be asked; if none can, they are all tried anyway.
+    """
+    ttl = DEFAULT_SEARCH_TTL if ttl is None else ttl
+    hedge = SEARCH_HEDGE if hedge is None else hedge
+    health = get_health()
+    with span("search", kind=kind, query=query) as s:
+        calls = []
+        available = {name: health.available(name) for name, _ in providers}
+        force = not any(available.values())
+        unavailable = [name for name, ok in available.items() if not ok and not force]
+        if unavailable:
+            s.set(circuit_open=",".join(unavailable))
+        for name, provider in providers:
+            key = _cache_key(name, kind, query, max_results, timelimit)
+            cached = _cache.get(key)
+            if cached is not None:
+                with span("search.provider", provider=name, cache="hit" if cached else "negative",
+                          results=len(cached)):
+                    pass
+                if cached and not calls:
+                    s.set(provider=name, results=len(cached))
+                    return cached
+                if cached: # Still the answer if the providers before it fail
+                    calls.append((name, lambda cached=cached: cached, False))
+                continue
+            if name in unavailable:
+                continue
+            calls.append((name, lambda name=name, provider=provider, key=key:
+                          _call_provider(name, provider, key, query, max_results, timelimit, ttl, force), True))
+        winner, results = _race(calls, hedge) if calls else (None, [])
+        s.set(provider=winner, results=len(results))
+        return results
+
+def search_web(query: str, max_results: int = 3, timelimit: str = None, ttl: float = None) -> List[Dict[str, str]]:
     """
     Search the web for text results using DDG, fallback to Tavily on error.
+    Results are cached for `ttl` seconds (SEARCH_CACHE_TTL by default).
     """
-    try:
-        results = DDGS().text(query, max_results=max_results)
-        if not results:
-            return _tavily_search(query, max_results=max_results)
-        return [{"title": r["title"], "href": r["href"], "body": r["body"]} for r in results]
-    except Exception as e:
-        print(f"Error searching web (DDG): {e}")
-        # Only fallback to 202 Ratelimit or similar connection errors
-        return _tavily_search(query, max_results=max_results)
+    return _cached_search("text", query, max_results, timelimit, ttl,
+                          [("ddg", _ddg_text), ("tavily", _tavily_text)])
 
-def search_videos(query: str, max_results: int = 3, timelimit: str = None) -> List[Dict[str, str]]:
+def search_videos(query: str, max_results: int = 3, timelimit: str = None, ttl: float = None) -> List[Dict[str, str]]:
     """
     Search for videos using DDG, fallback to Tavily web search on error.
+    Results are cached for `ttl` seconds (SEARCH_CACHE_TTL by default).
     """
-    try:
-        results = DDGS().videos(query, max_results=max_results, timelimit=timelimit)
-        if not results:
-             return _tavily_search(query + " video", max_results=max_results)
-        return [{"title": r["title"], "content": r["content"], "description": r.get("description", "")} for r in results]
-    except Exception as e:
-        print(f"Error searching videos (DDG): {e}")
-        return _tavily_search(query + " video", max_results=max_results)
+    return _cached_search("videos", query, max_results, timelimit, ttl,
+                          [("ddg", _ddg_videos), ("tavily", _tavily_videos)])
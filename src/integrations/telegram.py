@@ -2,6 +2,8 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from .transport import get_transport
+
 load_dotenv()
 
 def send_telegram_message(message: str, chat_id: str = None):
@@ -23,7 +25,7 @@ def send_telegram_message(message: str, chat_id: str = None):
     }
     
     try:
-        response = requests.post(url, json=data, timeout=10)
+        response = get_transport().post(url, json=data)
         print(f"Telegram API Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -0,0 +1,244 @@
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..tracing import span
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30.0
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+class ResponseTooLarge(requests.RequestException):
+    """The response body exceeded the transport's size limit."""
+
+class LatencyHistogram:
+    """Request latencies of one host; shared by every thread talking to it."""
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.total += seconds
+            self.errors += error
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Bucket upper bound containing the q-quantile (None if empty, inf if past the last bucket)."""
+        with self._lock:
+            counts = list(self.counts)
+        n = sum(counts)
+        if not n:
+            return None
+        rank = q * n
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + [float("inf")], counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            counts, total, errors = list(self.counts), self.total, self.errors
+        return {
+            "count": sum(counts),
+            "errors": errors,
+            "sum_seconds": round(total, 4),
+            "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], counts)),
+        }
+
+def parse_overrides(spec: Optional[str]) -> Dict[str, str]:
+    """
+    Parse "host=http://127.0.0.1:8001,other.host=http://127.0.0.1:8002" into a dict.
+    """
+    overrides = {}
+    for part in (spec or "").split(","):
+        host, _, target = part.strip().partition("=")
+        if host and target:
+            overrides[host] = target.rstrip("/")
+    return overrides
+
+class HttpTransport:
+    """
+    Shared HTTP client for all integrations: one pooled keep-alive Session per
+    host, connect/read timeouts, idempotency-aware retries with jittered
+    backoff, a response size cap and per-host latency histograms.
+
+    `host_overrides` maps a real host to a base URL (e.g. a local fake server),
+    which is how tests and benchmarks redirect traffic without touching the
+    integrations.
+    """
+    def __init__(self, connect_timeout: float = None, read_timeout: float = None, max_retries: int = None,
+                 backoff: float = 0.5, max_response_bytes: int = None, pool_size: int = 10,
+                 host_overrides: Dict[str, str] = None):
+        self.connect_timeout = connect_timeout or _env_float("HTTP_CONNECT_TIMEOUT", 3.05)
+        self.read_timeout = read_timeout or _env_float("HTTP_READ_TIMEOUT", 10.0)
+        self.max_retries = max_retries if max_retries is not None else int(_env_float("HTTP_MAX_RETRIES", 2))
+        self.backoff = backoff
+        self.max_response_bytes = max_response_bytes or int(_env_float("HTTP_MAX_RESPONSE_BYTES", 5 * 1024 * 1024))
+        self.pool_size = pool_size
+        self.host_overrides = host_overrides if host_overrides is not None else \
+            parse_overrides(os.getenv("BRRRNANDO_HTTP_OVERRIDES"))
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _histogram(self, host: str) -> LatencyHistogram:
+        with self._lock:
+            return self.histograms.setdefault(host, LatencyHistogram())
+
+    def _rewrite(self, url: str) -> str:
+        parts = urlsplit(url)
+        target = self.host_overrides.get(parts.hostname or "")
+        if not target:
+            return url
+        base = urlsplit(target)
+        return urlunsplit((base.scheme, base.netloc, base.path + parts.path, parts.query, parts.fragment))
+
+    def _read_limited(self, response: requests.Response) -> requests.Response:
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_response_bytes:
+            response.close()
+            raise ResponseTooLarge(f"Response of {declared} bytes exceeds {self.max_response_bytes}",
+                                   response=response)
+        chunks: List[bytes] = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_response_bytes:
+                response.close()
+                raise ResponseTooLarge(f"Response exceeds {self.max_response_bytes} bytes", response=response)
+            chunks.append(chunk)
+        # Make .text / .json() work on the already-consumed body
+        response._content = b"".join(chunks)
+        return response
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), MAX_RETRY_AFTER))
+            except ValueError:
+                pass
+        return delay
+
+    def request(self, method: str, url: str, idempotent: bool = None, timeout=None, **kwargs) -> requests.Response:
+        """
+        Send a request. Idempotent requests are retried on connection errors,
+        timeouts and 429/5xx; non-idempotent ones (POST) only when the request
+        provably never reached the server (connect timeout) or was rejected
+        with 429. Returns the final response; callers still call raise_for_status().
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        url = self._rewrite(url)
+        host = urlsplit(url).netloc
+        session = self._session(host)
+        histogram = self._histogram(host)
+        timeout = timeout or (self.connect_timeout, self.read_timeout)
+
+        with span("http.request", **{"http.request.method": method, "server.address": host}) as s:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                response = None
+                try:
+                    response = session.request(method, url, timeout=timeout, stream=True, **kwargs)
+                    response = self._read_limited(response)
+                except requests.RequestException as e:
+                    histogram.observe(time.perf_counter() - start, error=True)
+                    safe = idempotent or isinstance(e, requests.ConnectTimeout)
+                    if attempt >= self.max_retries or not safe or isinstance(e, ResponseTooLarge):
+                        s.set(attempts=attempt + 1)
+                        raise
+                    outcome = type(e).__name__
+                else:
+                    histogram.observe(time.perf_counter() - start)
+                    status = response.status_code
+                    retryable = status in RETRY_STATUSES and (idempotent or status == 429)
+                    if not retryable or attempt >= self.max_retries:
+                        s.set(**{"http.response.status_code": status, "attempts": attempt + 1,
+                                 "http.response.body.size": len(response.content)})
+                        return response
+                    outcome = status
+                delay = self._retry_delay(attempt, response)
+                s.add_event("retry", attempt=attempt + 1, outcome=str(outcome), delay_s=round(delay, 3))
+                time.sleep(delay)
+                attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: h.to_dict() for host, h in self.histograms.items()}
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = list(self.histograms.items())
+        for host, h in items:
+            p50, p95 = h.quantile(0.5), h.quantile(0.95)
+            lines.append(f"{host}: {h.count} requests, {h.errors} errors, "
+                         f"p50 <= {p50}s, p95 <= {p95}s, total {h.total:.2f}s")
+        return lines
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> HttpTransport:
+    """Process-wide transport, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
+
+def set_transport(transport: Optional[HttpTransport]):
+    """Swap the shared transport (e.g. one pointed at a fake server). None resets it."""
+    global _transport
+    with _transport_lock:
+        _transport = transport
@@ -1,26 +1,138 @@
+import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
-def get_weather_data(lat: float, lon: float, elevation: int = None) -> Dict[str, Any]:
+from ..cache import get_cache, env_seconds
+from .transport import get_transport
+from ..tracing import span
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+# Variables requested per response block.
+BLOCK_VARIABLES = {
+    "current": "temperature_2m,wind_speed_10m,snowfall,snow_depth",
+    "daily": "snowfall_sum,wind_speed_10m_max",
+    "hourly": "temperature_2m,snowfall,snow_depth,wind_speed_10m,wind_gusts_10m",
+}
+# Open-Meteo accepts comma-separated coordinate lists; keep URLs a sane length.
+MAX_POINTS_PER_REQUEST = 50
+
+# Conditions go stale quickly; the 7-day forecast is shared by the morning
+# and evening runs of the same day.
+BLOCK_TTLS = {
+    "current": env_seconds("WEATHER_CACHE_CURRENT_TTL", 60 * 60),
+    "daily": env_seconds("WEATHER_CACHE_DAILY_TTL", 12 * 60 * 60),
+    "hourly": env_seconds("WEATHER_CACHE_HOURLY_TTL", 12 * 60 * 60),
+}
+COORD_PRECISION = 2 # ~1km, well below the model grid resolution
+
+# (lat, lon, elevation). Elevation None lets Open-Meteo use its own terrain model.
+WeatherPoint = Tuple[float, float, Optional[int]]
+
+_cache = get_cache("weather", max_entries=500)
+
+def _cache_key(point: WeatherPoint, block: str) -> str:
+    lat, lon, elevation = point
+    return (f"{round(lat, COORD_PRECISION)}:{round(lon, COORD_PRECISION)}:{elevation}:"
+            f"{block}={BLOCK_VARIABLES[block]}")
+
+def _split_blocks(data: Dict[str, Any], blocks: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    Fetch current and forecast weather data from Open-Meteo.
+    Split one location's response into per-block cache entries. Each entry
+    keeps the location metadata (timezone, elevation, ...) so blocks can be
+    recombined independently, and records when the block was fetched
+    (`<block>_fetched_at`, epoch seconds) so cached copies can be told apart
+    from fresh ones.
+    """
+    fetched_at = int(time.time())
+    meta = {k: v for k, v in data.items()
+            if not any(k in (b, f"{b}_units", f"{b}_fetched_at") for b in BLOCK_VARIABLES)}
+    entries = {}
+    for block in blocks:
+        if block not in data:
+            continue
+        entry = dict(meta)
+        entry[block] = data[block]
+        if f"{block}_units" in data:
+            entry[f"{block}_units"] = data[f"{block}_units"]
+        entry[f"{block}_fetched_at"] = fetched_at
+        entries[block] = entry
+    return entries
+
+def _fetch_points(points: List[WeatherPoint], blocks: List[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch a chunk of points in a single request. Returns one response per point.
     """
-    url = "https://api.open-meteo.com/v1/forecast"
     params = {
-        "latitude": lat,
-        "longitude": lon,
-        "current": "temperature_2m,wind_speed_10m,snowfall,snow_depth",
-        "daily": "snowfall_sum,wind_speed_10m_max",
+        "latitude": ",".join(str(p[0]) for p in points),
+        "longitude": ",".join(str(p[1]) for p in points),
         "timezone": "auto",
         "forecast_days": 7
     }
-    if elevation is not None:
-        params["elevation"] = elevation
-    
+    for block in blocks:
+        params[block] = BLOCK_VARIABLES[block]
+    if points[0][2] is not None:
+        params["elevation"] = ",".join(str(p[2]) for p in points)
+
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = get_transport().get(WEATHER_URL, params=params)
         response.raise_for_status()
-        return response.json()
+        data = response.json()
     except requests.RequestException as e:
         print(f"Error fetching weather: {e}")
-        return {}
+        return [{} for _ in points]
+
+    # A single location comes back as an object, several as a list in request order.
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(points):
+        print(f"Error fetching weather: expected {len(points)} locations, got {len(data)}")
+        return [{} for _ in points]
+    return data
+
+def get_weather_batch(points: List[WeatherPoint]) -> Dict[WeatherPoint, Dict[str, Any]]:
+    """
+    Fetch current and forecast weather for many points in as few requests as possible.
+    Duplicate points are fetched once, and blocks still fresh in the on-disk cache
+    are not requested again. Returns a dict keyed by the input point.
+    """
+    with span("weather.batch", points=len(points)) as s:
+        results = _weather_batch(points)
+        s.set(fetched=sum(1 for r in results.values() if r))
+        return results
+
+def _weather_batch(points: List[WeatherPoint]) -> Dict[WeatherPoint, Dict[str, Any]]:
+    results = {}
+    # Group points by the blocks that still need fetching. Points with and
+    # without an explicit elevation can't share a request: the elevation list
+    # must cover every coordinate.
+    groups: Dict[Tuple[Tuple[str, ...], bool], List[WeatherPoint]] = {}
+    for point in dict.fromkeys(points):
+        merged = {}
+        missing = []
+        for block in BLOCK_VARIABLES:
+            cached = _cache.get(_cache_key(point, block))
+            if cached is None:
+                missing.append(block)
+            else:
+                merged.update(cached)
+        results[point] = merged
+        if missing:
+            groups.setdefault((tuple(missing), point[2] is not None), []).append(point)
+
+    for (blocks, _), group in groups.items():
+        for i in range(0, len(group), MAX_POINTS_PER_REQUEST):
+            chunk = group[i:i + MAX_POINTS_PER_REQUEST]
+            for point, data in zip(chunk, _fetch_points(chunk, list(blocks))):
+                if not data:
+                    continue
+                for block, entry in _split_blocks(data, list(blocks)).items():
+                    _cache.set(_cache_key(point, block), entry, BLOCK_TTLS[block])
+                    results[point].update(entry)
+    return results
+
+def get_weather_data(lat: float, lon: float, elevation: int = None) -> Dict[str, Any]:
+    """
+    Fetch current and forecast weather data from Open-Meteo.
+    """
+    point = (lat, lon, elevation)
+    return get_weather_batch([point])[point]
@@ -3,6 +3,8 @@ import os
 import json
 from dotenv import load_dotenv
 
+from .transport import get_transport
+
 load_dotenv()
 
 def send_whatsapp_message(message: str, recipient_id: str = None):
@@ -34,7 +36,7 @@ def send_whatsapp_message(message: str, recipient_id: str = None):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = get_transport().post(url, headers=headers, json=data)
         print(f"WhatsApp API Status: {response.status_code}")
         print(f"WhatsApp API Response: {response.text}")
         
@@ -82,7 +84,7 @@ def send_whatsapp_template(template_name: str = "hello_world", language_code: st
     }
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = get_transport().post(url, headers=headers, json=data)
         print(f"WhatsApp Template API Status: {response.status_code}")
         if response.status_code == 200:
             print(f"✅ Template '{template_name}' sent to {recipient}")
@@ -1,6 +1,9 @@
 from enum import Enum
 from datetime import date
-from .models import Trip
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING: # Trip is only an annotation here; importing it loads pydantic
+    from .models import Trip
 
 class Phase(Enum):
     WAIT = "wait"
@@ -12,7 +15,11 @@ class Phase(Enum):
     POST = "post"
     TRAVEL = "travel" # For flight days if they don't fall into other categories
 
-def determine_phase(trip: Trip, current_date: date) -> Phase:
+# Days before flight out at which the weekly planning and the daily hype updates start
+PLANNING_HORIZON_DAYS = 90
+HYPE_HORIZON_DAYS = 14
+
+def determine_phase(trip: "Trip", current_date: date) -> Phase:
     delta_out = (trip.flight_out_date - current_date).days
     delta_back = (trip.flight_back_date - current_date).days
     
@@ -39,13 +46,13 @@ def determine_phase(trip: Trip, current_date: date) -> Phase:
         return Phase.TRAVEL
         
     # Pre-trip phases
-    if delta_out > 90:
+    if delta_out > PLANNING_HORIZON_DAYS:
         return Phase.WAIT
     
-    if 14 < delta_out <= 90:
+    if HYPE_HORIZON_DAYS < delta_out <= PLANNING_HORIZON_DAYS:
         return Phase.PLANNING_WEEKLY
         
-    if 1 < delta_out <= 14:
+    if 1 < delta_out <= HYPE_HORIZON_DAYS:
         return Phase.HYPE_DAILY
         
     # Should not be reachable if logic is sound, but default to WAIT
@@ -61,3 +68,36 @@ PHASE_SEARCH_INTENT = {
     Phase.TRAVEL: ["airport lounge", "flight status", "travel tips"],
     Phase.POST: ["season recap", "next trip ideas"]
 }
+
+# How long search results for each intent stay fresh, in seconds. Slow-moving
+# topics can be reused for weeks; live conditions only for minutes.
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+SEARCH_INTENT_TTL = {
+    "long range weather": 12 * HOUR,
+    "resort highlights": 14 * DAY,
+    "ski season outlook": 3 * DAY,
+    "current snow conditions": 3 * HOUR,
+    "recent instagram videos": 12 * HOUR,
+    "resort news": 12 * HOUR,
+    "road status to resort": 30 * MINUTE,
+    "airport weather": HOUR,
+    "transfer tips": 14 * DAY,
+    "live lift status": 15 * MINUTE,
+    "local events today": 6 * HOUR,
+    "resort history": 30 * DAY,
+    "fun facts": 30 * DAY,
+    "best hidden runs": 14 * DAY,
+    "road status from resort": 30 * MINUTE,
+    "return transfer": 14 * DAY,
+    "airport lounge": 14 * DAY,
+    "flight status": 15 * MINUTE,
+    "travel tips": 14 * DAY,
+    "season recap": 7 * DAY,
+    "next trip ideas": 14 * DAY,
+}
+
+def search_ttl(intent: str) -> Optional[float]:
+    """Cache TTL (seconds) for results of a search intent, None for the search default."""
+    return SEARCH_INTENT_TTL.get(intent)
@@ -1,196 +1,249 @@
 import argparse
-import json
-import os
 import sys
+from contextlib import contextmanager
 from datetime import date, datetime
-import pytz
 from typing import List
+from zoneinfo import ZoneInfo
 
-from .models import Trip
-from .logic import determine_phase, Phase
-from .integrations.weather import get_weather_data
-from .integrations.llm import generate_draft, review_draft, evaluate_discovery
-from .integrations.whatsapp import send_whatsapp_message
-from .integrations.telegram import send_telegram_message
-from .discovery import DiscoveryEngine
-from .state import (load_state, save_state, get_resort_state, mark_url_seen, 
-                    update_last_run, get_seen_trivia, get_seen_challenges,
-                    mark_trivia_seen, mark_challenge_seen)
+# Only light modules are imported up front. The pipeline (and through it the
+# search, LLM and HTTP clients) is imported once the plan has a trip to
+# process, so runs with nothing scheduled exit without loading any SDK.
+from .planner import load_plan, format_plan
+from .registry import TripRegistry
+from .delivery import DeliveryService
+from .cache import set_cache_enabled, cache_stats, flush_all as flush_caches
+from .state import (open_store, get_resort_state, resort_key, mark_insight_seen,
+                    update_last_run, mark_trivia_seen, mark_challenge_seen)
 from .extraction import extract_trivia, extract_challenge
+from .tracing import TRACE_FILE, get_tracer
 
-def load_trips(path: str = "trips.json") -> List[Trip]:
-    if not os.path.exists(path):
-        print(f"Trips file not found: {path}")
-        return []
-        
-    with open(path, "r") as f:
-        data = json.load(f)
-        
-    trips = []
-    for item in data:
-        trips.append(Trip(**item))
-    return trips
+def drain_deliveries(delivery: DeliveryService):
+    if delivery is None:
+        return
+    counts = delivery.drain()
+    if counts:
+        print("Delivery: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+
+@contextmanager
+def profiled(profile_path: str = None, trace_memory: bool = False):
+    """
+    Optionally run the body under cProfile (stats dumped to `profile_path`,
+    top functions printed) and/or tracemalloc (peak and top allocation sites).
+    """
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            print(f"Profile written to {profile_path}. Top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Peak traced memory: {peak / 1e6:.1f} MB. Top allocation sites:")
+            for stat in snapshot.statistics("lineno")[:10]:
+                print(f"  {stat}")
+
+def report_trace(path: str):
+    tracer = get_tracer()
+    print("Trace summary:")
+    for line in tracer.summary_lines():
+        print(f"  {line}")
+    print(f"Trace written to {tracer.export(path)}")
+
+def today() -> date:
+    return datetime.now(ZoneInfo("Asia/Jerusalem")).date()
+
+def plan_command(argv: List[str]):
+    parser = argparse.ArgumentParser(prog="brrrnando plan", description="Show upcoming scheduled runs")
+    parser.add_argument("--days", type=int, default=30, help="How many days ahead to show (default: 30)")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=None,
+                        help="First day to show, YYYY-MM-DD (default: today)")
+    args = parser.parse_args(argv)
+
+    start = args.start or today()
+    lines = format_plan(load_plan(), start, args.days)
+    if not lines:
+        print(f"Nothing scheduled in the {args.days} days from {start}.")
+    for line in lines:
+        print(line)
 
 def main():
-    parser = argparse.ArgumentParser(description="Brrrnando Agent")
+    if sys.argv[1:2] == ["plan"]:
+        return plan_command(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Brrrnando Agent",
+                                     epilog="Run 'python -m src.main plan' to list upcoming runs.")
     parser.add_argument("--mode", choices=["morning", "evening"], required=True, help="Run mode (morning/evening)")
     parser.add_argument("--dry-run", action="store_true", help="Do not send messages, just print output")
     parser.add_argument("--no-state", action="store_true", help="Do not update or save state (seen URLs, etc.)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk response caches")
+    parser.add_argument("--cache-drafts", action="store_true",
+                        help="Let generate_draft answer from the LLM response cache (handy for --dry-run iterations)")
+    parser.add_argument("--no-speculation", action="store_true",
+                        help="Wait for refined search before drafting instead of drafting speculatively")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Generate drafts in one piece instead of streaming them through the linter")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse stage results checkpointed by an earlier attempt of this run (same date and mode)")
+    parser.add_argument("--concurrency", default=None,
+                        help="Per-stage concurrency limits, e.g. 'weather=4,search=3,llm=2,delivery=2'")
+    parser.add_argument("--trace", default=TRACE_FILE,
+                        help=f"Where to write the run's spans as OTLP JSON (default: {TRACE_FILE})")
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="Profile the run with cProfile and write the stats to PATH")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Report peak memory and the top allocation sites")
     args = parser.parse_args()
-    
-    tz = pytz.timezone("Asia/Jerusalem")
-    now = datetime.now(tz)
-    current_date = now.date()
+
+    with profiled(args.profile, args.tracemalloc):
+        try:
+            with get_tracer().span("run", mode=args.mode, dry_run=args.dry_run):
+                run_agent(args)
+        finally:
+            report_trace(args.trace)
+
+def run_agent(args: argparse.Namespace):
+    current_date = today()
     
     print(f"Running Brrrnando in {args.mode} mode. Date: {current_date}")
     if args.no_state:
         print("State update is DISABLED for this run.")
-    
-    trips = load_trips()
-    if not trips:
-        print("No trips configured.")
-        return
+    if args.no_cache:
+        set_cache_enabled(False)
+
+    plan = load_plan()
+    scheduled = plan.runs_on(current_date, args.mode)
 
-    discovery_engine = DiscoveryEngine()
-    state = load_state()
+    delivery = None
+    if not args.dry_run:
+        delivery = DeliveryService(current_date, args.mode)
+        retried = delivery.retry_pending()
+        if retried:
+            print(f"Retrying {retried} undelivered message(s) from earlier runs.")
+    if not scheduled:
+        next_day = plan.next_run(current_date)
+        print(f"No active trips this run. Next scheduled run: {next_day or 'none'}.")
+        drain_deliveries(delivery)
+        return
 
-    for trip in trips:
-        phase = determine_phase(trip, current_date)
-        print(f"Trip: {trip.resort_name}, Phase: {phase.value}")
-        
-        if phase in [Phase.WAIT, Phase.POST]:
-            print("Skipping trip (inactive phase).")
+    # Only today's trips are validated
+    registry = TripRegistry.load()
+    active = []
+    for planned in scheduled:
+        print(f"Trip: {planned.resort_name}, Phase: {planned.phase.value}")
+        try:
+            trip = registry.trip(planned.trip_index)
+        except ValueError as e:
+            print(f"Skipping {planned.resort_name}: invalid trip entry ({e})")
             continue
-            
-        if phase == Phase.PLANNING_WEEKLY:
-            if now.weekday() != 0: # 0 = Monday
-                print("Skipping Weekly update (not Monday).")
-                continue
-            if args.mode != "morning":
-                 print("Skipping Weekly update (not Morning).")
-                 continue
+        active.append((planned.trip_index, trip, planned.phase))
+    if not active:
+        drain_deliveries(delivery)
+        return
+    store = open_store()
+
+    from .discovery import DiscoveryEngine
+    from .checkpoint import CheckpointStore
+    from .integrations.transport import get_transport
+    from .integrations.llm import LLMClient, set_cache_policy as set_llm_cache_policy
+    from .integrations.health import HEALTH_DOCUMENT, HealthRegistry, get_health, set_health
+    from .executor import DagExecutor, get_stage_limits
+    from .pipeline import RunContext, TripRun, build_run_stages
 
+    if args.cache_drafts:
+        set_llm_cache_policy(generate_draft=True)
+    # Search provider health carries over from earlier runs (open circuits included)
+    set_health(HealthRegistry.from_dict(store.document(HEALTH_DOCUMENT)))
+    for line in get_health().summary_lines():
+        print(f"Search provider {line}")
+
+    executor = DagExecutor(get_stage_limits(args.concurrency))
+    # One LLM client for the whole run, so every call reuses the same connection
+    ctx = RunContext(engine=DiscoveryEngine(search_concurrency=executor.limits.get("search")),
+                     llm=LLMClient(), dry_run=args.dry_run,
+                     speculate=not args.no_speculation, stream_drafts=not args.no_stream, delivery=delivery,
+                     checkpoints=CheckpointStore(current_date, args.mode, resume=args.resume))
+
+    runs = []
+    for index, trip, phase in active:
         # Get resort-specific state
-        resort_state = get_resort_state(state, trip.resort_name)
-
-        # Gather Weather Data
-        weather_info = {}
-        if phase in [Phase.ACTIVE, Phase.HYPE_DAILY, Phase.LOGISTICS_OUT, Phase.LOGISTICS_BACK, Phase.TRAVEL, Phase.PLANNING_WEEKLY]:
-            try:
-                if trip.summit_elevation and trip.base_elevation:
-                    weather_summit = get_weather_data(trip.lat, trip.lon, trip.summit_elevation)
-                    weather_base = get_weather_data(trip.lat, trip.lon, trip.base_elevation)
-                    
-                    snow_depth_summit = weather_summit.get("current", {}).get("snow_depth", 0)
-                    snow_depth_base = weather_base.get("current", {}).get("snow_depth", 0)
-                    snowfall_list = weather_summit.get("daily", {}).get("snowfall_sum", [])
-                    total_weekly_snow_cm = round(sum(snowfall_list), 1) if snowfall_list else 0
-                    
-                    weather_info = {
-                        "summit_snow_depth": snow_depth_summit,
-                        "base_snow_depth": snow_depth_base,
-                        "weekly_snowfall_forecast_cm": total_weekly_snow_cm,
-                        "temp_summit": weather_summit.get("current", {}).get("temperature_2m"),
-                        "wind_summit": weather_summit.get("current", {}).get("wind_speed_10m")
-                    }
-                else:
-                    weather = get_weather_data(trip.lat, trip.lon)
-                    current = weather.get("current", {})
-                    snowfall_list = weather.get("daily", {}).get("snowfall_sum", [])
-                    total_weekly_snow_cm = round(sum(snowfall_list), 1) if snowfall_list else 0
-                    weather_info = {
-                        "snow_depth": current.get("snow_depth", 0),
-                        "temp_current": current.get("temperature_2m"),
-                        "wind_current": current.get("wind_speed_10m"),
-                        "weekly_snowfall_forecast_cm": total_weekly_snow_cm
-                    }
-            except Exception as e:
-                print(f"Error gathering weather: {e}")
-
-        # Discovery Phase
-        print(f"Running discovery for {trip.resort_name}...")
-        insights = discovery_engine.discover_insights(trip, phase, resort_state)
-        
-        # Iterative Search (Autonomous Discovery)
-        if phase in [Phase.HYPE_DAILY, Phase.ACTIVE]:
-            print(f"Evaluating discovery results for {trip.resort_name}...")
-            refined_queries = evaluate_discovery(trip.resort_name, insights)
-            if refined_queries:
-                print(f"Autonomous Discovery: LLM requested {len(refined_queries)} follow-up queries.")
-                refined_insights = discovery_engine.perform_refined_search(refined_queries, resort_state)
-                insights.extend(refined_insights)
-                # Deduplicate again just in case
-                seen_urls = set()
-                final_insights = []
-                for ins in insights:
-                    if ins.url not in seen_urls:
-                        final_insights.append(ins)
-                        seen_urls.add(ins.url)
-                insights = final_insights[:7] # Increase limit to 7 for feature-packed message
-        
-        if not insights and phase in [Phase.ACTIVE, Phase.HYPE_DAILY]:
-            print(f"No new insights found for {trip.resort_name}. Proceeding with weather only.")
-
-        # Drafting Phase
-        print(f"Drafting message for {trip.resort_name}...")
-        seen_trivia = get_seen_trivia(resort_state)
-        seen_challenges = get_seen_challenges(resort_state)
-        draft = generate_draft(trip.resort_name, phase.value, weather_info, insights, 
-                              seen_trivia, seen_challenges)
-        
-        if args.dry_run:
-            print("\n--- INITIAL DRAFT ---")
-            print(draft)
-            print("--------------------\n")
-
-        # Review Loop
-        final_message = draft
-        for attempt in range(2):
-            print(f"Reviewing draft (Attempt {attempt + 1})...")
-            approved, result = review_draft(final_message, trip.resort_name, phase.value)
-            
-            if approved:
-                print("Draft approved!")
-                final_message = result
-                break
-            else:
-                print(f"Draft needs revision: {result}")
-                final_message = generate_draft(trip.resort_name, phase.value, weather_info, insights,
-                                              seen_trivia, seen_challenges)
-
-        if args.dry_run:
-            print(f"\n--- FINAL MESSAGE ({trip.resort_name}) ---")
-            print(final_message)
-            print("----------------------------------------------\n")
-        else:
-            print(f"Sending message for {trip.resort_name}...")
-            send_whatsapp_message(final_message)
-            send_telegram_message(final_message)
+        resort_state = get_resort_state(store, trip.resort_name, trip.group)
+        key = f"{index}:{resort_key(trip.resort_name)}"
+        runs.append(TripRun(key=key, trip=trip, phase=phase, resort_state=resort_state))
+
+    # Run every trip's stage graph on a shared executor so that independent
+    # network-bound stages overlap within and across trips.
+    stages = build_run_stages(ctx, runs)
+    results = executor.run(stages)
+
+    for run in runs:
+        trip = run.trip
+        error = executor.errors.get(run.stage_key("deliver"))
+        if error is not None:
+            run.span.record_error(error)
+        run.span.end()
+        if error is not None:
+            print(f"Run failed for {trip.resort_name}: {error}")
+            continue
+
+        insights = results[run.stage_key("refine")]
+        final_message = results[run.stage_key("draft")]
 
         # Update State
         if not args.no_state:
             for ins in insights:
-                mark_url_seen(resort_state, ins.url)
+                mark_insight_seen(run.resort_state, ins)
             
             # Extract and save trivia/challenge if present
             trivia = extract_trivia(final_message)
             if trivia:
                 print(f"Extracted trivia: {trivia[:50]}...")
-                mark_trivia_seen(resort_state, trivia)
+                mark_trivia_seen(run.resort_state, trivia)
             
             challenge = extract_challenge(final_message)
             if challenge:
                 print(f"Extracted challenge: {challenge[:50]}...")
-                mark_challenge_seen(resort_state, challenge)
+                mark_challenge_seen(run.resort_state, challenge)
             
-            update_last_run(resort_state)
+            update_last_run(run.resort_state)
+
+    drain_deliveries(ctx.delivery)
+
+    timings = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in executor.summary().items())
+    print(f"Stage time (summed across trips): {timings}")
+    if any(ctx.speculation_stats.counts.values()):
+        print(f"Speculative drafts: {ctx.speculation_stats.summary()}")
+    if ctx.stream_stats.completed or ctx.stream_stats.aborted:
+        print(f"Streamed drafts: {ctx.stream_stats.summary()}")
+    for line in get_transport().summary_lines():
+        print(f"HTTP {line}")
+    for line in get_health().summary_lines():
+        print(f"Search provider {line}")
+    for name, stats in cache_stats().items():
+        print(f"Cache {name}: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} entries")
+    flush_caches()
 
     # Save state at the end
     if not args.no_state:
         print("Saving state...")
-        save_state(state)
+        store.set_document(HEALTH_DOCUMENT, get_health().to_dict())
+        store.save()
     else:
         print("Skipping state save (no-state flag).")
+    store.close()
 
 if __name__ == "__main__":
     main()
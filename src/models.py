@@ -13,3 +13,7 @@ class Trip(BaseModel):
     road_check: str
     summit_elevation: Optional[int] = None
     base_elevation: Optional[int] = None
+    airport_lat: Optional[float] = None
+    airport_lon: Optional[float] = None
+    # Who is going, to tell apart trips to the same resort; each group keeps its own memory
+    group: Optional[str] = None
@@ -0,0 +1,504 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Any, Optional
+
+from .models import Trip
+from .logic import Phase
+from .executor import Stage
+from .integrations.weather import get_weather_batch, WeatherPoint
+from .forecast import get_archive, forecast_trends
+from .integrations.llm import LLMClient, LLMError, StreamStats, generate_draft, review_draft, evaluate_discovery
+from .discovery import DiscoveryEngine, Insight, filter_unseen
+from .dedup import unique_insights
+from .delivery import DeliveryService, SENT, UNCONFIGURED
+from .checkpoint import CheckpointStore
+from .state import ResortState, resort_key, get_seen_trivia, get_seen_challenges
+from .validation import lint_draft
+from .speculation import Speculation, SpeculationStats, is_material
+from .tracing import Span, get_tracer, span, current_span
+
+WEATHER_PHASES = [Phase.ACTIVE, Phase.HYPE_DAILY, Phase.LOGISTICS_OUT, Phase.LOGISTICS_BACK,
+                  Phase.TRAVEL, Phase.PLANNING_WEEKLY]
+REFINE_PHASES = [Phase.HYPE_DAILY, Phase.ACTIVE]
+AIRPORT_PHASES = [Phase.LOGISTICS_OUT, Phase.LOGISTICS_BACK, Phase.TRAVEL]
+# Points whose forecasts are archived and analysed (the ones the summary leads with)
+TREND_ROLES = ("summit", "resort")
+WEATHER_BATCH_KEY = "run/weather"
+MAX_DRAFT_ATTEMPTS = 3 # initial draft + regenerations with linter feedback
+
+@dataclass
+class RunContext:
+    """Long-lived services shared by every stage of a run."""
+    engine: DiscoveryEngine
+    llm: LLMClient
+    dry_run: bool = False
+    # Start drafting from first-round insights while refined search runs
+    speculate: bool = True
+    speculation_stats: SpeculationStats = field(default_factory=SpeculationStats)
+    delivery: Optional[DeliveryService] = None
+    # Stage results saved as they complete (and reused with --resume)
+    checkpoints: Optional[CheckpointStore] = None
+    # Check drafts while they stream and cut them short at the first hard violation
+    stream_drafts: bool = True
+    stream_stats: StreamStats = field(default_factory=StreamStats)
+
+@dataclass
+class TripRun:
+    """A single trip scheduled for processing in this run."""
+    key: str
+    trip: Trip
+    phase: Phase
+    resort_state: ResortState
+    # Parent of this trip's stage spans; ended by the caller once the run finishes
+    span: Optional[Span] = None
+
+    def stage_key(self, name: str) -> str:
+        return f"{self.key}/{name}"
+
+    @property
+    def trip_id(self) -> str:
+        """Stable identifier across runs (unlike `key`, which depends on file order)."""
+        trip_id = f"{resort_key(self.trip.resort_name)}:{self.trip.flight_out_date.isoformat()}"
+        return f"{trip_id}:{resort_key(self.trip.group)}" if self.trip.group else trip_id
+
+    @property
+    def share_key(self) -> str:
+        """Trips at the same resort in the same phase run identical searches, so they share them."""
+        return f"shared/{resort_key(self.trip.resort_name)}:{self.phase.value}"
+
+def _insights_to_json(insights: List[Insight]) -> List[Dict]:
+    return [asdict(i) for i in insights]
+
+def _insights_from_json(data: List[Dict]) -> List[Insight]:
+    return [Insight(**d) for d in data]
+
+# (encode, decode) for stage results that aren't plain JSON
+CHECKPOINT_CODECS = {
+    "discovery": (_insights_to_json, _insights_from_json),
+    "refine": (_insights_to_json, _insights_from_json),
+}
+
+def resumed(ctx: RunContext, run: TripRun, name: str) -> bool:
+    """Whether this stage's result can be taken from a checkpoint."""
+    return ctx.checkpoints is not None and ctx.checkpoints.get(run.trip_id, name)[0]
+
+def checkpointed(ctx: RunContext, run: TripRun, name: str, func: Callable, save: bool = True) -> Callable:
+    """
+    Wrap a stage function so its result is checkpointed when it completes and,
+    when resuming, taken from the checkpoint instead of recomputed. With
+    `save=False` the stage writes its own checkpoint (see `deliver_message`).
+    """
+    if ctx.checkpoints is None:
+        return func
+    encode, decode = CHECKPOINT_CODECS.get(name, (None, None))
+
+    def wrapper(*args):
+        found, value = ctx.checkpoints.get(run.trip_id, name)
+        if found:
+            print(f"Resuming {run.trip.resort_name}: {name} from checkpoint.")
+            if current_span():
+                current_span().set(checkpoint="hit")
+            return decode(value) if decode else value
+        result = func(*args)
+        if save:
+            ctx.checkpoints.put(run.trip_id, name, encode(result) if encode else result)
+        return result
+    return wrapper
+
+def shared_checkpointed(ctx: RunContext, runs: List[TripRun], name: str, func: Callable) -> Callable:
+    """
+    Like `checkpointed`, for a stage shared by several trips: the result is
+    saved under each trip and reused only if every trip has it.
+    """
+    if ctx.checkpoints is None:
+        return func
+
+    def wrapper(*args):
+        saved = [ctx.checkpoints.get(run.trip_id, name) for run in runs]
+        if all(found for found, _ in saved):
+            print(f"Resuming {runs[0].trip.resort_name}: shared {name} from checkpoint.")
+            return saved[0][1]
+        result = func(*args)
+        for run in runs:
+            ctx.checkpoints.put(run.trip_id, name, result)
+        return result
+    return wrapper
+
+def traced(run: TripRun, name: str, func: Callable) -> Callable:
+    """Wrap a stage function in a `stage.<name>` span under the trip's span."""
+    def wrapper(*args):
+        with span(f"stage.{name}", parent=run.span, trip=run.trip_id):
+            return func(*args)
+    return wrapper
+
+def weather_points(trip: Trip, phase: Phase) -> Dict[str, WeatherPoint]:
+    """
+    Points (by role) whose weather is needed for this trip in this phase.
+    """
+    if phase not in WEATHER_PHASES:
+        return {}
+    if trip.summit_elevation and trip.base_elevation:
+        points = {
+            "summit": (trip.lat, trip.lon, trip.summit_elevation),
+            "base": (trip.lat, trip.lon, trip.base_elevation),
+        }
+    else:
+        points = {"resort": (trip.lat, trip.lon, None)}
+    if phase in AIRPORT_PHASES and trip.airport_lat is not None and trip.airport_lon is not None:
+        points["airport"] = (trip.airport_lat, trip.airport_lon, None)
+    return points
+
+def _weekly_snowfall(weather: Dict[str, Any]) -> float:
+    snowfall_list = weather.get("daily", {}).get("snowfall_sum", [])
+    # Open-Meteo reports missing days as null
+    snowfall_list = [s for s in snowfall_list if s is not None]
+    return round(sum(snowfall_list), 1) if snowfall_list else 0
+
+def build_weather_info(trip: Trip, phase: Phase, fetched: Dict[WeatherPoint, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Turn the raw Open-Meteo responses for a trip's points into the weather summary
+    used in the draft prompt.
+    """
+    points = weather_points(trip, phase)
+    if not points:
+        return {}
+    responses = {role: fetched.get(point, {}) for role, point in points.items()}
+
+    if "summit" in responses:
+        weather_summit = responses["summit"]
+        weather_base = responses["base"]
+        weather_info = {
+            "summit_snow_depth": weather_summit.get("current", {}).get("snow_depth", 0),
+            "base_snow_depth": weather_base.get("current", {}).get("snow_depth", 0),
+            "weekly_snowfall_forecast_cm": _weekly_snowfall(weather_summit),
+            "temp_summit": weather_summit.get("current", {}).get("temperature_2m"),
+            "wind_summit": weather_summit.get("current", {}).get("wind_speed_10m")
+        }
+        weather_info.update(weather_summit.get("trends", {}))
+    else:
+        weather = responses["resort"]
+        current = weather.get("current", {})
+        weather_info = {
+            "snow_depth": current.get("snow_depth", 0),
+            "temp_current": current.get("temperature_2m"),
+            "wind_current": current.get("wind_speed_10m"),
+            "weekly_snowfall_forecast_cm": _weekly_snowfall(weather)
+        }
+        weather_info.update(weather.get("trends", {}))
+
+    if "airport" in responses:
+        airport = responses["airport"].get("current", {})
+        weather_info.update({
+            "airport_temp": airport.get("temperature_2m"),
+            "airport_wind": airport.get("wind_speed_10m"),
+            "airport_snowfall": airport.get("snowfall"),
+        })
+    return weather_info
+
+def fetch_weather_for_runs(runs: List[TripRun]) -> Dict[WeatherPoint, Dict[str, Any]]:
+    """
+    Fetch every point needed by this run's trips in one batched call.
+    """
+    points = []
+    for run in runs:
+        points.extend(weather_points(run.trip, run.phase).values())
+    if not points:
+        return {}
+    print(f"Fetching weather for {len(set(points))} points across {len(runs)} trips...")
+    try:
+        fetched = get_weather_batch(points)
+    except Exception as e:
+        print(f"Error gathering weather: {e}")
+        return {}
+    archive_forecasts(runs, fetched)
+    return fetched
+
+def archive_forecasts(runs: List[TripRun], fetched: Dict[WeatherPoint, Dict[str, Any]]):
+    """
+    Append each trend point's forecast to the archive and attach the trends it
+    now supports to the response (as "trends"), for `build_weather_info`.
+    """
+    archive = get_archive()
+    for point in dict.fromkeys(point for run in runs for role, point in weather_points(run.trip, run.phase).items()
+                               if role in TREND_ROLES):
+        response = fetched.get(point)
+        if not response:
+            continue
+        try:
+            tables = archive.record(point, response)
+            response["trends"] = forecast_trends(tables, int(response.get("utc_offset_seconds") or 0))
+        except Exception as e: # Trends are extras; never lose the weather over them
+            print(f"Error archiving forecast for {point}: {e}")
+
+def dedupe_insights(insights: List[Insight], limit: int = 7) -> List[Insight]:
+    """
+    Drop insights whose canonical URL or body repeats an earlier one, keeping the first occurrence.
+    """
+    return unique_insights(insights, limit=limit)
+
+def refine_insights(run: TripRun, insights: List[Insight], refined: List[Insight]) -> List[Insight]:
+    """
+    Merge the (shared) follow-up search results this trip hasn't seen into its insights.
+    """
+    if not refined:
+        return insights
+    refined = filter_unseen(refined, run.resort_state, quiet=True)
+    return dedupe_insights(insights + refined) # Increase limit to 7 for feature-packed message
+
+def draft_message(ctx: RunContext, run: TripRun, weather_info: Dict, insights: List[Insight]) -> str:
+    """
+    Draft a message for the trip. Drafts are checked by the local linter first;
+    failing drafts are regenerated with the specific violations. Only a draft
+    that still fails after MAX_DRAFT_ATTEMPTS goes to the LLM reviewer. A
+    redraft after its notes is linted too; if it still fails, the draft with
+    the fewest violations is sent.
+    """
+    trip, phase = run.trip, run.phase
+    if not insights and phase in REFINE_PHASES:
+        print(f"No new insights found for {trip.resort_name}. Proceeding with weather only.")
+
+    print(f"Drafting message for {trip.resort_name}...")
+    seen_trivia = get_seen_trivia(run.resort_state)
+    seen_challenges = get_seen_challenges(run.resort_state)
+
+    def draft(attempt: int, feedback: List[str] = None) -> str:
+        with span("draft.attempt", attempt=attempt, feedback=len(feedback or [])):
+            return generate_draft(trip.resort_name, phase.value, weather_info, insights,
+                                  seen_trivia, seen_challenges, client=ctx.llm, feedback=feedback,
+                                  stream=ctx.stream_drafts, stream_stats=ctx.stream_stats)
+
+    drafts: List[tuple] = [] # (message, violations) of every draft, in order
+
+    def lint(message: str) -> List[str]:
+        violations = lint_draft(message, phase.value, insights, seen_trivia + seen_challenges)
+        if current_span():
+            current_span().add_event("lint", violations=len(violations))
+        drafts.append((message, violations))
+        return violations
+
+    message = draft(1)
+    if ctx.dry_run:
+        print("\n--- INITIAL DRAFT ---")
+        print(message)
+        print("--------------------\n")
+
+    violations = lint(message)
+    for attempt in range(1, MAX_DRAFT_ATTEMPTS):
+        if not violations:
+            break
+        print(f"Draft for {trip.resort_name} failed local checks (attempt {attempt}): {'; '.join(violations)}")
+        message = draft(attempt + 1, feedback=violations)
+        violations = lint(message)
+
+    if not violations:
+        print(f"Draft for {trip.resort_name} passed local checks; skipping LLM review.")
+        return message
+
+    # Still failing: let the LLM reviewer fix it, or send its notes back to the drafter.
+    print(f"Reviewing draft for {trip.resort_name}...")
+    try:
+        with span("review", violations=len(violations)) as s:
+            approved, result = review_draft(message, trip.resort_name, phase.value, client=ctx.llm)
+            s.set(approved=approved)
+    except LLMError as e:
+        # The review is a quality gate, not a requirement: keep the draft we have
+        print(f"Review unavailable for {trip.resort_name}: {e}. Using current draft.")
+        return message
+
+    if approved:
+        print("Draft approved!")
+        return result
+    print(f"Draft needs revision: {result}")
+    message = draft(MAX_DRAFT_ATTEMPTS + 1, feedback=[result] + violations)
+    violations = lint(message)
+    if not violations:
+        return message
+    # Least-violating draft; on a tie the newest, which has had the most feedback
+    message, violations = min(reversed(drafts), key=lambda d: len(d[1]))
+    print(f"Revised draft for {trip.resort_name} still fails local checks; "
+          f"sending the draft with the fewest violations: {'; '.join(violations)}")
+    return message
+
+def deliver_message(ctx: RunContext, run: TripRun, message: str) -> str:
+    """
+    Print the final message on dry runs; otherwise hand it to the delivery
+    service, which sends to all channels in the background. The `deliver`
+    checkpoint is the delivery receipt: it is written only once every
+    channel has sent (or is unconfigured), so a resumed attempt still
+    delivers anything that failed or never finished.
+    """
+    if ctx.dry_run or ctx.delivery is None:
+        print(f"\n--- FINAL MESSAGE ({run.trip.resort_name}) ---")
+        print(message)
+        print("----------------------------------------------\n")
+    else:
+        print(f"Queueing message for {run.trip.resort_name}...")
+        futures = ctx.delivery.submit(run.trip_id, message)
+        if ctx.checkpoints is not None:
+            checkpoint_when_delivered(ctx.checkpoints, run.trip_id, message, list(futures.values()))
+    return message
+
+def checkpoint_when_delivered(checkpoints: CheckpointStore, trip_id: str, message: str, futures: List[Future]):
+    """Checkpoint `deliver` once all `futures` are done, if none of them is left pending."""
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if all(not f.exception() and f.result() in (SENT, UNCONFIGURED) for f in futures):
+            checkpoints.put(trip_id, "deliver", message)
+
+    if not futures: # Every channel already has it
+        checkpoints.put(trip_id, "deliver", message)
+    for future in futures:
+        future.add_done_callback(done)
+
+def group_runs(runs: List[TripRun]) -> Dict[str, List[TripRun]]:
+    """Runs by share key, in order of first appearance."""
+    groups: Dict[str, List[TripRun]] = {}
+    for run in runs:
+        groups.setdefault(run.share_key, []).append(run)
+    return groups
+
+def build_shared_stages(ctx: RunContext, key: str, runs: List[TripRun]) -> List[Stage]:
+    """
+    Work that depends only on the resort and phase, done once for all the
+    trips in `runs` and fanned out to them:
+
+        search ─> (each trip's discovery) ─> evaluate ─> refine_search
+
+    Evaluation sees the union of what the trips haven't seen yet; each trip
+    still filters the results against its own state.
+    """
+    resort, phase = runs[0].trip.resort_name, runs[0].phase
+    shared_by = f" (shared by {len(runs)} trips)" if len(runs) > 1 else ""
+
+    def search():
+        if all(resumed(ctx, run, "discovery") for run in runs):
+            return []
+        print(f"Running discovery for {resort}{shared_by}...")
+        return ctx.engine.search_insights(resort, phase)
+
+    def evaluate(*trip_insights):
+        # Iterative Search (Autonomous Discovery)
+        if phase not in REFINE_PHASES or all(resumed(ctx, run, "refine") for run in runs):
+            return []
+        print(f"Evaluating discovery results for {resort}{shared_by}...")
+        insights = unique_insights(i for insights in trip_insights for i in insights)
+        return evaluate_discovery(resort, insights, client=ctx.llm)
+
+    def refine_search(queries):
+        if not queries:
+            return []
+        print(f"Autonomous Discovery: LLM requested {len(queries)} follow-up queries.")
+        return ctx.engine.refined_search(queries)
+
+    def step(name, func):
+        def wrapper(*args):
+            with span(f"stage.{name}", shared=key, trips=len(runs)):
+                return func(*args)
+        return wrapper
+
+    return [
+        Stage(f"{key}/search", step("search", search), pool="search"),
+        Stage(f"{key}/evaluate", step("evaluate", shared_checkpointed(ctx, runs, "evaluate", evaluate)),
+              deps=[run.stage_key("discovery") for run in runs], pool="llm"),
+        Stage(f"{key}/refine_search", step("refine_search", refine_search),
+              deps=[f"{key}/evaluate"], pool="search"),
+    ]
+
+def build_trip_stages(ctx: RunContext, run: TripRun, shared: str = None) -> List[Stage]:
+    """
+    Model one trip's run as a dependency graph:
+
+        run/weather ─> weather ───────────────────────────────┐
+        shared search ─> discovery ─> shared evaluate/refine_search ─> refine ─> draft ─> deliver
+
+    Weather and discovery are independent and run concurrently. The weather
+    stage only picks this trip's points out of the shared batched fetch, and
+    discovery and refine filter the group's shared search results against
+    this trip's seen state. Without `shared` (the key of stages built by
+    `build_shared_stages`), the trip gets shared stages of its own.
+
+    For phases with refined search, a speculative draft also starts from the
+    first-round insights (weather + discovery) in parallel with evaluate and
+    refine; the final draft stage keeps it unless refinement added material
+    insights.
+    """
+    trip, phase = run.trip, run.phase
+    k = run.stage_key
+    stages = []
+    if shared is None:
+        shared = run.share_key
+        stages = build_shared_stages(ctx, shared, [run])
+    if run.span is None:
+        run.span = get_tracer().start_span("trip", resort=trip.resort_name, phase=phase.value,
+                                           trip=run.trip_id)
+
+    def discover(found):
+        return filter_unseen(found, run.resort_state, limit=5)
+
+    def step(name, func):
+        return traced(run, name, checkpointed(ctx, run, name, func))
+
+    stages += [
+        Stage(k("weather"), step("weather", lambda fetched: build_weather_info(trip, phase, fetched)),
+              deps=[WEATHER_BATCH_KEY]),
+        Stage(k("discovery"), step("discovery", discover), deps=[f"{shared}/search"]),
+        Stage(k("refine"), step("refine", lambda insights, refined: refine_insights(run, insights, refined)),
+              deps=[k("discovery"), f"{shared}/refine_search"]),
+    ]
+
+    if ctx.speculate and phase in REFINE_PHASES:
+        speculation = Speculation(ctx.speculation_stats)
+
+        def speculative_draft(weather, first_round):
+            if resumed(ctx, run, "draft"):
+                return None
+            print(f"Speculatively drafting for {trip.resort_name} from first-round insights...")
+            return speculation.run(lambda: draft_message(ctx, run, weather, first_round))
+
+        def final_draft(weather, first_round, refined):
+            material = is_material(first_round, refined)
+            if material:
+                print(f"Refined search added new insights for {trip.resort_name}; redrafting.")
+            return speculation.resolve(material, lambda: draft_message(ctx, run, weather, refined))
+
+        stages += [
+            Stage(k("draft_speculative"), traced(run, "draft_speculative", speculative_draft),
+                  deps=[k("weather"), k("discovery")], pool="llm_speculative"),
+            Stage(k("draft"), step("draft", final_draft),
+                  deps=[k("weather"), k("discovery"), k("refine")], pool="llm"),
+        ]
+    else:
+        def plain_draft(weather, insights):
+            return draft_message(ctx, run, weather, insights)
+
+        stages.append(Stage(k("draft"), step("draft", plain_draft),
+                            deps=[k("weather"), k("refine")], pool="llm"))
+
+    deliver = lambda message: deliver_message(ctx, run, message)
+    if ctx.dry_run: # A dry run's printout is not a delivery receipt
+        deliver = traced(run, "deliver", deliver)
+    else: # Checkpointed by deliver_message once the channels have sent
+        deliver = traced(run, "deliver", checkpointed(ctx, run, "deliver", deliver, save=False))
+    stages.append(Stage(k("deliver"), deliver, deps=[k("draft")], pool="delivery"))
+    return stages
+
+def build_run_stages(ctx: RunContext, runs: List[TripRun]) -> List[Stage]:
+    """
+    Stages for the whole run: one batched weather fetch (which fetches each
+    distinct point once), shared search and evaluation per resort and phase,
+    and every trip's own graph.
+    """
+    to_fetch = [run for run in runs if not resumed(ctx, run, "weather")]
+    stages = [Stage(WEATHER_BATCH_KEY, lambda: fetch_weather_for_runs(to_fetch), pool="weather")]
+    for key, group in group_runs(runs).items():
+        stages.extend(build_shared_stages(ctx, key, group))
+        for run in group:
+            stages.extend(build_trip_stages(ctx, run, key))
+    return stages
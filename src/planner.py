@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .cache import CACHE_DIR
+from .logic import determine_phase, Phase
+from .registry import TRIPS_FILE, TripRegistry
+
+PLAN_FILE = os.getenv("PLAN_FILE", os.path.join(CACHE_DIR, "plan.json"))
+# Bump when the phase rules, gating or file layout change, so cached plans are rebuilt.
+PLAN_VERSION = 2
+MODES = ("morning", "evening")
+
+@dataclass
+class PlannedRun:
+    """One trip's work on one day."""
+    trip_index: int
+    resort_name: str
+    phase: Phase
+    modes: Tuple[str, ...]
+
+def run_modes(phase: Phase, day: date) -> Tuple[str, ...]:
+    """The modes in which a trip in `phase` gets a message on `day`."""
+    if phase in (Phase.WAIT, Phase.POST):
+        return ()
+    if phase == Phase.PLANNING_WEEKLY:
+        # Weekly update: Monday mornings only
+        return ("morning",) if day.weekday() == 0 else ()
+    return MODES
+
+class Plan:
+    """
+    Every day on which some trip has something to send, with the trips, their
+    phase and the modes. Days that are absent have nothing to do.
+
+    Stored compactly for thousands of trips: resort names once, then per day
+    the trip indices by phase (modes follow from phase and day). `PlannedRun`s
+    are only built for the days asked about.
+    """
+    def __init__(self, trips_hash: str = "", days: Dict[str, Dict[str, List[int]]] = None,
+                 resorts: Dict[str, str] = None):
+        self.trips_hash = trips_hash
+        self.days = days or {}
+        self.resorts = resorts or {}
+
+    def add(self, day: date, run: PlannedRun):
+        self.days.setdefault(day.isoformat(), {}).setdefault(run.phase.value, []).append(run.trip_index)
+        self.resorts[str(run.trip_index)] = run.resort_name
+
+    def runs_on(self, day: date, mode: str = None) -> List[PlannedRun]:
+        runs = []
+        for value, indices in self.days.get(day.isoformat(), {}).items():
+            phase = Phase(value)
+            modes = run_modes(phase, day)
+            if mode is None or mode in modes:
+                runs.extend(PlannedRun(i, self.resorts[str(i)], phase, modes) for i in indices)
+        return sorted(runs, key=lambda run: run.trip_index)
+
+    def upcoming(self, start: date, days: int = None) -> List[Tuple[date, List[PlannedRun]]]:
+        end = (start + timedelta(days=days)).isoformat() if days is not None else None
+        return [(date.fromisoformat(day), self.runs_on(date.fromisoformat(day))) for day in sorted(self.days)
+                if day >= start.isoformat() and (end is None or day < end)]
+
+    def next_run(self, after: date, mode: str = None) -> Optional[date]:
+        """The first day after `after` with something to send (in `mode`, if given)."""
+        for day in sorted(d for d in self.days if d > after.isoformat()):
+            if self.runs_on(date.fromisoformat(day), mode):
+                return date.fromisoformat(day)
+        return None
+
+    def to_dict(self) -> Dict:
+        return {"version": PLAN_VERSION, "trips_hash": self.trips_hash,
+                "resorts": self.resorts, "days": self.days}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Plan":
+        return cls(data["trips_hash"], data["days"], data["resorts"])
+
+def scheduled_runs(registry: TripRegistry, day: date, mode: str = None) -> List[PlannedRun]:
+    """
+    The trips with something to send on `day`. Candidates come from the
+    registry's interval index and phases from its date columns, so no trip is
+    validated here.
+    """
+    # Only Monday mornings can include weekly planning updates
+    daily_only = day.weekday() != 0 or mode not in (None, "morning")
+    runs = []
+    for index in registry.active_on(day, daily_only):
+        phase = determine_phase(registry.dates(index), day)
+        modes = run_modes(phase, day)
+        if modes and (mode is None or mode in modes):
+            runs.append(PlannedRun(index, registry.names[index], phase, modes))
+    return runs
+
+def build_plan(registry: TripRegistry, trips_hash: str = "") -> Plan:
+    """Compute the whole schedule, day by day over the span of all trip windows."""
+    plan = Plan(trips_hash)
+    windows = [registry.window(index) for index in registry.indexed()]
+    if not windows:
+        return plan
+    day, last = min(w[0] for w in windows), max(w[1] for w in windows)
+    while day <= last:
+        for run in scheduled_runs(registry, day):
+            plan.add(day, run)
+        day += timedelta(days=1)
+    return plan
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _read_cached_plan(cache_path: str, trips_hash: str) -> Optional[Plan]:
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != PLAN_VERSION or data.get("trips_hash") != trips_hash:
+            return None
+        return Plan.from_dict(data)
+    except (json.JSONDecodeError, IOError, KeyError, ValueError) as e:
+        print(f"Error loading cached plan: {e}")
+        return None
+
+def _write_cached_plan(cache_path: str, plan: Plan):
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(plan.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+    except IOError as e:
+        print(f"Error saving plan: {e}")
+
+def load_plan(path: str = TRIPS_FILE, cache_path: str = None) -> Plan:
+    """
+    The plan for the trips in `path`, reused from the cache while the file's
+    contents are unchanged and rebuilt (and re-cached) otherwise.
+    """
+    if not os.path.exists(path):
+        print(f"Trips file not found: {path}")
+        return Plan()
+    cache_path = cache_path or PLAN_FILE
+    trips_hash = _file_hash(path)
+    plan = _read_cached_plan(cache_path, trips_hash)
+    if plan is None:
+        plan = build_plan(TripRegistry.load(path), trips_hash)
+        _write_cached_plan(cache_path, plan)
+    return plan
+
+def format_plan(plan: Plan, start: date, days: int) -> List[str]:
+    lines = []
+    for day, runs in plan.upcoming(start, days):
+        for run in runs:
+            lines.append(f"{day.isoformat()} {day.strftime('%a')}  {'+'.join(run.modes):<15} "
+                         f"{run.resort_name} ({run.phase.value})")
+    return lines
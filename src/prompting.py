@@ -0,0 +1,203 @@
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .dedup import SimHashIndex
+from .tracing import current_span
+
+# Per-call prompt budgets in (approximate) tokens. Calls not listed are not
+# limited. Override with PROMPT_TOKEN_BUDGETS="generate_draft=3000,...".
+DEFAULT_PROMPT_BUDGETS = {
+    "generate_draft": 2500,
+    "evaluate_discovery": 1200,
+}
+# Most of the budget left after the fixed template goes to insights; each
+# "previously shared" list gets at most this fraction of it, newest entries first.
+LIST_SHARE = 0.2
+# Sentences this close (in SimHash bits) to one already kept are dropped.
+SENTENCE_MAX_DISTANCE = 6
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+_WORD_RE = re.compile(r"\w+")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); close enough to Gemini's for budgeting."""
+    return len(text) // 4 + 1
+
+def parse_budgets(spec: Optional[str]) -> Dict[str, int]:
+    """Parse a budget spec like "generate_draft=2500,evaluate_discovery=1200"."""
+    budgets = {}
+    if not spec:
+        return budgets
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.partition("=")
+        if not value:
+            raise ValueError(f"Invalid prompt budget '{part}' (expected function=tokens)")
+        budget = int(value)
+        if budget < 1:
+            raise ValueError(f"Prompt budget for '{name}' must be >= 1")
+        budgets[name.strip()] = budget
+    return budgets
+
+def get_budget(name: str) -> Optional[int]:
+    """The token budget for prompts of `name`: defaults, then PROMPT_TOKEN_BUDGETS."""
+    budgets = dict(DEFAULT_PROMPT_BUDGETS)
+    budgets.update(parse_budgets(os.getenv("PROMPT_TOKEN_BUDGETS")))
+    return budgets.get(name)
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text or "") if s and s.strip()]
+
+def sentence_score(sentence: str, position: int) -> float:
+    """
+    How much a sentence is worth keeping: numbers and names (venues, lifts,
+    dates) per word, with a bonus for leading sentences, which usually carry
+    the point of a search snippet.
+    """
+    words = _WORD_RE.findall(sentence)
+    if not words:
+        return 0.0
+    facts = sum(1 for w in words if w[0].isdigit()) + 0.5 * sum(1 for w in words[1:] if w[0].isupper())
+    return (1 + facts) / math.sqrt(len(words)) + 1 / (1 + position)
+
+@dataclass
+class Prompt:
+    """A built prompt and what fitting it into the budget took."""
+    name: str
+    text: str
+    tokens: int
+    budget: Optional[int]
+    full_tokens: int
+    sentences_kept: int = 0
+    sentences_total: int = 0
+    insights_dropped: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.full_tokens - self.tokens
+
+    def log_line(self) -> str:
+        line = f"Prompt {self.name}: {self.tokens}/{self.budget or '-'} tokens"
+        if self.saved > 0:
+            line += (f", {self.saved} saved by compaction ({self.sentences_kept}/{self.sentences_total} "
+                     f"insight sentences kept")
+            line += f", {self.insights_dropped} insights dropped)" if self.insights_dropped else ")"
+        return line
+
+InsightLine = Callable[[Any, str], str]
+
+def full_line(insight: Any, content: str) -> str:
+    return f"- {insight.title}: {content} ({insight.url})" if insight.url else f"- {insight.title}: {content}"
+
+def compact_insights(insights: Sequence[Any], budget: int, line: InsightLine = full_line,
+                     count: Callable[[str], int] = estimate_tokens) -> tuple:
+    """
+    Extractive compaction: every insight keeps its title and URL, and its
+    sentences are added best-first, one per insight per round (so no insight
+    crowds out the rest), until the budget is spent. Sentences that repeat
+    one already kept from another insight are skipped. If even the bare
+    titles don't fit, the lowest-ranked insights are dropped.
+
+    Returns (lines, sentences kept, sentences total, insights dropped).
+    """
+    seen = SimHashIndex(SENTENCE_MAX_DISTANCE)
+    ranked = []
+    total = 0
+    for insight in insights:
+        sentences = split_sentences(insight.content)
+        total += len(sentences)
+        unique = []
+        for position, sentence in enumerate(sentences):
+            if seen.contains(sentence):
+                continue
+            seen.add(sentence)
+            unique.append((sentence_score(sentence, position), position, sentence))
+        ranked.append(sorted(unique, key=lambda s: (-s[0], s[1])))
+
+    kept = len(insights)
+    used = sum(count(line(i, "")) for i in insights)
+    while kept and used > budget:
+        kept -= 1
+        used -= count(line(insights[kept], ""))
+
+    chosen: List[List[tuple]] = [[] for _ in range(kept)]
+    for round_ in range(max((len(r) for r in ranked[:kept]), default=0)):
+        for i in range(kept):
+            if round_ >= len(ranked[i]):
+                continue
+            _, position, sentence = ranked[i][round_]
+            cost = count(" " + sentence)
+            if used + cost <= budget:
+                chosen[i].append((position, sentence))
+                used += cost
+
+    lines = [line(insight, " ".join(s for _, s in sorted(chosen[i]))) for i, insight in enumerate(insights[:kept])]
+    return lines, sum(len(c) for c in chosen), total, len(insights) - kept
+
+def newest_that_fit(items: Sequence[str], budget: int, count: Callable[[str], int] = estimate_tokens) -> List[str]:
+    """The most recent items (in their original order) whose bullets fit in `budget`."""
+    kept, used = [], 0
+    for item in reversed(items):
+        cost = count(f"- {item}\n")
+        if used + cost > budget:
+            break
+        kept.append(item)
+        used += cost
+    return kept[::-1]
+
+class PromptBuilder:
+    """
+    Fills a prompt template under a token budget. `template` is a format
+    string; `fixed` values are always included as given, `insights` (rendered
+    one line each by `line`) are compacted extractively to fit, and `lists`
+    ("previously shared" items, oldest first) lose their oldest entries first.
+    Lists are rendered by `render_list(name, items)`.
+
+    The count defaults to a local approximation; pass the model's counter as
+    `count` for exact numbers at the price of a round trip per measurement.
+    """
+    def __init__(self, name: str, budget: Optional[int] = None, count: Callable[[str], int] = None):
+        self.name = name
+        self.budget = budget if budget is not None else get_budget(name)
+        self.count = count or estimate_tokens
+
+    def build(self, template: str, fixed: Dict[str, str] = None, insights: Sequence[Any] = (),
+              line: InsightLine = full_line, lists: Dict[str, Sequence[str]] = None,
+              render_list: Callable[[str, Sequence[str]], str] = None) -> Prompt:
+        fixed = fixed or {}
+        lists = {name: list(items or []) for name, items in (lists or {}).items()}
+        render_list = render_list or (lambda name, items: "\n".join(f"- {item}" for item in items))
+
+        def render(insight_lines, list_items):
+            rendered = {name: render_list(name, items) for name, items in list_items.items()}
+            return template.format(insights="\n".join(insight_lines), **fixed, **rendered)
+
+        full = render([line(i, i.content) for i in insights], lists)
+        full_tokens = self.count(full)
+        prompt = Prompt(self.name, full, full_tokens, self.budget, full_tokens)
+        if self.budget is None or full_tokens <= self.budget:
+            self._log(prompt)
+            return prompt
+
+        available = max(0, self.budget - self.count(render([], {name: [] for name in lists})))
+        trimmed = {name: newest_that_fit(items, int(available * LIST_SHARE), self.count)
+                   for name, items in lists.items()}
+        available -= sum(self.count(render_list(name, items)) for name, items in trimmed.items())
+        lines, kept, total, dropped = compact_insights(list(insights), max(0, available), line, self.count)
+
+        text = render(lines, trimmed)
+        prompt = Prompt(self.name, text, self.count(text), self.budget, full_tokens, kept, total, dropped)
+        self._log(prompt)
+        return prompt
+
+    def _log(self, prompt: Prompt):
+        print(prompt.log_line())
+        trace = current_span()
+        if trace:
+            trace.set(**{"prompt.tokens": prompt.tokens, "prompt.budget": prompt.budget,
+                         "prompt.tokens_saved": prompt.saved})
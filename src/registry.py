@@ -0,0 +1,170 @@
+import json
+import os
+from array import array
+from datetime import date
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+from .logic import PLANNING_HORIZON_DAYS, HYPE_HORIZON_DAYS
+
+if TYPE_CHECKING:
+    from .models import Trip
+
+TRIPS_FILE = "trips.json"
+
+DATE_FIELDS = ("flight_out_date", "ski_start_date", "ski_end_date", "flight_back_date")
+
+class TripDates(NamedTuple):
+    """The date fields of a trip; enough for `determine_phase` without validating the rest."""
+    flight_out_date: date
+    ski_start_date: date
+    ski_end_date: date
+    flight_back_date: date
+
+class IntervalIndex:
+    """
+    Static centered interval tree over closed integer intervals. `query(point)`
+    returns the ids of every interval containing the point in O(log n + k).
+    """
+    def __init__(self, starts: Sequence[int], ends: Sequence[int], ids: List[int]):
+        # Interval i is [starts[i], ends[i]]. Nodes are stored flat: center,
+        # left child, right child and the ids of the intervals spanning the
+        # center, sorted by start and by end (descending).
+        self._starts = starts
+        self._ends = ends
+        self._center = array("l")
+        self._left = array("l")
+        self._right = array("l")
+        self._by_start: List[List[int]] = []
+        self._by_end: List[List[int]] = []
+        self._root = self._build(list(ids))
+
+    def _build(self, ids: List[int]) -> int:
+        if not ids:
+            return -1
+        # The median start: at least one interval spans it, so every level shrinks
+        center = sorted(self._starts[i] for i in ids)[len(ids) // 2]
+        # An empty interval (start > end) contains no point; it goes in no child,
+        # or it could land on the same side forever
+        left = [i for i in ids if self._starts[i] <= self._ends[i] < center]
+        right = [i for i in ids if center < self._starts[i] <= self._ends[i]]
+        spanning = [i for i in ids if self._starts[i] <= center <= self._ends[i]]
+
+        node = len(self._center)
+        self._center.append(center)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._by_start.append(sorted(spanning, key=self._starts.__getitem__))
+        self._by_end.append(sorted(spanning, key=self._ends.__getitem__, reverse=True))
+        self._left[node] = self._build(left)
+        self._right[node] = self._build(right)
+        return node
+
+    def query(self, point: int) -> List[int]:
+        found = []
+        node = self._root
+        while node != -1:
+            center = self._center[node]
+            if point < center:
+                for i in self._by_start[node]:
+                    if self._starts[i] > point:
+                        break
+                    found.append(i)
+                node = self._left[node]
+            elif point > center:
+                for i in self._by_end[node]:
+                    if self._ends[i] < point:
+                        break
+                    found.append(i)
+                node = self._right[node]
+            else:
+                found.extend(self._by_start[node])
+                break
+        return sorted(found)
+
+class TripRegistry:
+    """
+    Trips from `trips.json`, kept as raw records plus columnar date arrays
+    (day ordinals). Only the dates are parsed up front; a full `Trip` is
+    validated the first time `trip(i)` asks for it. Indices are positions in
+    the file. Records whose dates can't be parsed, or are out of order (e.g.
+    flight back before flight out), are left out of the indexes and reported
+    in `invalid`.
+
+    Two interval indexes (built on first query) answer "which trips need
+    attention on this day": one over the whole window from the start of weekly
+    planning to flight back, and one over the daily part (hype onwards), which
+    is all that matters on days without a weekly update.
+    """
+    def __init__(self, records: List[Dict]):
+        self._records = records
+        self._trips: Dict[int, "Trip"] = {}
+        self._dates: List[Optional[TripDates]] = []
+        self._indexes: Dict[int, IntervalIndex] = {}
+        self.invalid: Dict[int, str] = {}
+        self.names = [str(r.get("resort_name", "")) if isinstance(r, dict) else "" for r in records]
+
+        parse = date.fromisoformat
+        for i, record in enumerate(records):
+            try:
+                dates = TripDates(parse(record["flight_out_date"]), parse(record["ski_start_date"]),
+                                  parse(record["ski_end_date"]), parse(record["flight_back_date"]))
+                if list(dates) != sorted(dates):
+                    raise ValueError(f"dates out of order: {', '.join(str(d) for d in dates)}")
+            except (KeyError, TypeError, ValueError) as e:
+                self.invalid[i] = f"{type(e).__name__}: {e}"
+                dates = None
+            self._dates.append(dates)
+        self.columns = {field: array("l", (getattr(d, field).toordinal() if d else 0 for d in self._dates))
+                        for field in DATE_FIELDS}
+
+    @classmethod
+    def load(cls, path: str = TRIPS_FILE) -> "TripRegistry":
+        if not os.path.exists(path):
+            print(f"Trips file not found: {path}")
+            return cls([])
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def indexed(self) -> List[int]:
+        """Indices of every trip with valid dates."""
+        return [i for i in range(len(self)) if i not in self.invalid]
+
+    def dates(self, index: int) -> Optional[TripDates]:
+        return self._dates[index]
+
+    def window(self, index: int) -> Optional[tuple]:
+        """First and last day (inclusive) on which the trip can need a message."""
+        if index in self.invalid:
+            return None
+        return (date.fromordinal(self.columns["flight_out_date"][index] - PLANNING_HORIZON_DAYS),
+                date.fromordinal(self.columns["flight_back_date"][index]))
+
+    def active_on(self, day: date, daily_only: bool = False) -> List[int]:
+        """
+        Indices of trips whose window contains `day`; with `daily_only`, only
+        those past the weekly planning stretch.
+        """
+        return self._index(HYPE_HORIZON_DAYS if daily_only else PLANNING_HORIZON_DAYS).query(day.toordinal())
+
+    def _index(self, lead_days: int) -> IntervalIndex:
+        """Interval index over [flight_out - lead_days, flight_back], built on first use."""
+        index = self._indexes.get(lead_days)
+        if index is None:
+            starts = array("l", (d - lead_days for d in self.columns["flight_out_date"]))
+            index = self._indexes[lead_days] = IntervalIndex(starts, self.columns["flight_back_date"],
+                                                              self.indexed())
+        return index
+
+    def trip(self, index: int) -> "Trip":
+        """The validated trip; raises pydantic.ValidationError for a malformed record."""
+        trip = self._trips.get(index)
+        if trip is None:
+            from .models import Trip
+            trip = self._trips[index] = Trip(**self._records[index])
+        return trip
+
+    def trips(self) -> List["Trip"]:
+        return [self.trip(i) for i in range(len(self))]
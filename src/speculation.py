@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Callable, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+CLAIMED = "claimed"
+CANCELLED = "cancelled"
+
+class SpeculationStats:
+    """Run-wide counters for speculative drafts."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"kept": 0, "discarded": 0, "not_started": 0}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    @property
+    def keep_rate(self) -> Optional[float]:
+        started = self.counts["kept"] + self.counts["discarded"]
+        return self.counts["kept"] / started if started else None
+
+    def summary(self) -> str:
+        rate = self.keep_rate
+        rate_str = f"{rate:.0%}" if rate is not None else "n/a"
+        return (f"kept {self.counts['kept']}, discarded {self.counts['discarded']}, "
+                f"not started {self.counts['not_started']} (keep rate {rate_str})")
+
+class Speculation:
+    """
+    A draft started from first-round insights while refined search is still
+    running. Exactly one side ends up producing the message:
+
+    - the speculative stage runs it, unless it was claimed or cancelled first;
+    - `resolve(material=False)` keeps (or waits for) the speculative draft. If
+      it has not started yet, the caller claims it and drafts inline, so the
+      final stage never blocks on a stage that is still queued.
+    - `resolve(material=True)` cancels a queued speculation, or discards a
+      running one, and the caller redrafts with the refined insights.
+    """
+    def __init__(self, stats: SpeculationStats = None):
+        self.stats = stats or SpeculationStats()
+        self.state = PENDING
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        """Called by the speculative stage. Returns None if the work was claimed or cancelled."""
+        with self._lock:
+            if self.state != PENDING:
+                return None
+            self.state = RUNNING
+        try:
+            self._result = func()
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._lock:
+                self.state = DONE
+            self._done.set()
+        return self._result
+
+    def resolve(self, material: bool, redraft: Callable[[], Any]) -> Any:
+        """Called by the final draft stage once refined insights are known."""
+        with self._lock:
+            state = self.state
+            if state == PENDING:
+                self.state = CANCELLED if material else CLAIMED
+
+        if state == PENDING:
+            self.stats.record("not_started")
+            return redraft()
+        if material:
+            self.stats.record("discarded")
+            return redraft()
+
+        self._done.wait()
+        if self._error is not None:
+            print(f"Speculative draft failed ({self._error}); drafting again.")
+            self.stats.record("discarded")
+            return redraft()
+        self.stats.record("kept")
+        return self._result
+
+def is_material(first_round: list, final: list) -> bool:
+    """Whether refinement changed the insight set the draft would be built from."""
+    first_urls = {i.url for i in first_round}
+    return any(i.url not in first_urls for i in final)
@@ -1,81 +1,423 @@
 import json
 import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Any, Dict, Iterable, List, Optional
 
-STATE_FILE = "state.json"
-MAX_SEEN_URLS = 50
+from .dedup import SimHashIndex, canonicalize_url, fingerprint_hex
 
-def load_state() -> Dict:
-    """Load state from state.json, return empty dict if not found."""
-    if not os.path.exists(STATE_FILE):
+STATE_FILE = "state.json" # Legacy single-file state, migrated on first use
+STATE_DIR = os.getenv("STATE_DIR", "state")
+STATE_DB = os.getenv("STATE_DB", "state.db")
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json")
+# Per resort and kind. High enough that content doesn't come back within a season.
+MAX_SEEN_ITEMS = int(os.getenv("STATE_MAX_SEEN_ITEMS", "10000"))
+# How much history the drafting prompt gets to see.
+PROMPT_HISTORY = 50
+
+SEEN_URLS = "seen_urls"
+SEEN_TRIVIA = "seen_trivia"
+SEEN_CHALLENGES = "seen_challenges"
+SEEN_CONTENT = "seen_content" # SimHash fingerprints (hex) of used insight bodies
+SEEN_KINDS = [SEEN_URLS, SEEN_TRIVIA, SEEN_CHALLENGES, SEEN_CONTENT]
+DOCUMENTS_DIR = "_documents" # Under STATE_DIR, for the json backend
+
+def resort_key(resort_name: str) -> str:
+    return resort_name.lower().replace(" ", "_")
+
+class ResortState:
+    """
+    One resort's memory. Seen items are kept in insertion-ordered dicts, so
+    membership is a set lookup and the oldest entry is evicted first.
+    Changes since the last save are tracked for the store.
+    """
+    def __init__(self, key: str, seen: Dict[str, Iterable[str]] = None, last_run: str = None):
+        self.key = key
+        self.seen: Dict[str, Dict[str, None]] = {
+            kind: dict.fromkeys((seen or {}).get(kind) or []) for kind in SEEN_KINDS
+        }
+        self.last_run = last_run
+        self.added: Dict[str, List[str]] = {kind: [] for kind in SEEN_KINDS}
+        self.removed: Dict[str, List[str]] = {kind: [] for kind in SEEN_KINDS}
+        self.dirty = False
+        self._indexes: Dict[str, SimHashIndex] = {}
+        self._index_lock = threading.Lock()
+
+    def has(self, kind: str, item: str) -> bool:
+        return item in self.seen[kind]
+
+    def add(self, kind: str, item: str, limit: int = None):
+        items = self.seen[kind]
+        if not item or item in items:
+            return
+        items[item] = None
+        self.added[kind].append(item)
+        if kind in self._indexes:
+            self._index_add(self._indexes[kind], kind, item)
+        limit = limit or MAX_SEEN_ITEMS
+        while len(items) > limit:
+            oldest = next(iter(items))
+            del items[oldest]
+            self.removed[kind].append(oldest)
+        self.dirty = True
+
+    @staticmethod
+    def _index_add(index: SimHashIndex, kind: str, item: str):
+        if kind == SEEN_CONTENT:
+            index.add_fingerprint(int(item, 16))
+        else:
+            index.add(item)
+
+    def near_index(self, kind: str) -> SimHashIndex:
+        """
+        Near-duplicate index over one kind, built on first use. Evicted items
+        stay in the index until the state is reloaded.
+        """
+        with self._index_lock:
+            if kind not in self._indexes:
+                index = SimHashIndex()
+                for item in self.seen[kind]:
+                    self._index_add(index, kind, item)
+                self._indexes[kind] = index
+            return self._indexes[kind]
+
+    def items(self, kind: str) -> List[str]:
+        return list(self.seen[kind])
+
+    def recent(self, kind: str, limit: int) -> List[str]:
+        items = self.seen[kind]
+        return list(items)[-limit:] if limit else list(items)
+
+    def touch(self, when: str = None):
+        self.last_run = when or datetime.now().isoformat()
+        self.dirty = True
+
+    def to_dict(self) -> Dict:
+        data = {kind: self.items(kind) for kind in SEEN_KINDS}
+        data["last_run"] = self.last_run
+        return data
+
+    def mark_clean(self):
+        for kind in SEEN_KINDS:
+            self.added[kind].clear()
+            self.removed[kind].clear()
+        self.dirty = False
+
+class StateStore(ABC):
+    """
+    Interface for state backends. Resorts are loaded lazily and saved
+    incrementally. Run-wide documents (e.g. provider health) are kept next to
+    them by name through `document()` / `set_document()` and written on `save()`.
+    """
+    @abstractmethod
+    def resort(self, key: str) -> ResortState:
+        ...
+
+    @abstractmethod
+    def document(self, name: str) -> Dict:
+        ...
+
+    @abstractmethod
+    def set_document(self, name: str, data: Dict):
+        ...
+
+    @abstractmethod
+    def resort_keys(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def save(self):
+        ...
+
+    def close(self):
+        pass
+
+    def is_empty(self) -> bool:
+        return not self.resort_keys()
+
+    def import_resort(self, key: str, data: Dict):
+        """Bulk-load one resort from the legacy dict format."""
+        resort = self.resort(key)
+        for kind in SEEN_KINDS:
+            for item in data.get(kind) or []:
+                resort.add(kind, item)
+        if data.get("last_run"):
+            resort.touch(data["last_run"])
+
+class JsonShardStore(StateStore):
+    """
+    One JSON file per resort in `directory`. Only shards that changed since
+    the last save are rewritten (atomically).
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory or STATE_DIR
+        self._resorts: Dict[str, ResortState] = {}
+        self._documents: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _document_path(self, name: str) -> str:
+        # In a subdirectory, so documents are never listed as resorts
+        return os.path.join(self.directory, DOCUMENTS_DIR, f"{name}.json")
+
+    def document(self, name: str) -> Dict:
+        path = self._document_path(name)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading state document {path}: {e}")
+            return {}
+
+    def set_document(self, name: str, data: Dict):
+        with self._lock:
+            self._documents[name] = data
+
+    def _load(self, key: str) -> ResortState:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return ResortState(key)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading state shard {path}: {e}")
+            return ResortState(key)
+        return ResortState(key, data, data.get("last_run"))
+
+    def resort(self, key: str) -> ResortState:
+        with self._lock:
+            if key not in self._resorts:
+                self._resorts[key] = self._load(key)
+            return self._resorts[key]
+
+    def resort_keys(self) -> List[str]:
+        keys = set(self._resorts)
+        if os.path.isdir(self.directory):
+            keys.update(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        return sorted(keys)
+
+    def save(self):
+        with self._lock:
+            dirty = [r for r in self._resorts.values() if r.dirty]
+            documents, self._documents = self._documents, {}
+        if not dirty and not documents:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for resort in dirty:
+            path = self._path(resort.key)
+            try:
+                self._write(path, resort.to_dict())
+                resort.mark_clean()
+            except IOError as e:
+                print(f"Error saving state shard {path}: {e}")
+        for name, data in documents.items():
+            path = self._document_path(name)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._write(path, data)
+            except IOError as e:
+                print(f"Error saving state document {path}: {e}")
+
+    @staticmethod
+    def _write(path: str, data: Dict):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+class SqliteStore(StateStore):
+    """
+    SQLite-backed state. Each resort is read with one indexed query; saving
+    writes only the new/evicted rows of dirty resorts in a single transaction.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or STATE_DB
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._resorts: Dict[str, ResortState] = {}
+        self._documents: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " resort TEXT NOT NULL, kind TEXT NOT NULL, item TEXT NOT NULL,"
+                " PRIMARY KEY (resort, kind, item))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resorts (resort TEXT PRIMARY KEY, last_run TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (name TEXT PRIMARY KEY, data TEXT NOT NULL)"
+            )
+
+    def _load(self, key: str) -> ResortState:
+        seen: Dict[str, List[str]] = {kind: [] for kind in SEEN_KINDS}
+        rows = self._conn.execute(
+            "SELECT kind, item FROM seen WHERE resort = ? ORDER BY rowid", (key,)
+        )
+        for kind, item in rows:
+            seen.setdefault(kind, []).append(item)
+        row = self._conn.execute("SELECT last_run FROM resorts WHERE resort = ?", (key,)).fetchone()
+        return ResortState(key, seen, row[0] if row else None)
+
+    def resort(self, key: str) -> ResortState:
+        with self._lock:
+            if key not in self._resorts:
+                self._resorts[key] = self._load(key)
+            return self._resorts[key]
+
+    def document(self, name: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM documents WHERE name = ?", (name,)).fetchone()
+        try:
+            return json.loads(row[0]) if row else {}
+        except json.JSONDecodeError as e:
+            print(f"Error loading state document {name}: {e}")
+            return {}
+
+    def set_document(self, name: str, data: Dict):
+        with self._lock:
+            self._documents[name] = data
+
+    def resort_keys(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT resort FROM resorts UNION SELECT DISTINCT resort FROM seen")
+            return sorted(set(self._resorts) | {r[0] for r in rows})
+
+    def save(self):
+        with self._lock:
+            dirty = [r for r in self._resorts.values() if r.dirty]
+            documents, self._documents = self._documents, {}
+            if not dirty and not documents:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO documents (name, data) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+                    [(name, json.dumps(data)) for name, data in documents.items()],
+                )
+                for resort in dirty:
+                    for kind in SEEN_KINDS:
+                        # Deletes first: an item evicted and added again since the last
+                        # save gets a fresh row (so it is the newest again on reload),
+                        # and one added then evicted is never written.
+                        self._conn.executemany(
+                            "DELETE FROM seen WHERE resort = ? AND kind = ? AND item = ?",
+                            [(resort.key, kind, item) for item in dict.fromkeys(resort.removed[kind])],
+                        )
+                        # In the order of each item's latest add, which is its place in memory
+                        added = reversed(dict.fromkeys(reversed(resort.added[kind])))
+                        self._conn.executemany(
+                            "INSERT OR IGNORE INTO seen (resort, kind, item) VALUES (?, ?, ?)",
+                            [(resort.key, kind, item) for item in added if resort.has(kind, item)],
+                        )
+                    self._conn.execute(
+                        "INSERT INTO resorts (resort, last_run) VALUES (?, ?) "
+                        "ON CONFLICT(resort) DO UPDATE SET last_run = excluded.last_run",
+                        (resort.key, resort.last_run),
+                    )
+            for resort in dirty:
+                resort.mark_clean()
+
+    def close(self):
+        self._conn.close()
+
+def load_state(path: str = None) -> Dict:
+    """Load the legacy state.json, return empty dict if not found."""
+    path = path or STATE_FILE
+    if not os.path.exists(path):
         return {}
     try:
-        with open(STATE_FILE, "r") as f:
+        with open(path, "r") as f:
             return json.load(f)
     except (json.JSONDecodeError, IOError) as e:
         print(f"Error loading state: {e}")
         return {}
 
-def save_state(state: Dict):
-    """Save state to state.json."""
-    try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2)
-    except IOError as e:
-        print(f"Error saving state: {e}")
-
-def get_resort_state(state: Dict, resort_name: str) -> Dict:
-    """Get state for a specific resort, initialized if missing."""
-    key = resort_name.lower().replace(" ", "_")
-    if key not in state:
-        state[key] = {
-            "seen_urls": [],
-            "seen_trivia": [],
-            "seen_challenges": [],
-            "last_run": None
-        }
-    # Ensure all keys exist for backwards compatibility
-    if "seen_trivia" not in state[key]:
-        state[key]["seen_trivia"] = []
-    if "seen_challenges" not in state[key]:
-        state[key]["seen_challenges"] = []
-    return state[key]
-
-def is_url_seen(resort_state: Dict, url: str) -> bool:
-    """Check if a URL has been seen before for this resort."""
-    return url in resort_state.get("seen_urls", [])
-
-def mark_url_seen(resort_state: Dict, url: str):
-    """Mark a URL as seen and trim the list if it exceeds MAX_SEEN_URLS."""
-    seen = resort_state.get("seen_urls", [])
-    if url not in seen:
-        seen.append(url)
-        # Keep only the last MAX_SEEN_URLS
-        resort_state["seen_urls"] = seen[-MAX_SEEN_URLS:]
-
-def update_last_run(resort_state: Dict):
+def migrate_legacy_state(store: StateStore, path: str = None) -> int:
+    """
+    Import the legacy state.json into an empty store. The old file is left in
+    place; once the store has data it is ignored. Returns the number of resorts imported.
+    """
+    path = path or STATE_FILE
+    if not os.path.exists(path) or not store.is_empty():
+        return 0
+    legacy = load_state(path)
+    for key, data in legacy.items():
+        store.import_resort(key, data)
+    store.save()
+    print(f"Migrated {len(legacy)} resort(s) from {path}.")
+    return len(legacy)
+
+def open_store(backend: str = None) -> StateStore:
+    """Open the configured backend (STATE_BACKEND=json|sqlite), migrating legacy state if needed."""
+    backend = (backend or STATE_BACKEND).lower()
+    if backend == "sqlite":
+        store: StateStore = SqliteStore()
+    elif backend == "json":
+        store = JsonShardStore()
+    else:
+        raise ValueError(f"Unknown state backend: {backend}")
+    migrate_legacy_state(store)
+    return store
+
+def get_resort_state(store: StateStore, resort_name: str, group: str = None) -> ResortState:
+    """Get state for a specific resort (and travelling group, if any), initialized if missing."""
+    key = resort_key(resort_name)
+    return store.resort(f"{key}@{resort_key(group)}" if group else key)
+
+def is_url_seen(resort_state: ResortState, url: str) -> bool:
+    """Check if a URL (or a tracking/AMP/mobile variant of it) has been seen before for this resort."""
+    # Raw lookup too, for URLs stored before canonicalization
+    return resort_state.has(SEEN_URLS, canonicalize_url(url)) or resort_state.has(SEEN_URLS, url)
+
+def mark_url_seen(resort_state: ResortState, url: str):
+    """Mark a URL as seen, evicting the oldest beyond MAX_SEEN_ITEMS."""
+    resort_state.add(SEEN_URLS, canonicalize_url(url))
+
+def is_content_seen(resort_state: ResortState, text: str) -> bool:
+    """Check if a near-duplicate of this insight body has already been used."""
+    return resort_state.near_index(SEEN_CONTENT).contains(text)
+
+def mark_insight_seen(resort_state: ResortState, insight: Any):
+    """Mark an insight's URL and body fingerprint as used."""
+    mark_url_seen(resort_state, insight.url)
+    fp = fingerprint_hex(insight.content)
+    if fp is not None:
+        resort_state.add(SEEN_CONTENT, fp)
+
+def update_last_run(resort_state: ResortState):
     """Update the last run timestamp to now."""
-    resort_state["last_run"] = datetime.now().isoformat()
-
-def mark_trivia_seen(resort_state: Dict, trivia_text: str):
-    """Mark a trivia fact as seen and trim the list if needed."""
-    seen = resort_state.get("seen_trivia", [])
-    if trivia_text and trivia_text not in seen:
-        seen.append(trivia_text)
-        resort_state["seen_trivia"] = seen[-MAX_SEEN_URLS:]
-
-def mark_challenge_seen(resort_state: Dict, challenge_text: str):
-    """Mark a challenge as seen and trim the list if needed."""
-    seen = resort_state.get("seen_challenges", [])
-    if challenge_text and challenge_text not in seen:
-        seen.append(challenge_text)
-        resort_state["seen_challenges"] = seen[-MAX_SEEN_URLS:]
-
-def get_seen_trivia(resort_state: Dict) -> List[str]:
-    """Get list of previously seen trivia."""
-    return resort_state.get("seen_trivia", [])
-
-def get_seen_challenges(resort_state: Dict) -> List[str]:
-    """Get list of previously seen challenges."""
-    return resort_state.get("seen_challenges", [])
+    resort_state.touch()
+
+def is_trivia_seen(resort_state: ResortState, trivia_text: str) -> bool:
+    """Check if this trivia fact (or a rewording of it) was used before."""
+    return resort_state.near_index(SEEN_TRIVIA).contains(trivia_text)
+
+def is_challenge_seen(resort_state: ResortState, challenge_text: str) -> bool:
+    """Check if this challenge (or a rewording of it) was used before."""
+    return resort_state.near_index(SEEN_CHALLENGES).contains(challenge_text)
+
+def mark_trivia_seen(resort_state: ResortState, trivia_text: str):
+    """Mark a trivia fact as seen, unless a near-duplicate is already recorded."""
+    if trivia_text and not is_trivia_seen(resort_state, trivia_text):
+        resort_state.add(SEEN_TRIVIA, trivia_text)
+
+def mark_challenge_seen(resort_state: ResortState, challenge_text: str):
+    """Mark a challenge as seen, unless a near-duplicate is already recorded."""
+    if challenge_text and not is_challenge_seen(resort_state, challenge_text):
+        resort_state.add(SEEN_CHALLENGES, challenge_text)
+
+def get_seen_trivia(resort_state: ResortState, limit: Optional[int] = PROMPT_HISTORY) -> List[str]:
+    """Get the most recent previously seen trivia."""
+    return resort_state.recent(SEEN_TRIVIA, limit)
+
+def get_seen_challenges(resort_state: ResortState, limit: Optional[int] = PROMPT_HISTORY) -> List[str]:
+    """Get the most recent previously seen challenges."""
+    return resort_state.recent(SEEN_CHALLENGES, limit)
@@ -0,0 +1,175 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+TRACE_FILE = os.getenv("BRRRNANDO_TRACE_FILE", "trace.json")
+SERVICE_NAME = "brrrnando"
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("brrrnando_span", default=None)
+
+class Span:
+    """One timed operation. Attributes and events follow OpenTelemetry naming."""
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else tracer.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.events: List[Dict[str, Any]] = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.status == STATUS_UNSET:
+                self.status = STATUS_OK
+            self.tracer._finish(self)
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+class Tracer:
+    """
+    Collects finished spans for the run. Spans nest through a context variable,
+    so anything called inside `span()` becomes a child; work handed to another
+    thread keeps its parent when submitted with `contextvars.copy_context()`
+    or started with an explicit `parent`.
+    """
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        return Span(self, name, parent or _current.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes):
+        span = self.start_span(name, parent, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_otlp(self, resource: Dict[str, Any] = None) -> Dict[str, Any]:
+        """The trace in OTLP/JSON form (as accepted by an OTLP HTTP collector)."""
+        with self._lock:
+            spans = list(self.spans)
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, **(resource or {})})},
+            "scopeSpans": [{
+                "scope": {"name": "src.tracing"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": s.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": _otlp_attributes(s.attributes),
+                    "events": [{"name": e["name"], "timeUnixNano": str(e["time_ns"]),
+                                "attributes": _otlp_attributes(e["attributes"])} for e in s.events],
+                    "status": {"code": s.status, **({"message": s.status_message} if s.status_message else {})},
+                } for s in spans],
+            }],
+        }]}
+
+    def export(self, path: str = None, resource: Dict[str, Any] = None) -> str:
+        path = path or TRACE_FILE
+        try:
+            with open(path, "w") as f:
+                json.dump(self.to_otlp(resource), f)
+        except IOError as e:
+            print(f"Error writing trace: {e}")
+        return path
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total, p50, p95 and errors per span name."""
+        with self._lock:
+            spans = list(self.spans)
+        by_name: Dict[str, List[Span]] = {}
+        for s in spans:
+            by_name.setdefault(s.name, []).append(s)
+        rows = {}
+        for name, group in by_name.items():
+            durations = sorted(s.duration for s in group)
+            rows[name] = {
+                "count": len(group),
+                "total": sum(durations),
+                "p50": durations[len(durations) // 2],
+                "p95": durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+                "errors": sum(1 for s in group if s.status == STATUS_ERROR),
+            }
+        return rows
+
+    def summary_lines(self) -> List[str]:
+        rows = self.summary()
+        lines = [f"{'span':<28} {'count':>6} {'total s':>9} {'p50 s':>8} {'p95 s':>8} {'errors':>7}"]
+        for name, r in sorted(rows.items(), key=lambda item: -item[1]["total"]):
+            lines.append(f"{name:<28} {r['count']:>6} {r['total']:>9.2f} {r['p50']:>8.3f} "
+                         f"{r['p95']:>8.3f} {r['errors']:>7}")
+        return lines
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def set_tracer(tracer: Tracer):
+    global _tracer
+    _tracer = tracer
+
+def span(name: str, parent: Optional[Span] = None, **attributes):
+    """Shorthand for get_tracer().span(...)."""
+    return _tracer.span(name, parent, **attributes)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
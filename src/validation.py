@@ -0,0 +1,109 @@
+import re
+from typing import List, Any, Optional
+
+from .extraction import extract_trivia, extract_challenge
+from .dedup import SimHashIndex
+
+# Words the drafting prompt bans outright.
+BANNED_WORDS = ["Legends", "Magic", "Wooohooo", "CHOO CHOO", "EPIC", "Woooooow"]
+# WhatsApp (and Telegram) reject text bodies longer than this.
+MAX_MESSAGE_CHARS = 4096
+
+_BANNED_PATTERNS = [re.compile(r"\b" + re.escape(word) + r"\b", re.IGNORECASE) for word in BANNED_WORDS]
+# Stretched variants the list above can't enumerate ("Woooow", "Wooohoooo").
+_BANNED_PATTERNS.append(re.compile(r"\bwo{3,}(?:h+o+)?w*\b", re.IGNORECASE))
+
+_PLACEHOLDER_PATTERNS = [
+    re.compile(r"\[[^\]\n]{1,40}\](?!\()"), # [Resort Name], but not [text](url)
+    re.compile(r"\{\{?[^}\n]{1,40}\}?\}"),  # {resort} / {{venue}}
+    re.compile(r"<[A-Za-z _]{1,30}>"),     # <venue name>
+    re.compile(r"\?{3,}"),
+    re.compile(r"\b(?:TBD|TODO|XXX|lorem ipsum)\b", re.IGNORECASE),
+]
+
+# Violations certain enough to stop a streamed draft early
+_HARD_RULES = ([(p, "Remove the placeholder '{}' and use real data.") for p in _PLACEHOLDER_PATTERNS] +
+               [(p, "Do not use the banned word '{}'.") for p in _BANNED_PATTERNS])
+
+_DISMISSIVE_PATTERNS = [
+    re.compile(r"could(?: not|n't) (?:get|find|retrieve) (?:any )?(?:info|information|data)", re.IGNORECASE),
+    re.compile(r"no (?:information|data) (?:is )?available", re.IGNORECASE),
+]
+
+# Longest span a hard-violation pattern can match; a streamed chunk is scanned
+# together with this much of the text before it.
+STREAM_LOOKBACK_CHARS = 64
+
+class StreamChecker:
+    """
+    Incremental version of the hard lint rules (placeholders and banned words)
+    for a draft arriving in chunks. `feed` returns the first violation as soon
+    as it is certain: a match touching the end of the text so far is not
+    reported yet, since the next chunk could change it ("EPIC" -> "EPICENTRE",
+    "[text]" -> "[text](url)").
+    """
+    def __init__(self):
+        self.text = ""
+        self._scanned = 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        self.text += chunk
+        start = max(0, self._scanned - STREAM_LOOKBACK_CHARS)
+        window = self.text[start:]
+        for pattern, message in _HARD_RULES:
+            for match in pattern.finditer(window):
+                if start + match.end() >= len(self.text):
+                    break
+                return message.format(match.group(0))
+        self._scanned = len(self.text)
+        return None
+
+def lint_draft(message: str, phase_name: str, insights: List[Any] = None,
+               used_before: List[str] = None) -> List[str]:
+    """
+    Deterministic checks for the rules in the drafting prompt.
+    `used_before` holds earlier trivia/challenges; repeating one (even reworded) is a violation.
+    Returns a list of human-readable violations (empty if the draft passes).
+    """
+    violations = []
+    if not message or not message.strip():
+        return ["The draft is empty."]
+
+    for pattern in _PLACEHOLDER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            violations.append(f"Remove the placeholder '{match.group(0)}' and use real data.")
+            break
+
+    for pattern in _BANNED_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            violations.append(f"Do not use the banned word '{match.group(0)}'.")
+
+    for pattern in _DISMISSIVE_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            violations.append(f"Drop the dismissive phrase '{match.group(0)}'.")
+
+    if phase_name == "active":
+        trivia, challenge = extract_trivia(message), extract_challenge(message)
+        if not trivia and not challenge:
+            violations.append("Add the '--- 🏆 BRRRNANDO'S DAILY CHALLENGE ---' or "
+                              "'--- 💡 SKI NERD TRIVIA ---' section at the end.")
+        elif used_before:
+            history = SimHashIndex()
+            for text in used_before:
+                history.add(text)
+            if any(section and history.contains(section) for section in (trivia, challenge)):
+                violations.append("The trivia/challenge repeats one already used; pick a new one.")
+
+        insight_urls = [i.url for i in insights or [] if getattr(i, "url", "")]
+        if insight_urls:
+            if not any(url in message for url in insight_urls):
+                violations.append("Include at least one link from LOCAL INSIGHTS.")
+
+    if len(message) > MAX_MESSAGE_CHARS:
+        violations.append(f"Shorten the message to under {MAX_MESSAGE_CHARS} characters "
+                          f"(currently {len(message)}).")
+
+    return violations
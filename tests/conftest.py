@@ -0,0 +1,9 @@
+import pytest
+import src.cache
+
+@pytest.fixture(autouse=True)
+def no_disk_cache():
+    # Keep tests hermetic: never read or write the developer's .cache directory.
+    src.cache.set_cache_enabled(False)
+    yield
+    src.cache.set_cache_enabled(True)
@@ -0,0 +1,32 @@
+import json
+import subprocess
+import sys
+from benchmarks.bench_e2e import BENCH_DATE, ROOT, parse_spec, synthetic_trips
+from datetime import date
+from src.logic import Phase, determine_phase
+from src.models import Trip
+from src.planner import run_modes
+
+def test_synthetic_trips_cover_every_phase():
+    today = date(2026, 2, 16)
+    phases = {determine_phase(Trip(**t), today) for t in synthetic_trips(len(Phase), today)}
+    assert phases == set(Phase)
+
+def test_first_synthetic_trip_produces_a_message():
+    trip = Trip(**synthetic_trips(1, BENCH_DATE)[0])
+    assert run_modes(determine_phase(trip, BENCH_DATE), BENCH_DATE) == ("morning", "evening")
+
+def test_parse_spec():
+    assert parse_spec("gemini=300,search=0.1") == {"gemini": 300.0, "search": 0.1}
+    assert parse_spec("5")["telegram"] == 5.0
+
+def test_small_offline_run(tmp_path):
+    output = tmp_path / "bench.json"
+    subprocess.run([sys.executable, "-m", "benchmarks.bench_e2e", "--trips", "8", "--latency", "0",
+                    "--output", str(output)], cwd=ROOT, check=True, capture_output=True, timeout=120)
+    result = json.loads(output.read_text())["results"][0]
+    # Everything but the post-trip and waiting phases (weekly planning: BENCH_DATE is a Monday)
+    assert result["trips"] == 8 and result["active_trips"] == 6
+    assert result["stage_errors"] == 0
+    assert result["stages"]["deliver"]["count"] == result["active_trips"]
+    assert result["calls"]["telegram"]["total"] == result["active_trips"]
@@ -0,0 +1,47 @@
+import pytest
+import src.cache
+from src.cache import DiskCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    src.cache.set_cache_enabled(True)
+    return DiskCache("test", max_entries=3, cache_dir=str(tmp_path), clock=clock)
+
+def test_ttl_expiry(cache, clock):
+    cache.set("a", {"x": 1}, ttl=60)
+    assert cache.get("a") == {"x": 1}
+    clock.now += 61
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_lru_eviction(cache):
+    for key in ["a", "b", "c"]:
+        cache.set(key, key, ttl=60)
+    cache.get("a") # "b" is now least recently used
+    cache.set("d", "d", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.stats()["evictions"] == 1
+
+def test_persists_across_instances(cache, tmp_path, clock):
+    cache.set("a", [1, 2], ttl=60)
+    cache.flush()
+    reloaded = DiskCache("test", cache_dir=str(tmp_path), clock=clock)
+    assert reloaded.get("a") == [1, 2]
+
+def test_disabled_cache_is_bypassed(cache):
+    src.cache.set_cache_enabled(False)
+    cache.set("a", 1, ttl=60)
+    assert cache.get("a") is None
@@ -0,0 +1,93 @@
+import os
+from datetime import date
+from unittest.mock import MagicMock, patch
+from src.checkpoint import CheckpointStore
+from src.delivery import DeliveryService, Outbox
+from src.discovery import Insight
+from src.executor import DagExecutor
+from src.logic import Phase
+from src.models import Trip
+from src.pipeline import RunContext, TripRun, build_run_stages
+from src.state import ResortState
+
+RUN_DATE = date(2026, 2, 16)
+GOOD = "Summit 180cm, -8°C at Val Thorens. Dinner at Le Bouquetin."
+
+def test_results_are_only_reused_when_resuming(tmp_path):
+    first = CheckpointStore(RUN_DATE, "morning", directory=str(tmp_path))
+    first.put("trip", "draft", "Hello")
+    assert first.get("trip", "draft") == (False, None)
+
+    resumed = CheckpointStore(RUN_DATE, "morning", resume=True, directory=str(tmp_path))
+    assert resumed.get("trip", "draft") == (True, "Hello")
+    other_mode = CheckpointStore(RUN_DATE, "evening", resume=True, directory=str(tmp_path))
+    assert other_mode.get("trip", "draft") == (False, None)
+
+def test_checkpoints_expire(tmp_path):
+    now = [1000.0]
+    store = CheckpointStore(RUN_DATE, "morning", resume=True, directory=str(tmp_path),
+                            ttl_hours=1, clock=lambda: now[0])
+    store.put("trip", "weather", {"temp": -5})
+    now[0] += 3601
+    assert store.get("trip", "weather") == (False, None)
+
+    os.utime(store.path, (now[0] - 7200, now[0] - 7200))
+    assert store.purge_expired() == 1
+    assert not os.path.exists(store.path)
+
+def _run():
+    trip = Trip(resort_name="Val Thorens", flight_out_date=date(2026, 2, 14),
+                ski_start_date=date(2026, 2, 15), ski_end_date=date(2026, 2, 21),
+                flight_back_date=date(2026, 2, 22), lat=45.3, lon=6.58, road_check="check")
+    return TripRun(key="0:val_thorens", trip=trip, phase=Phase.HYPE_DAILY, resort_state=ResortState("val_thorens"))
+
+def _attempt(tmp_path, resume, draft_side_effect, channel_result=None):
+    engine = MagicMock()
+    engine.search_insights.return_value = [Insight(title="a", content="b", type="text", url="https://a.com")]
+    channel = MagicMock(return_value={"ok": True} if channel_result is None else channel_result)
+    ctx = RunContext(engine=engine, llm=None,
+                     checkpoints=CheckpointStore(RUN_DATE, "morning", resume=resume, directory=str(tmp_path)),
+                     delivery=DeliveryService(RUN_DATE, "morning", outbox=Outbox(str(tmp_path / "outbox.json")),
+                                              channels={"telegram": channel}))
+    run = _run()
+    with patch("src.pipeline.get_weather_batch", return_value={}) as mock_weather, \
+         patch("src.pipeline.evaluate_discovery", return_value=[]), \
+         patch("src.pipeline.generate_draft", side_effect=draft_side_effect) as mock_draft:
+        executor = DagExecutor()
+        executor.run(build_run_stages(ctx, [run]))
+    ctx.delivery.drain()
+    return executor, engine, mock_weather, mock_draft, channel
+
+def test_resume_skips_completed_stages(tmp_path):
+    executor, engine, _, _, channel = _attempt(tmp_path, False, RuntimeError("Gemini down"))
+    assert "0:val_thorens/deliver" in executor.errors
+    channel.assert_not_called()
+
+    executor, engine, mock_weather, mock_draft, channel = _attempt(tmp_path, True, lambda *a, **kw: GOOD)
+    assert not executor.errors
+    engine.search_insights.assert_not_called()
+    mock_weather.assert_not_called()
+    assert executor.results["0:val_thorens/discovery"][0].url == "https://a.com"
+    channel.assert_called_once_with(GOOD)
+
+    # Everything is checkpointed now, including the delivery
+    executor, engine, _, mock_draft, channel = _attempt(tmp_path, True, RuntimeError("unused"))
+    assert not executor.errors
+    mock_draft.assert_not_called()
+    channel.assert_not_called()
+
+def test_delivery_is_checkpointed_only_once_sent(tmp_path):
+    executor, _, _, _, channel = _attempt(tmp_path, False, lambda *a, **kw: GOOD, channel_result={})
+    assert not executor.errors
+    channel.assert_called_once_with(GOOD)
+    store = CheckpointStore(RUN_DATE, "morning", resume=True, directory=str(tmp_path))
+    assert "deliver" not in store.completed(_run().trip_id)
+
+    # A resumed attempt reuses the draft but sends again
+    os.remove(tmp_path / "outbox.json") # as on CI, where only the checkpoints are restored
+    executor, _, _, mock_draft, channel = _attempt(tmp_path, True, RuntimeError("unused"))
+    assert not executor.errors
+    mock_draft.assert_not_called()
+    channel.assert_called_once_with(GOOD)
+    store = CheckpointStore(RUN_DATE, "morning", resume=True, directory=str(tmp_path))
+    assert store.completed(_run().trip_id)["deliver"] == GOOD
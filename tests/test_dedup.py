@@ -0,0 +1,71 @@
+from src.dedup import canonicalize_url, simhash, hamming, SimHashIndex, unique_insights
+from src.discovery import Insight
+from src.state import (ResortState, is_url_seen, mark_url_seen, mark_insight_seen, is_content_seen,
+                       mark_trivia_seen, get_seen_trivia)
+
+SNOW = ("Fresh snow is expected this weekend in Val Thorens with up to 40cm forecast "
+        "on the upper slopes and strong winds at the summit")
+FOLIE = ("The Folie Douce reopens on Saturday with a new DJ lineup and a terrace "
+         "extension overlooking the Cime Caron lift")
+
+def test_canonicalize_url_variants():
+    canonical = "https://example.com/news/article?id=3"
+    assert canonicalize_url("https://www.example.com/news/article/?utm_source=x&id=3&fbclid=abc#top") == canonical
+    assert canonicalize_url("http://m.example.com/amp/news/article?id=3&amp=1") == canonical
+    assert canonicalize_url("https://amp.example.com/news/article?id=3") == canonical
+    assert canonicalize_url("https://youtu.be/abc123?si=xyz") == "https://youtube.com/watch?v=abc123"
+    assert canonicalize_url("https://www.youtube.com/watch?v=abc123&utm_source=share") == \
+        "https://youtube.com/watch?v=abc123"
+    # Meaningful parameters are kept
+    assert canonicalize_url("https://example.com/search?q=snow") != canonicalize_url("https://example.com/search?q=sun")
+    assert canonicalize_url("https://example.com/compare?ref=v2&feature=lifts") == \
+        "https://example.com/compare?feature=lifts&ref=v2"
+
+def test_canonicalize_url_keeps_registrable_names():
+    assert canonicalize_url("https://mobile.de/auto") == "https://mobile.de/auto"
+    assert canonicalize_url("https://amp.dev/docs") == "https://amp.dev/docs"
+    assert canonicalize_url("https://www.m.com/x") == "https://m.com/x"
+    assert canonicalize_url("https://www.amp.example.com/x") == "https://amp.example.com/x"
+
+def test_simhash_separates_rewording_from_new_content():
+    assert hamming(simhash(SNOW), simhash(SNOW + ". Read more")) <= 10
+    assert hamming(simhash(SNOW), simhash(FOLIE)) > 10
+    assert simhash("too short") is None
+
+def test_index_finds_near_duplicates():
+    index = SimHashIndex(max_distance=10)
+    index.add(SNOW)
+    index.add("Short fact")
+    assert index.contains(SNOW.replace("40cm", "35cm"))
+    assert not index.contains(FOLIE)
+    assert index.contains("short  FACT!")
+    assert not index.contains("Other fact")
+
+def test_unique_insights_drops_variants():
+    insights = [
+        Insight(title="a", content=SNOW, type="text", url="https://www.example.com/snow?utm_source=x"),
+        Insight(title="b", content="different", type="text", url="https://example.com/snow"),
+        Insight(title="c", content=SNOW + " Read more", type="text", url="https://other.com/syndicated"),
+        Insight(title="d", content=FOLIE, type="text", url="https://example.com/folie"),
+    ]
+    assert [i.title for i in unique_insights(insights)] == ["a", "d"]
+
+def test_state_uses_canonical_urls_and_fingerprints():
+    resort_state = ResortState("val_thorens")
+    mark_url_seen(resort_state, "https://www.example.com/a?utm_medium=email")
+    assert is_url_seen(resort_state, "https://example.com/a")
+
+    # URLs stored before canonicalization still match
+    resort_state.add("seen_urls", "https://www.example.com/legacy/")
+    assert is_url_seen(resort_state, "https://www.example.com/legacy/")
+
+    mark_insight_seen(resort_state, Insight(title="a", content=SNOW, type="text", url="https://x.com/1"))
+    assert is_content_seen(resort_state, SNOW + ". Read more")
+    assert not is_content_seen(resort_state, FOLIE)
+
+def test_reworded_trivia_is_not_stored_twice():
+    resort_state = ResortState("val_thorens")
+    mark_trivia_seen(resort_state, "Val Thorens sits at 2,300m, the highest resort in Europe.")
+    mark_trivia_seen(resort_state, "Val Thorens sits at 2,300m - the highest resort in Europe!")
+    mark_trivia_seen(resort_state, "Val Thorens opened in 1971 and was designed by Pierre Josserand.")
+    assert len(get_seen_trivia(resort_state)) == 2
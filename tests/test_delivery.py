@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import date
+from src.delivery import Outbox, DeliveryService, PENDING, SENT, UNCONFIGURED, EXPIRED
+
+RUN_DATE = date(2026, 2, 16)
+
+class FakeChannel:
+    def __init__(self, result=None, delay=0.0):
+        self.result = {"ok": True} if result is None else result
+        self.delay = delay
+        self.sent = []
+
+    def __call__(self, message):
+        time.sleep(self.delay)
+        self.sent.append(message)
+        return self.result
+
+def _service(tmp_path, channels, mode="morning"):
+    return DeliveryService(RUN_DATE, mode, outbox=Outbox(str(tmp_path / "outbox.json")), channels=channels)
+
+def test_channels_are_sent_concurrently(tmp_path):
+    channels = {"whatsapp": FakeChannel(delay=0.2), "telegram": FakeChannel(delay=0.2)}
+    service = _service(tmp_path, channels)
+    start = time.perf_counter()
+    service.submit("val_thorens:2026-02-14", "Hello")
+    counts = service.drain()
+    assert counts == {SENT: 2}
+    assert time.perf_counter() - start < 0.35
+    assert channels["whatsapp"].sent == ["Hello"]
+
+def test_rerun_of_same_slot_is_skipped(tmp_path):
+    channels = {"telegram": FakeChannel()}
+    first = _service(tmp_path, channels)
+    first.submit("trip", "Hello")
+    first.drain()
+
+    rerun = _service(tmp_path, channels)
+    assert rerun.submit("trip", "Hello again") == {}
+    assert channels["telegram"].sent == ["Hello"]
+
+    # A different mode is a different slot
+    evening = _service(tmp_path, channels, mode="evening")
+    evening.submit("trip", "Evening")
+    evening.drain()
+    assert channels["telegram"].sent == ["Hello", "Evening"]
+
+def test_failed_send_is_retried_next_run(tmp_path):
+    failing = {"whatsapp": FakeChannel(result={})}
+    service = _service(tmp_path, failing)
+    service.submit("trip", "Hello")
+    assert service.drain() == {PENDING: 1}
+
+    working = {"whatsapp": FakeChannel()}
+    retry = _service(tmp_path, working)
+    assert retry.retry_pending() == 1
+    assert retry.drain() == {SENT: 1}
+    assert working["whatsapp"].sent == ["Hello"]
+
+    entry = next(iter(Outbox(str(tmp_path / "outbox.json")).entries.values()))
+    assert entry["status"] == SENT and entry["attempts"] == 2
+    assert "message" not in entry
+
+def test_exception_in_channel_is_kept_pending(tmp_path):
+    def broken(message):
+        raise RuntimeError("boom")
+    service = _service(tmp_path, {"whatsapp": broken, "telegram": FakeChannel()})
+    service.submit("trip", "Hello")
+    assert service.drain() == {PENDING: 1, SENT: 1}
+    entry = service.outbox.entries[Outbox.key("trip", RUN_DATE, "morning", "whatsapp")]
+    assert entry["last_error"] == "boom"
+
+def test_unconfigured_channel_is_not_retried(tmp_path):
+    channel = FakeChannel()
+    service = _service(tmp_path, {"whatsapp": lambda message: None})
+    service.submit("trip", "Hello")
+    assert service.drain() == {UNCONFIGURED: 1}
+    assert _service(tmp_path, {"whatsapp": channel}).retry_pending() == 0
+
+def test_stale_pending_entries_expire(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.json"))
+    key = outbox.enqueue("trip", RUN_DATE, "morning", "whatsapp", "Hello")
+    outbox.entries[key]["created_at"] -= 13 * 3600
+    assert outbox.pending(max_age_hours=12) == []
+    assert outbox.entries[key]["status"] == EXPIRED
+
+def test_slot_in_flight_from_a_retry_is_not_sent_again(tmp_path):
+    failing = _service(tmp_path, {"whatsapp": FakeChannel(result={})})
+    failing.submit("trip", "Hello")
+    failing.drain()
+
+    channel = FakeChannel(delay=0.2)
+    service = _service(tmp_path, {"whatsapp": channel})
+    assert service.retry_pending() == 1
+    service.submit("trip", "Hello, updated")
+    assert service.drain() == {SENT: 1}
+    assert len(channel.sent) == 1
+
+def test_newer_message_is_kept_if_the_in_flight_send_fails(tmp_path):
+    outbox_path = tmp_path / "outbox.json"
+    failing = _service(tmp_path, {"whatsapp": FakeChannel(result={})})
+    failing.submit("trip", "Hello")
+    failing.drain()
+
+    channel = FakeChannel(result={}, delay=0.2)
+    service = _service(tmp_path, {"whatsapp": channel})
+    service.retry_pending()
+    service.submit("trip", "Hello, updated")
+    assert service.drain() == {PENDING: 1}
+    assert len(channel.sent) == 1
+    entry = next(iter(Outbox(str(outbox_path)).entries.values()))
+    assert entry["message"] == "Hello, updated"
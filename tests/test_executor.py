@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from src.executor import DagExecutor, Stage, StageSkipped, parse_stage_limits
+
+def test_dependencies_receive_results():
+    stages = [
+        Stage("a", lambda: 1),
+        Stage("b", lambda: 2),
+        Stage("sum", lambda a, b: a + b, deps=["a", "b"]),
+    ]
+    results = DagExecutor({"default": 2}).run(stages)
+    assert results["sum"] == 3
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=2)
+    stages = [
+        Stage("weather", lambda: barrier.wait(), pool="weather"),
+        Stage("discovery", lambda: barrier.wait(), pool="search"),
+    ]
+    # Would raise BrokenBarrierError if the stages ran one after another
+    executor = DagExecutor({"weather": 1, "search": 1})
+    executor.run(stages)
+    assert not executor.errors
+
+def test_pool_limit_is_respected():
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    stages = [Stage(f"llm{i}", work, pool="llm") for i in range(6)]
+    DagExecutor({"llm": 2}, max_workers=6).run(stages)
+    assert peak[0] == 2
+
+def test_failure_skips_dependents_only():
+    def boom():
+        raise RuntimeError("network down")
+
+    stages = [
+        Stage("t1/discovery", boom),
+        Stage("t1/draft", lambda x: x, deps=["t1/discovery"]),
+        Stage("t2/discovery", lambda: "ok"),
+    ]
+    executor = DagExecutor({"default": 2})
+    results = executor.run(stages)
+    assert isinstance(executor.errors["t1/discovery"], RuntimeError)
+    assert isinstance(executor.errors["t1/draft"], StageSkipped)
+    assert results["t2/discovery"] == "ok"
+
+def test_cycle_rejected():
+    stages = [
+        Stage("a", lambda b: b, deps=["b"]),
+        Stage("b", lambda a: a, deps=["a"]),
+    ]
+    with pytest.raises(ValueError):
+        DagExecutor().run(stages)
+
+def test_parse_stage_limits():
+    assert parse_stage_limits("weather=4, llm=1") == {"weather": 4, "llm": 1}
+    assert parse_stage_limits(None) == {}
+    with pytest.raises(ValueError):
+        parse_stage_limits("llm")
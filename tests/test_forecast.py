@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta, timezone
+from src.forecast import ForecastArchive, forecast_trends, FULL_HORIZON_FETCHES, NOWCAST_HOURS
+
+POINT = (45.3, 6.58, 3200)
+START = datetime(2026, 1, 10, 7, tzinfo=timezone.utc)
+
+def _response(fetched: datetime, snowfall=None, depth=None, temperature=None, gusts=None):
+    """A 7-day Open-Meteo response fetched at `fetched` (UTC), starting at midnight that day."""
+    day = fetched.date()
+    hours = 7 * 24
+    return {
+        "utc_offset_seconds": 0,
+        "daily": {"time": [str(day + timedelta(days=d)) for d in range(7)],
+                  "snowfall_sum": snowfall or [0] * 7, "wind_speed_10m_max": [10] * 7},
+        "daily_fetched_at": int(fetched.timestamp()),
+        "hourly": {"time": [f"{day + timedelta(days=h // 24)}T{h % 24:02d}:00" for h in range(hours)],
+                   "temperature_2m": temperature or [-5] * hours, "snowfall": [0] * hours,
+                   "snow_depth": depth or [1.0] * hours, "wind_speed_10m": [10] * hours,
+                   "wind_gusts_10m": gusts or [20] * hours},
+        "hourly_fetched_at": int(fetched.timestamp()),
+    }
+
+def test_records_each_fetch_once(tmp_path):
+    archive = ForecastArchive(str(tmp_path))
+    response = _response(START)
+    archive.record(POINT, response, now=START.timestamp())
+    tables = archive.record(POINT, response, now=START.timestamp()) # served from the weather cache
+    assert len(tables["daily"]["fetch"]) == 7
+    assert len(tables["hourly"]["fetch"]) == 7 * 24
+
+    tables = archive.record(POINT, _response(START + timedelta(hours=12)), now=START.timestamp())
+    assert len(set(tables["daily"]["fetch"])) == 2
+    assert archive.load(POINT)["hourly"]["snow_depth"].dtype.name == "float32"
+
+def test_archive_stays_bounded_over_a_season(tmp_path):
+    archive = ForecastArchive(str(tmp_path), retention_days=21)
+    for i in range(2 * 150): # twice a day for a season
+        fetched = START + timedelta(hours=12 * i)
+        tables = archive.record(POINT, _response(fetched), now=fetched.timestamp())
+    # Hourly blocks start at midnight, so a fetch's nowcast also covers the hours before it
+    assert len(tables["hourly"]["fetch"]) <= FULL_HORIZON_FETCHES * 7 * 24 + 21 * 2 * (24 + NOWCAST_HOURS)
+    assert len(tables["daily"]["fetch"]) <= (21 + 7) * 2 * 7
+    assert os.path.getsize(archive.path(POINT)) < 100_000
+
+def test_trends_from_history(tmp_path):
+    archive = ForecastArchive(str(tmp_path))
+    yesterday, today = START - timedelta(days=1), START
+    archive.record(POINT, _response(yesterday, snowfall=[0, 5, 5, 0, 0, 0, 0],
+                                    depth=[0.8 + h / 1000 for h in range(168)]), now=yesterday.timestamp())
+    # A thaw and refreeze on the first day, and three windy hours
+    temperature = [-3] * 168
+    temperature[12:15] = [1, 2, 1]
+    gusts = [20] * 168
+    gusts[30:33] = [75, 90, 70]
+    tables = archive.record(POINT, _response(today, snowfall=[5, 20, 10, 0, 0, 0, 5], depth=[1.0] * 168,
+                                             temperature=temperature, gusts=gusts), now=today.timestamp())
+
+    trends = forecast_trends(tables, now=today.timestamp())
+    # Over the six days both forecasts cover: 35 cm now vs 10 cm yesterday
+    assert trends["snowfall_forecast_change_cm"] == 25.0
+    assert trends["snowfall_forecast_change_hours"] == 24
+    # From yesterday's forecast for yesterday midnight (0.8 m) to today's for now (1.0 m)
+    assert trends["snow_depth_change_cm"] == 20.0
+    assert trends["snow_depth_change_days"] == 1.3
+    assert trends["freeze_thaw_cycles_7d"] == 1
+    assert trends["wind_hold_hours_7d"] == 3
+
+def test_no_trends_without_history(tmp_path):
+    archive = ForecastArchive(str(tmp_path))
+    tables = archive.record(POINT, _response(START), now=START.timestamp())
+    trends = forecast_trends(tables, now=START.timestamp())
+    assert "snowfall_forecast_change_cm" not in trends
+    assert trends["freeze_thaw_cycles_7d"] == 0
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import patch
+import src.integrations.search as search
+from src.integrations.health import (HealthRegistry, set_health, is_rate_limit, CLOSED, OPEN, HALF_OPEN,
+                                     OK, ERROR, RATE_LIMITED, CIRCUIT_COOLDOWN)
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def health(clock):
+    registry = HealthRegistry(clock=clock)
+    set_health(registry)
+    yield registry
+    set_health(None)
+
+TAVILY_RESULT = [{"title": "Tavily", "href": "http://t", "body": "T"}]
+
+def test_rate_limits_open_the_circuit_and_route_to_the_fallback(health, clock, monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "dummy")
+    with patch("src.integrations.search.DDGS") as mock_ddgs, \
+         patch("src.integrations.search._tavily_search", return_value=TAVILY_RESULT):
+        mock_ddgs.return_value.text.side_effect = Exception("https://duckduckgo.com 202 Ratelimit")
+        for i in range(2):
+            assert search.search_web(f"query {i}") == TAVILY_RESULT
+        assert health.provider("ddg").state == OPEN
+        assert mock_ddgs.return_value.text.call_count == 2
+
+        # Straight to Tavily while the circuit is open
+        search.search_web("query 3")
+        assert mock_ddgs.return_value.text.call_count == 2
+
+        # After the cool-down one probe goes out; success closes the circuit
+        clock.now += CIRCUIT_COOLDOWN
+        mock_ddgs.return_value.text.side_effect = None
+        mock_ddgs.return_value.text.return_value = [{"title": "T", "href": "http://a", "body": "B"}]
+        assert search.search_web("query 4")[0]["href"] == "http://a"
+        assert health.provider("ddg").state == CLOSED
+
+def test_failed_probe_reopens_for_longer(health, clock):
+    for _ in range(4):
+        health.record("ddg", ERROR)
+    assert health.provider("ddg").state == OPEN
+    assert not health.allow("ddg")
+
+    clock.now += CIRCUIT_COOLDOWN
+    assert health.allow("ddg")
+    assert health.provider("ddg").state == HALF_OPEN
+    assert not health.allow("ddg") # one probe at a time
+    health.record("ddg", ERROR)
+    assert health.provider("ddg").state == OPEN
+    assert health.provider("ddg").cooldown == 2 * CIRCUIT_COOLDOWN
+
+def test_every_provider_open_still_tries_them(health, monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    health.record("ddg", RATE_LIMITED)
+    health.record("ddg", RATE_LIMITED)
+    health.record("tavily", RATE_LIMITED)
+    health.record("tavily", RATE_LIMITED)
+    with patch("src.integrations.search.DDGS") as mock_ddgs:
+        mock_ddgs.return_value.text.return_value = [{"title": "T", "href": "http://a", "body": "B"}]
+        assert search.search_web("anything")
+    assert mock_ddgs.return_value.text.call_count == 1
+
+def test_health_round_trips_through_a_dict(health, clock):
+    health.record("ddg", OK, 0.4)
+    health.record("ddg", RATE_LIMITED)
+    health.record("ddg", RATE_LIMITED)
+    restored = HealthRegistry.from_dict(health.to_dict(), clock=clock)
+    ddg = restored.provider("ddg")
+    assert (ddg.state, ddg.calls, ddg.rate_limited) == (OPEN, 3, 2)
+    assert ddg.latency.percentile(50) == 0.4
+    assert "ddg: open" in restored.summary_lines()[0] and "rate limits in a row" in restored.summary_lines()[0]
+
+def test_rate_limit_detection():
+    assert is_rate_limit(Exception("https://duckduckgo.com/ 202 Ratelimit"))
+    assert is_rate_limit(Exception("HTTP Error 429: Too Many Requests"))
+    assert not is_rate_limit(Exception("Read timed out (2026-02-14)"))
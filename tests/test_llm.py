@@ -0,0 +1,147 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import src.cache
+import src.integrations.llm as llm
+
+@pytest.fixture(autouse=True)
+def fast_scheduler():
+    # Don't pace test calls at the real free-tier RPM
+    llm.set_scheduler(llm.RequestScheduler(60000, 10**9, burst=100))
+    yield
+    llm.set_scheduler(None)
+
+@pytest.fixture
+def llm_cache(tmp_path):
+    src.cache.set_cache_enabled(True)
+    original = llm._cache
+    llm._cache = src.cache.DiskCache("llm", cache_dir=str(tmp_path))
+    yield llm._cache
+    llm._cache = original
+
+@pytest.fixture
+def model():
+    response = MagicMock()
+    response.text = "ENOUGH"
+    response.is_error = False
+    response.usage_metadata.prompt_token_count = 120
+    response.usage_metadata.candidates_token_count = 3
+    response.usage_metadata.total_token_count = 123
+    mock_model = MagicMock()
+    mock_model.generate_content.return_value = response
+    client = llm.LLMClient(api_key="test-key")
+    client._configured = True
+    client._models[client.model_name] = mock_model
+    llm.set_client(client)
+    yield mock_model
+    llm.set_client(None)
+
+def test_opted_in_function_is_cached_with_usage(llm_cache, model):
+    assert llm._generate("evaluate_discovery", "prompt") == "ENOUGH"
+    assert llm._generate("evaluate_discovery", "prompt") == "ENOUGH"
+    assert model.generate_content.call_count == 1
+    entry = llm_cache.get(llm._cache_key(llm.MODEL_NAME, "prompt"))
+    assert entry["usage"]["total_token_count"] == 123
+
+def test_drafting_bypasses_cache_by_default(llm_cache, model):
+    llm._generate("generate_draft", "prompt")
+    llm._generate("generate_draft", "prompt")
+    assert model.generate_content.call_count == 2
+
+def test_key_covers_model_and_config():
+    base = llm._cache_key("m1", "prompt")
+    assert base != llm._cache_key("m2", "prompt")
+    assert base != llm._cache_key("m1", "prompt", {"temperature": 0.2})
+
+def test_errors_raise_typed_failure_and_are_not_cached(llm_cache, model):
+    model.generate_content.side_effect = RuntimeError("boom")
+    with pytest.raises(llm.LLMRequestError):
+        llm._generate("review_draft", "prompt")
+    assert llm_cache.stats()["size"] == 0
+
+def test_rate_limit_pauses_and_retries(model):
+    from google.api_core import exceptions
+    ok = model.generate_content.return_value
+    model.generate_content.side_effect = [exceptions.ResourceExhausted("Please retry in 0.01s."), ok]
+    with patch("src.integrations.llm.backoff_delay", return_value=0.01):
+        assert llm._generate("generate_draft", "prompt") == "ENOUGH"
+    assert model.generate_content.call_count == 2
+
+def test_transient_error_backs_off_through_the_scheduler(model):
+    from google.api_core import exceptions
+    ok = model.generate_content.return_value
+    model.generate_content.side_effect = [exceptions.ServiceUnavailable("overloaded"), ok]
+    with patch("src.integrations.llm.backoff_delay", return_value=0.05), \
+         patch.object(llm.get_scheduler(), "pause", wraps=llm.get_scheduler().pause) as pause, \
+         patch("time.sleep") as sleep:
+        assert llm._generate("generate_draft", "prompt") == "ENOUGH"
+    pause.assert_called_once_with(0.05)
+    sleep.assert_not_called()
+    assert model.generate_content.call_count == 2
+
+def test_long_rate_limit_gives_up(model):
+    from google.api_core import exceptions
+    model.generate_content.side_effect = exceptions.ResourceExhausted("Please retry in 500s.")
+    with pytest.raises(llm.LLMRateLimitError) as info:
+        llm._generate("generate_draft", "prompt")
+    assert info.value.retry_after >= 500
+    assert model.generate_content.call_count == 1
+
+def test_evaluate_discovery_degrades_on_failure(model):
+    model.generate_content.side_effect = RuntimeError("boom")
+    assert llm.evaluate_discovery("Val Thorens", []) == []
+
+def test_client_configures_sdk_once():
+    with patch("src.integrations.llm.genai") as mock_genai:
+        client = llm.LLMClient(api_key="test-key", generation_config={"temperature": 0.7})
+        client.generate_content("a")
+        client.generate_content("b", generation_config={"max_output_tokens": 10})
+    assert mock_genai.configure.call_count == 1
+    assert mock_genai.GenerativeModel.call_count == 1
+    model = mock_genai.GenerativeModel.return_value
+    assert model.generate_content.call_args.kwargs["generation_config"] == {
+        "temperature": 0.7, "max_output_tokens": 10}
+
+def test_explicit_client_is_used(llm_cache):
+    client = MagicMock()
+    client.model_name = "fake"
+    client.merged_config.return_value = None
+    client.generate_content.return_value.text = "APPROVED\nHello"
+    client.generate_content.return_value.usage_metadata = None
+    approved, message = llm.review_draft("Hello", "Val Thorens", "active", client=client)
+    assert approved and message == "Hello"
+    client.generate_content.assert_called_once()
+
+def _stream(*texts):
+    chunks = []
+    for text in texts:
+        chunk = MagicMock()
+        chunk.text = text
+        chunk.usage_metadata = None
+        chunks.append(chunk)
+    response = MagicMock()
+    response.usage_metadata = None
+    response.__iter__.return_value = iter(chunks)
+    return response
+
+def test_streamed_draft_aborts_early_and_retries_with_hint(model):
+    bad = _stream("An EPIC", " day at the ", "resort, " * 50)
+    good = _stream("Summit 180cm, ", "-8°C at Val Thorens.")
+    model.generate_content.side_effect = [bad, good]
+    stats = llm.StreamStats()
+
+    draft = llm.generate_draft("Val Thorens", "active", {}, [], stream=True, stream_stats=stats)
+    assert draft == "Summit 180cm, -8°C at Val Thorens."
+    assert model.generate_content.call_args_list[0].kwargs["stream"] is True
+    assert "Do not use the banned word 'EPIC'." in model.generate_content.call_args_list[1].args[0]
+    assert stats.aborted == 1 and stats.completed == 1
+    assert stats.tokens_saved > 0
+
+def test_stream_retries_are_bounded(model):
+    responses = [_stream("Hello [Resort", "] friends") for _ in range(llm.DRAFT_STREAM_RETRIES)]
+    final = _stream()
+    final.text = "Hello [Resort] friends" # left for the lint/review loop
+    model.generate_content.side_effect = responses + [final]
+
+    assert llm.generate_draft("Val Thorens", "active", {}, [], stream=True) == "Hello [Resort] friends"
+    assert model.generate_content.call_count == llm.DRAFT_STREAM_RETRIES + 1
+    assert "stream" not in model.generate_content.call_args.kwargs
@@ -0,0 +1,90 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+from src.models import Trip
+from src.logic import Phase
+from src.discovery import DiscoveryEngine, Insight
+from src.executor import DagExecutor
+from src.pipeline import RunContext, TripRun, build_run_stages, draft_message
+from src.state import ResortState, mark_url_seen
+
+GOOD = "Summit 180cm, -8°C at Val Thorens. Dinner at Le Bouquetin."
+BAD = "An EPIC day at [Resort]!"
+
+def _run(phase=Phase.HYPE_DAILY):
+    trip = Trip(resort_name="Val Thorens", flight_out_date=date(2026, 2, 14),
+                ski_start_date=date(2026, 2, 15), ski_end_date=date(2026, 2, 21),
+                flight_back_date=date(2026, 2, 22), lat=45.3, lon=6.58, road_check="check")
+    return TripRun(key="0:val_thorens", trip=trip, phase=phase, resort_state=ResortState("val_thorens"))
+
+def _ctx():
+    return RunContext(engine=DiscoveryEngine(), llm=None)
+
+def test_passing_draft_skips_llm_review():
+    with patch("src.pipeline.generate_draft", return_value=GOOD) as mock_draft, \
+         patch("src.pipeline.review_draft") as mock_review:
+        assert draft_message(_ctx(), _run(), {}, []) == GOOD
+    assert mock_draft.call_count == 1
+    mock_review.assert_not_called()
+
+def test_failing_draft_regenerated_with_violations():
+    with patch("src.pipeline.generate_draft", side_effect=[BAD, GOOD]) as mock_draft, \
+         patch("src.pipeline.review_draft") as mock_review:
+        assert draft_message(_ctx(), _run(), {}, []) == GOOD
+    feedback = mock_draft.call_args.kwargs["feedback"]
+    assert any("EPIC" in v for v in feedback)
+    assert any("[Resort]" in v for v in feedback)
+    mock_review.assert_not_called()
+
+def test_persistent_failure_falls_back_to_llm_review():
+    with patch("src.pipeline.generate_draft", return_value=BAD), \
+         patch("src.pipeline.review_draft", return_value=(True, GOOD)) as mock_review:
+        assert draft_message(_ctx(), _run(), {}, []) == GOOD
+    mock_review.assert_called_once()
+
+def test_redraft_after_review_is_linted():
+    with patch("src.pipeline.generate_draft", side_effect=[BAD, BAD, BAD, GOOD]) as mock_draft, \
+         patch("src.pipeline.review_draft", return_value=(False, "Use real numbers")):
+        assert draft_message(_ctx(), _run(), {}, []) == GOOD
+    assert "Use real numbers" in mock_draft.call_args.kwargs["feedback"]
+
+def test_failing_redraft_falls_back_to_least_violating_draft():
+    placeholder_only = "Summit 180cm at [Resort]."
+    with patch("src.pipeline.generate_draft", side_effect=[BAD, placeholder_only, BAD, BAD]), \
+         patch("src.pipeline.review_draft", return_value=(False, "Use real numbers")):
+        assert draft_message(_ctx(), _run(), {}, []) == placeholder_only
+
+def test_trips_at_the_same_resort_share_search_and_evaluation():
+    engine = MagicMock()
+    engine.search_insights.return_value = [Insight("a", "first", "text", "https://a.com"),
+                                           Insight("b", "second", "text", "https://b.com")]
+    engine.refined_search.return_value = [Insight("c", "third", "text", "https://c.com")]
+    ctx = RunContext(engine=engine, llm=None, dry_run=True, speculate=False)
+    runs = []
+    for index, group in enumerate(["Alpha", "Beta"]):
+        run = _run()
+        run.key = f"{index}:val_thorens"
+        run.trip = run.trip.model_copy(update={"group": group})
+        run.resort_state = ResortState(f"val_thorens@{group.lower()}")
+        runs.append(run)
+    mark_url_seen(runs[1].resort_state, "https://a.com")
+
+    with patch("src.pipeline.get_weather_batch", return_value={}), \
+         patch("src.pipeline.evaluate_discovery", return_value=["webcam"]) as mock_evaluate, \
+         patch("src.pipeline.generate_draft", return_value=GOOD) as mock_draft:
+        executor = DagExecutor()
+        results = executor.run(build_run_stages(ctx, runs))
+    assert not executor.errors
+    engine.search_insights.assert_called_once()
+    mock_evaluate.assert_called_once()
+    engine.refined_search.assert_called_once_with(["webcam"])
+    assert mock_draft.call_count == 2 # drafts stay per trip
+    assert [i.url for i in results["0:val_thorens/refine"]] == ["https://a.com", "https://b.com", "https://c.com"]
+    assert [i.url for i in results["1:val_thorens/refine"]] == ["https://b.com", "https://c.com"]
+    assert runs[0].trip_id != runs[1].trip_id
+
+def test_speculative_drafts_do_not_use_the_critical_llm_pool():
+    ctx = RunContext(engine=DiscoveryEngine(), llm=None, dry_run=True, speculate=True)
+    stages = {stage.key: stage for stage in build_run_stages(ctx, [_run()])}
+    assert stages["0:val_thorens/draft_speculative"].pool == "llm_speculative"
+    assert stages["0:val_thorens/draft"].pool == "llm"
+    assert stages["shared/val_thorens:hype_daily/evaluate"].pool == "llm"
@@ -0,0 +1,59 @@
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+from src.logic import determine_phase, Phase
+from src.planner import build_plan, load_plan, run_modes, scheduled_runs
+from src.registry import TripRegistry
+from tests.test_logic import create_trip
+
+TRIPS = [create_trip(), create_trip("2026-12-12", "2026-12-13", "2026-12-18", "2026-12-19")]
+REGISTRY = TripRegistry([t.model_dump(mode="json") for t in TRIPS])
+
+def _write_trips(tmp_path, trips=TRIPS):
+    path = tmp_path / "trips.json"
+    path.write_text(json.dumps([t.model_dump(mode="json") for t in trips]))
+    return str(path)
+
+def test_plan_matches_determine_phase_every_day():
+    plan = build_plan(REGISTRY)
+    day = date(2025, 10, 1)
+    while day <= date(2027, 1, 1):
+        for mode in ("morning", "evening"):
+            expected = [(i, determine_phase(t, day)) for i, t in enumerate(TRIPS)
+                        if mode in run_modes(determine_phase(t, day), day)]
+            assert [(r.trip_index, r.phase) for r in plan.runs_on(day, mode)] == expected
+            assert [(r.trip_index, r.phase) for r in scheduled_runs(REGISTRY, day, mode)] == expected
+        day += timedelta(days=1)
+
+def test_weekly_updates_only_on_monday_mornings():
+    plan = build_plan(REGISTRY)
+    weekly = [(day, r) for day, runs in plan.upcoming(date(2025, 11, 1))
+              for r in runs if r.phase == Phase.PLANNING_WEEKLY]
+    assert weekly
+    assert all(day.weekday() == 0 and r.modes == ("morning",) for day, r in weekly)
+
+def test_idle_days_are_absent():
+    plan = build_plan(REGISTRY)
+    assert plan.runs_on(date(2025, 6, 1)) == []
+    assert plan.runs_on(date(2026, 2, 23)) == []
+    # First Monday within 90 days of the second trip's flight out (2026-09-13)
+    assert plan.next_run(date(2026, 2, 23)) == date(2026, 9, 14)
+    assert plan.next_run(date(2026, 2, 23), "evening") == date(2026, 11, 28)
+
+def test_plan_is_cached_by_trips_file_contents(tmp_path):
+    path = _write_trips(tmp_path)
+    cache = str(tmp_path / "plan.json")
+    first = load_plan(path, cache)
+
+    with patch("src.planner.build_plan") as rebuild:
+        again = load_plan(path, cache)
+    rebuild.assert_not_called()
+    assert again.days == first.days
+
+    _write_trips(tmp_path, TRIPS[:1])
+    changed = load_plan(path, cache)
+    assert {r.trip_index for _, runs in changed.upcoming(date(2025, 1, 1)) for r in runs} == {0}
+
+def test_missing_trips_file_gives_empty_plan(tmp_path):
+    plan = load_plan(str(tmp_path / "missing.json"), str(tmp_path / "plan.json"))
+    assert plan.days == {}
@@ -0,0 +1,68 @@
+import pytest
+from src.discovery import Insight
+from src.prompting import PromptBuilder, compact_insights, newest_that_fit, parse_budgets, estimate_tokens, split_sentences
+from src.integrations.llm import _draft_prompt
+
+TEMPLATE = "Resort: {trip_name}\nINSIGHTS:\n{insights}\n{seen}"
+
+FILLER = "The atmosphere in the valley is really something everyone should experience at least once."
+
+def _insights():
+    return [
+        Insight("Snow report", f"{FILLER} Val Thorens got 45 cm of fresh snow overnight on the Cime Caron. "
+                               f"The Peclet glacier opens on Saturday.", "text", "https://example.com/snow"),
+        Insight("Apres", f"{FILLER} La Folie Douce starts at 14:30 with a DJ on the terrace. "
+                         f"Val Thorens got 45 cm of fresh snow overnight on the Cime Caron.", "text",
+                "https://example.com/apres"),
+        Insight("Lifts", f"{FILLER} {FILLER} The new Orelle gondola carries 3000 people per hour.", "text",
+                "https://example.com/lifts"),
+    ]
+
+def test_prompt_under_budget_is_unchanged():
+    prompt = PromptBuilder("test", budget=10_000).build(TEMPLATE, {"trip_name": "Val Thorens", "seen": ""}, _insights())
+    assert FILLER in prompt.text
+    assert prompt.saved == 0
+    assert prompt.tokens == prompt.full_tokens
+
+def test_compaction_fits_budget_and_keeps_facts():
+    full = PromptBuilder("test", budget=None).build(TEMPLATE, {"trip_name": "Val Thorens", "seen": ""}, _insights())
+    budget = full.tokens // 2
+    prompt = PromptBuilder("test", budget=budget).build(TEMPLATE, {"trip_name": "Val Thorens", "seen": ""}, _insights())
+
+    assert prompt.tokens <= budget
+    assert prompt.saved > 0
+    for insight in _insights():
+        assert insight.url in prompt.text
+    # Dense sentences win over filler, and a sentence repeated across insights is kept once
+    assert "45 cm" in prompt.text and "14:30" in prompt.text and "3000 people" in prompt.text
+    assert prompt.text.count("45 cm") == 1
+    assert FILLER not in prompt.text
+
+def test_insights_are_dropped_from_the_end_when_titles_do_not_fit():
+    insights = _insights()
+    lines, kept, total, dropped = compact_insights(insights, estimate_tokens(f"- Snow report:  ({insights[0].url})"))
+    assert len(lines) == 1 and lines[0].startswith("- Snow report")
+    assert dropped == 2
+
+def test_lists_keep_their_newest_items():
+    items = [f"Trivia number {i} about the resort" for i in range(10)]
+    kept = newest_that_fit(items, estimate_tokens(f"- {items[0]}\n") * 3)
+    assert kept == items[-3:]
+
+def test_draft_prompt_respects_the_budget(monkeypatch):
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGETS", "generate_draft=900")
+    insights = [Insight(f"Story {i}", " ".join(f"Sentence {j} of story {i} has {j * 10} cm of snow." for j in range(30)),
+                        "text", f"https://example.com/{i}") for i in range(8)]
+    trivia = [f"Trivia fact {i} about Val Thorens being the highest resort in Europe." for i in range(10)]
+    prompt = _draft_prompt("Val Thorens", "active", {"temp": -5}, insights, seen_trivia=trivia)
+    assert estimate_tokens(prompt) <= 900
+    assert "PREVIOUSLY SHARED TRIVIA" in prompt and trivia[-1] in prompt
+    assert all(f"https://example.com/{i}" in prompt for i in range(8))
+
+def test_split_sentences_and_parse_budgets():
+    assert split_sentences("Lifts open at 8.30 daily. Snow: 45 cm!\nWebcam live") == \
+        ["Lifts open at 8.30 daily.", "Snow: 45 cm!", "Webcam live"]
+    assert parse_budgets("generate_draft=2000, evaluate_discovery=800") == \
+        {"generate_draft": 2000, "evaluate_discovery": 800}
+    with pytest.raises(ValueError):
+        parse_budgets("generate_draft")
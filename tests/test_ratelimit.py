@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+from src.integrations.ratelimit import TokenBucket, RequestScheduler, RateLimitTimeout, backoff_delay
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock) # 1 token/s
+    bucket.take(2)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 1.5
+    assert bucket.wait_time(1) == 0
+
+def test_usage_correction_delays_next_request():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock) # 10 tokens/s, capacity 600
+    bucket.take(100)
+    bucket.adjust(600) # actual usage was far higher than reserved
+    assert bucket.wait_time(1) > 0
+
+def test_priority_order():
+    scheduler = RequestScheduler(6000, 10**9, burst=100)
+    scheduler.pause(0.2)
+    order = []
+
+    def worker(name, priority):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    threads = []
+    for name, priority in [("evaluate", 2), ("review", 1), ("draft", 0)]:
+        t = threading.Thread(target=worker, args=(name, priority))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)
+    for t in threads:
+        t.join(timeout=2)
+    assert order == ["draft", "review", "evaluate"]
+
+def test_acquire_timeout():
+    scheduler = RequestScheduler(1, 10**9, burst=1)
+    scheduler.acquire(0)
+    with pytest.raises(RateLimitTimeout):
+        scheduler.acquire(0, timeout=0.05)
+
+def test_backoff_respects_retry_after():
+    assert backoff_delay(0, retry_after=30) >= 30
+    assert backoff_delay(10, cap=5) <= 7.5
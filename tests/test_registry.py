@@ -0,0 +1,53 @@
+import random
+from datetime import date, timedelta
+import pytest
+from pydantic import ValidationError
+from src.registry import IntervalIndex, TripRegistry, PLANNING_HORIZON_DAYS
+
+def _record(name, flight_out, days=8, **extra):
+    out = date.fromisoformat(flight_out)
+    return {"resort_name": name, "flight_out_date": str(out), "ski_start_date": str(out + timedelta(days=1)),
+            "ski_end_date": str(out + timedelta(days=days - 2)), "flight_back_date": str(out + timedelta(days=days)),
+            "lat": 45.3, "lon": 6.58, "road_check": "check", **extra}
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(7)
+    starts = [rng.randrange(0, 1000) for _ in range(500)]
+    ends = [s + rng.randrange(0, 150) for s in starts]
+    ids = [i for i in range(500) if i % 7] # not every id is indexed
+    index = IntervalIndex(starts, ends, ids)
+    for point in range(-5, 1200, 3):
+        assert index.query(point) == [i for i in ids if starts[i] <= point <= ends[i]]
+
+def test_empty_intervals_are_never_returned():
+    index = IntervalIndex([10, 30, 5], [20, 25, 40], [0, 1, 2])
+    assert index.query(27) == [2]
+    assert index.query(15) == [0, 2]
+
+def test_active_on_uses_the_planning_window():
+    registry = TripRegistry([_record("Val Thorens", "2026-02-14"), _record("Livigno", "2026-12-12")])
+    first_day = date(2026, 2, 14) - timedelta(days=PLANNING_HORIZON_DAYS)
+    assert registry.active_on(first_day - timedelta(days=1)) == []
+    assert registry.active_on(first_day) == [0]
+    assert registry.active_on(date(2026, 2, 22)) == [0]
+    assert registry.active_on(date(2026, 2, 23)) == []
+    assert registry.active_on(date(2026, 12, 1)) == [1]
+
+def test_trips_are_validated_only_when_selected():
+    records = [_record("Val Thorens", "2026-02-14"), _record("Broken", "2026-03-01", lat="north"),
+               {"resort_name": "No dates"}]
+    registry = TripRegistry(records)
+    assert list(registry.invalid) == [2]
+    assert registry.indexed() == [0, 1]
+    assert registry.trip(0).resort_name == "Val Thorens"
+    assert registry.trip(0) is registry.trip(0)
+    with pytest.raises(ValidationError):
+        registry.trip(1)
+
+def test_trip_with_dates_out_of_order_is_invalid():
+    swapped = _record("Swapped", "2026-12-20")
+    swapped["flight_back_date"] = "2026-11-20"
+    registry = TripRegistry([_record("Val Thorens", "2026-12-12"), swapped])
+    assert list(registry.invalid) == [1]
+    assert "out of order" in registry.invalid[1]
+    assert registry.active_on(date(2026, 12, 14), daily_only=True) == [0]
@@ -0,0 +1,144 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+import src.cache
+import src.integrations.search as search
+from src.integrations.search import search_web, search_videos
+from src.integrations.health import HealthRegistry, set_health
+
+@pytest.fixture
+def search_cache(tmp_path):
+    src.cache.set_cache_enabled(True)
+    original = search._cache
+    search._cache = src.cache.DiskCache("search", cache_dir=str(tmp_path))
+    yield search._cache
+    search._cache = original
+
+@pytest.fixture(autouse=True)
+def fresh_health():
+    registry = HealthRegistry()
+    set_health(registry)
+    yield registry
+    set_health(None)
+
+DDG_RESULT = [{"title": "T", "href": "http://a", "body": "B"}]
+
+def test_results_cached_by_normalized_query(search_cache):
+    with patch("src.integrations.search.DDGS") as mock_ddgs:
+        mock_ddgs.return_value.text.return_value = DDG_RESULT
+        assert search_web("Val Thorens  news", max_results=2) == DDG_RESULT
+        assert search_web("val thorens news", max_results=2) == DDG_RESULT
+        assert mock_ddgs.return_value.text.call_count == 1
+        # Different max_results is a different entry
+        search_web("val thorens news", max_results=3)
+        assert mock_ddgs.return_value.text.call_count == 2
+
+def test_empty_results_negatively_cached(search_cache, monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    with patch("src.integrations.search.DDGS") as mock_ddgs:
+        mock_ddgs.return_value.text.return_value = []
+        assert search_web("nothing here") == []
+        assert search_web("nothing here") == []
+        assert mock_ddgs.return_value.text.call_count == 1
+
+def test_errors_not_cached(search_cache, monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    with patch("src.integrations.search.DDGS") as mock_ddgs:
+        mock_ddgs.return_value.text.side_effect = Exception("202 Ratelimit")
+        search_web("flaky")
+        search_web("flaky")
+        assert mock_ddgs.return_value.text.call_count == 2
+
+def test_video_fallback_uses_video_shape(search_cache, monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "dummy")
+    with patch("src.integrations.search.DDGS") as mock_ddgs, \
+         patch("src.integrations.search._tavily_search") as mock_tavily:
+        mock_ddgs.return_value.videos.side_effect = Exception("202 Ratelimit")
+        mock_tavily.return_value = [{"title": "Cam", "href": "http://cam", "body": "Live"}]
+        results = search_videos("val thorens webcam")
+    assert results == [{"title": "Cam", "content": "http://cam", "description": "Live"}]
+
+def _slow(seconds, results):
+    def provider(query, max_results, timelimit):
+        time.sleep(seconds)
+        return results
+    return provider
+
+TAVILY_RESULT = [{"title": "Tavily", "href": "http://t", "body": "T"}]
+
+def test_slow_primary_is_hedged_and_still_cached(search_cache, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_HEDGE_DELAY", 0.05)
+    providers = [("slow", _slow(0.5, DDG_RESULT)), ("fast", _slow(0.01, TAVILY_RESULT))]
+    start = time.perf_counter()
+    assert search._cached_search("text", "hedged query", 2, None, None, providers, hedge=True) == TAVILY_RESULT
+    assert time.perf_counter() - start < 0.4
+    # The loser keeps running and fills its own cache entry
+    time.sleep(0.6)
+    assert search_cache.get(search._cache_key("slow", "text", "hedged query", 2, None)) == DDG_RESULT
+
+def test_without_hedging_the_fallback_waits_for_a_failure(search_cache):
+    providers = [("slow", _slow(0.2, DDG_RESULT)), ("fast", _slow(0.01, TAVILY_RESULT))]
+    assert search._cached_search("text", "sequential", 2, None, None, providers, hedge=False) == DDG_RESULT
+    providers = [("failing", _slow(0.01, None)), ("fast", _slow(0.01, TAVILY_RESULT))]
+    assert search._cached_search("text", "sequential", 2, None, None, providers, hedge=True) == TAVILY_RESULT
+
+def test_hedge_deadline_follows_recent_latencies(fresh_health):
+    assert search.hedge_deadline("ddg") == search.SEARCH_HEDGE_DELAY
+    for n in range(1, 11):
+        fresh_health.record("ddg", "ok", n / 20)
+    assert search.hedge_deadline("ddg", percentile=90) == 0.5
+    assert search.hedge_deadline("ddg", percentile=50) == 0.3
+    fresh_health.record("ddg", "ok", 60.0)
+    assert search.hedge_deadline("ddg", percentile=99) == search.SEARCH_HEDGE_DELAY
+
+@pytest.fixture
+def search_concurrency():
+    yield search.set_concurrency
+    search.set_concurrency(None)
+
+def test_concurrent_calls_to_a_provider_are_bounded(search_cache, search_concurrency):
+    search_concurrency(2) # as for --concurrency search=2
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def provider(query, max_results, timelimit):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return DDG_RESULT
+
+    threads = [threading.Thread(target=search._cached_search,
+                                args=("text", f"bounded {i}", 2, None, None, [("bounded", provider)]))
+               for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+def test_provider_with_a_call_still_running_is_not_asked_again(search_cache, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_HEDGE_DELAY", 0.05)
+    calls = []
+
+    def slow(query, max_results, timelimit):
+        calls.append(query)
+        time.sleep(0.5)
+        return DDG_RESULT
+
+    providers = [("lagging", slow), ("quick", _slow(0.01, TAVILY_RESULT))]
+    assert search._cached_search("text", "first", 2, None, None, providers, hedge=True) == TAVILY_RESULT
+    # The first lagging call lost and is still running: straight to the fallback
+    assert search._cached_search("text", "second", 2, None, None, providers, hedge=True) == TAVILY_RESULT
+    assert calls == ["first"]
+
+def test_tavily_errors_are_logged_once(search_cache, monkeypatch, capsys):
+    monkeypatch.setenv("TAVILY_API_KEY", "dummy")
+    with patch("src.integrations.search.DDGS") as mock_ddgs, \
+         patch("tavily.TavilyClient") as mock_tavily:
+        mock_ddgs.return_value.text.side_effect = Exception("DDG down")
+        mock_tavily.return_value.search.side_effect = Exception("Tavily down")
+        assert search_web("nothing works") == []
+    assert capsys.readouterr().out.count("Tavily down") == 1
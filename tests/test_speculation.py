@@ -0,0 +1,63 @@
+import threading
+from src.discovery import Insight
+from src.speculation import Speculation, SpeculationStats, is_material
+
+def _insight(url):
+    return Insight(title="t", content="c", type="text", url=url)
+
+def test_is_material():
+    first = [_insight("a"), _insight("b")]
+    assert not is_material(first, first)
+    assert not is_material(first, first[:1])
+    assert is_material(first, first + [_insight("c")])
+
+def test_kept_when_not_material():
+    stats = SpeculationStats()
+    spec = Speculation(stats)
+    assert spec.run(lambda: "speculative") == "speculative"
+    assert spec.resolve(False, lambda: "redraft") == "speculative"
+    assert stats.counts["kept"] == 1
+    assert stats.keep_rate == 1.0
+
+def test_discarded_when_material():
+    stats = SpeculationStats()
+    spec = Speculation(stats)
+    spec.run(lambda: "speculative")
+    assert spec.resolve(True, lambda: "redraft") == "redraft"
+    assert stats.counts["discarded"] == 1
+
+def test_queued_speculation_is_claimed_not_awaited():
+    stats = SpeculationStats()
+    spec = Speculation(stats)
+    # The final stage resolves before the speculative stage ever started
+    assert spec.resolve(False, lambda: "inline") == "inline"
+    assert spec.run(lambda: "late") is None
+    assert stats.counts["not_started"] == 1
+
+def test_waits_for_running_speculation():
+    spec = Speculation()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2)
+        return "speculative"
+
+    t = threading.Thread(target=spec.run, args=(slow,))
+    t.start()
+    started.wait(2)
+    threading.Timer(0.05, release.set).start()
+    assert spec.resolve(False, lambda: "redraft") == "speculative"
+    t.join(2)
+
+def test_failed_speculation_falls_back_to_redraft():
+    stats = SpeculationStats()
+    spec = Speculation(stats)
+
+    def boom():
+        raise RuntimeError("quota")
+
+    spec.run(boom)
+    assert spec.resolve(False, lambda: "redraft") == "redraft"
+    assert stats.counts["discarded"] == 1
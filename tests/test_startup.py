@@ -0,0 +1,19 @@
+import json
+from datetime import date, timedelta
+from benchmarks.bench_import import STARTUP_BUDGET_MS, loaded_heavy_modules, median_import_ms
+
+def test_importing_main_loads_no_sdk():
+    assert loaded_heavy_modules("import src.main") == []
+
+def test_import_time_within_budget():
+    assert median_import_ms("src.main", runs=3) < STARTUP_BUDGET_MS
+
+def test_run_without_active_trips_loads_no_sdk(tmp_path):
+    far = date.today() + timedelta(days=400)
+    trips = [{"resort_name": "Val Thorens", "flight_out_date": str(far), "ski_start_date": str(far),
+              "ski_end_date": str(far + timedelta(days=6)), "flight_back_date": str(far + timedelta(days=7)),
+              "lat": 45.3, "lon": 6.58, "road_check": "check"}]
+    (tmp_path / "trips.json").write_text(json.dumps(trips))
+    code = (f"import os, sys\nfrom src.main import main\nos.chdir({str(tmp_path)!r})\n"
+            "sys.argv = ['main', '--mode', 'morning', '--dry-run', '--no-state']\nmain()")
+    assert loaded_heavy_modules(code) == []
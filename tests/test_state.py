@@ -1,46 +1,138 @@
-import os
 import json
 import pytest
-from src.state import load_state, save_state, get_resort_state, is_url_seen, mark_url_seen
-
-@pytest.fixture
-def temp_state_file(tmp_path):
-    # Change dynamic path for testing
-    import src.state
-    original_file = src.state.STATE_FILE
-    new_file = str(tmp_path / "test_state.json")
-    src.state.STATE_FILE = new_file
-    yield new_file
-    src.state.STATE_FILE = original_file
-
-def test_load_save_state(temp_state_file):
-    state = load_state()
-    assert state == {}
-    
-    state["test"] = {"seen_urls": ["url1"]}
-    save_state(state)
-    
-    loaded = load_state()
-    assert loaded["test"]["seen_urls"] == ["url1"]
-
-def test_resort_state_initialization():
-    state = {}
-    resort_state = get_resort_state(state, "Val Thorens")
-    assert "val_thorens" in state
-    assert resort_state["seen_urls"] == []
+from src.state import (ResortState, JsonShardStore, SqliteStore, SEEN_URLS, load_state, migrate_legacy_state,
+                       get_resort_state, is_url_seen, mark_url_seen, mark_trivia_seen, get_seen_trivia,
+                       update_last_run)
+
+@pytest.fixture(params=["json", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+    def make():
+        if request.param == "json":
+            store = JsonShardStore(str(tmp_path / "state"))
+        else:
+            store = SqliteStore(str(tmp_path / "state.db"))
+        stores.append(store)
+        return store
+    yield make
+    for store in stores:
+        store.close()
+
+def test_load_legacy_state(tmp_path):
+    path = tmp_path / "state.json"
+    assert load_state(str(path)) == {}
+    path.write_text(json.dumps({"test": {"seen_urls": ["url1"]}}))
+    assert load_state(str(path))["test"]["seen_urls"] == ["url1"]
+
+def test_resort_state_initialization(make_store):
+    store = make_store()
+    resort_state = get_resort_state(store, "Val Thorens")
+    assert resort_state.key == "val_thorens"
+    assert resort_state.items(SEEN_URLS) == []
 
 def test_mark_url_seen():
-    resort_state = {"seen_urls": []}
+    resort_state = ResortState("val_thorens")
     mark_url_seen(resort_state, "url1")
     assert is_url_seen(resort_state, "url1")
-    
+
     # Check deduplication
     mark_url_seen(resort_state, "url1")
-    assert len(resort_state["seen_urls"]) == 1
-
-def test_trimming():
-    resort_state = {"seen_urls": [f"url{i}" for i in range(50)]}
-    mark_url_seen(resort_state, "new_url")
-    assert len(resort_state["seen_urls"]) == 50
-    assert "url0" not in resort_state["seen_urls"]
-    assert "new_url" in resort_state["seen_urls"]
+    assert resort_state.items(SEEN_URLS) == ["url1"]
+
+def test_oldest_items_are_evicted():
+    resort_state = ResortState("val_thorens", {SEEN_URLS: [f"url{i}" for i in range(3)]})
+    resort_state.add(SEEN_URLS, "new_url", limit=3)
+    assert resort_state.items(SEEN_URLS) == ["url1", "url2", "new_url"]
+    assert resort_state.removed[SEEN_URLS] == ["url0"]
+
+def test_prompt_history_is_recent_slice():
+    resort_state = ResortState("val_thorens")
+    for i in range(60):
+        mark_trivia_seen(resort_state, f"fact {i}")
+    assert get_seen_trivia(resort_state) == [f"fact {i}" for i in range(10, 60)]
+
+def test_round_trip(make_store):
+    store = make_store()
+    resort_state = get_resort_state(store, "Val Thorens")
+    for i in range(100):
+        mark_url_seen(resort_state, f"url{i}")
+    update_last_run(resort_state)
+    store.save()
+    assert not resort_state.dirty
+    mark_url_seen(resort_state, "url100")
+    store.save()
+    store.close()
+
+    reopened = make_store()
+    loaded = get_resort_state(reopened, "Val Thorens")
+    assert loaded.items(SEEN_URLS) == [f"url{i}" for i in range(101)]
+    assert loaded.last_run == resort_state.last_run
+    assert reopened.resort_keys() == ["val_thorens"]
+
+def test_evictions_between_saves_reload_in_order(make_store):
+    store = make_store()
+    resort_state = store.resort("val_thorens")
+    for item in "ab":
+        resort_state.add(SEEN_URLS, item, limit=2)
+    store.save()
+    resort_state.add(SEEN_URLS, "c", limit=2) # evicts a
+    resort_state.add(SEEN_URLS, "a", limit=2) # evicts b
+    store.save()
+    # x is added and evicted again before the next save
+    for item in "xzw":
+        resort_state.add(SEEN_URLS, item, limit=2)
+    assert resort_state.items(SEEN_URLS) == ["z", "w"]
+    store.save()
+    store.close()
+
+    reopened = make_store()
+    assert reopened.resort("val_thorens").items(SEEN_URLS) == ["z", "w"]
+
+def test_item_evicted_and_added_again_survives_a_save(make_store):
+    store = make_store()
+    resort_state = store.resort("val_thorens")
+    for item in "abca": # c evicts a, then a evicts b
+        resort_state.add(SEEN_URLS, item, limit=2)
+    assert resort_state.items(SEEN_URLS) == ["c", "a"]
+    store.save()
+    store.close()
+    assert make_store().resort("val_thorens").items(SEEN_URLS) == ["c", "a"]
+
+def test_json_store_only_rewrites_dirty_shards(tmp_path):
+    store = JsonShardStore(str(tmp_path / "state"))
+    mark_url_seen(store.resort("a"), "url1")
+    mark_url_seen(store.resort("b"), "url1")
+    store.save()
+    shard_b = tmp_path / "state" / "b.json"
+    shard_b.write_text(json.dumps({"seen_urls": ["sentinel"]}))
+
+    mark_url_seen(store.resort("a"), "url2")
+    store.save()
+    assert json.loads(shard_b.read_text())["seen_urls"] == ["sentinel"]
+    assert json.loads((tmp_path / "state" / "a.json").read_text())["seen_urls"] == ["url1", "url2"]
+
+def test_migrate_legacy_state(make_store, tmp_path):
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text(json.dumps({
+        "livigno": {"seen_urls": ["u1", "u2"], "seen_trivia": ["t1"], "last_run": "2026-01-27T17:56:22"},
+        "les_arcs": {"seen_urls": ["u3"]},
+    }))
+    store = make_store()
+    assert migrate_legacy_state(store, str(legacy)) == 2
+    assert migrate_legacy_state(store, str(legacy)) == 0 # Store already has data
+
+    livigno = store.resort("livigno")
+    assert livigno.items(SEEN_URLS) == ["u1", "u2"]
+    assert get_seen_trivia(livigno) == ["t1"]
+    assert livigno.last_run == "2026-01-27T17:56:22"
+    assert store.resort_keys() == ["les_arcs", "livigno"]
+
+def test_documents_persist_apart_from_resorts(make_store):
+    store = make_store()
+    get_resort_state(store, "Val Thorens")
+    store.set_document("provider_health", {"ddg": {"state": "open"}})
+    assert store.document("provider_health") == {} # written on save
+    store.save()
+    reopened = make_store()
+    assert reopened.document("provider_health") == {"ddg": {"state": "open"}}
+    assert "provider_health" not in reopened.resort_keys()
@@ -0,0 +1,88 @@
+import json
+import pytest
+from unittest.mock import patch
+from src.executor import DagExecutor, Stage
+from src.tracing import Tracer, STATUS_ERROR, STATUS_OK, get_tracer, set_tracer, span, current_span
+from src.pipeline import RunContext, build_trip_stages
+from src.discovery import DiscoveryEngine
+from tests.test_pipeline import GOOD, _run
+
+@pytest.fixture
+def tracer():
+    previous = get_tracer()
+    tracer = Tracer()
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(previous)
+
+def _by_name(tracer):
+    return {s.name: s for s in tracer.spans}
+
+def test_spans_nest_and_record_errors(tracer):
+    with span("run") as root:
+        with span("child", kind="search") as child:
+            child.add_event("retry", attempt=1)
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+        assert current_span() is root
+    assert current_span() is None
+
+    spans = _by_name(tracer)
+    assert spans["child"].parent_id == root.span_id
+    assert spans["child"].status == STATUS_OK
+    assert spans["failing"].status == STATUS_ERROR
+    assert "boom" in spans["failing"].status_message
+    assert spans["run"].parent_id is None
+
+def test_executor_stages_inherit_the_submitting_span(tracer):
+    def work():
+        with span("inner"):
+            return 1
+
+    with span("run") as root:
+        DagExecutor({"default": 2}).run([Stage("a", work), Stage("b", work)])
+    inner = [s for s in tracer.spans if s.name == "inner"]
+    assert len(inner) == 2
+    assert all(s.parent_id == root.span_id for s in inner)
+
+def test_otlp_export_shape(tracer, tmp_path):
+    with span("run", mode="morning", trips=2, dry_run=True):
+        pass
+    path = tracer.export(str(tmp_path / "trace.json"))
+    with open(path) as f:
+        data = json.load(f)
+    exported = data["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert exported["name"] == "run"
+    assert len(exported["traceId"]) == 32 and len(exported["spanId"]) == 16
+    assert "parentSpanId" not in exported
+    attributes = {a["key"]: a["value"] for a in exported["attributes"]}
+    assert attributes["mode"] == {"stringValue": "morning"}
+    assert attributes["trips"] == {"intValue": "2"}
+    assert attributes["dry_run"] == {"boolValue": True}
+
+def test_summary_aggregates_by_name(tracer):
+    for _ in range(3):
+        with span("http.request"):
+            pass
+    summary = tracer.summary()
+    assert summary["http.request"]["count"] == 3
+    assert summary["http.request"]["errors"] == 0
+    assert tracer.summary_lines()[1].startswith("http.request")
+
+def test_trip_stages_are_traced_under_the_trip_span(tracer):
+    run = _run()
+    ctx = RunContext(engine=DiscoveryEngine(), llm=None, dry_run=True, speculate=False)
+    stages = [Stage("run/weather", lambda: {})] + build_trip_stages(ctx, run)
+    with patch.object(ctx.engine, "search_insights", return_value=[]), \
+         patch("src.pipeline.evaluate_discovery", return_value=[]), \
+         patch("src.pipeline.generate_draft", return_value=GOOD):
+        DagExecutor({"default": 2}).run(stages)
+    run.span.end()
+
+    spans = _by_name(tracer)
+    for name in ("weather", "discovery", "refine", "draft", "deliver"):
+        assert spans[f"stage.{name}"].parent_id == run.span.span_id
+    assert spans["stage.search"].attributes["shared"] == run.share_key
+    assert spans["draft.attempt"].parent_id == spans["stage.draft"].span_id
+    assert spans["trip"].attributes["phase"] == run.phase.value
@@ -0,0 +1,105 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from src.integrations.transport import HttpTransport, LatencyHistogram, ResponseTooLarge, parse_overrides
+
+class FakeServer:
+    """Local stand-in for an external API; `responses` is a queue of (status, body)."""
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.requests.append((self.command, self.path, body))
+                status, payload = server.responses.pop(0) if server.responses else (200, {"ok": True})
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    s = FakeServer()
+    yield s
+    s.close()
+
+@pytest.fixture
+def transport(server):
+    t = HttpTransport(backoff=0.001, max_retries=2, max_response_bytes=1024,
+                      host_overrides={"api.example.com": server.url})
+    yield t
+    t.close()
+
+def test_host_override_routes_to_fake_server(server, transport):
+    response = transport.get("https://api.example.com/v1/forecast", params={"a": 1})
+    assert response.json() == {"ok": True}
+    assert server.requests[0][1] == "/v1/forecast?a=1"
+    assert transport.stats()[server.url.split("//")[1]]["count"] == 1
+
+def test_get_retried_on_5xx(server, transport):
+    server.responses = [(503, {}), (200, {"ok": "second"})]
+    assert transport.get("https://api.example.com/x").json() == {"ok": "second"}
+    assert len(server.requests) == 2
+
+def test_post_not_retried_on_5xx(server, transport):
+    server.responses = [(503, {}), (200, {})]
+    assert transport.post("https://api.example.com/x", json={}).status_code == 503
+    assert len(server.requests) == 1
+
+def test_post_retried_on_429(server, transport):
+    server.responses = [(429, {}), (200, {"sent": True})]
+    assert transport.post("https://api.example.com/x", json={}).json() == {"sent": True}
+
+def test_response_size_limit(server, transport):
+    server.responses = [(200, b"x" * 4096)]
+    with pytest.raises(ResponseTooLarge):
+        transport.get("https://api.example.com/big")
+    assert isinstance(ResponseTooLarge(), requests.RequestException)
+
+def test_response_size_limit_counts_as_error(server, transport):
+    server.responses = [(200, b"x" * 4096)]
+    with pytest.raises(ResponseTooLarge):
+        transport.get("https://api.example.com/big")
+    stats = transport.stats()[server.url.split("//")[1]]
+    assert stats["count"] == 1 and stats["errors"] == 1
+
+def test_histogram_shared_across_threads():
+    histogram = LatencyHistogram()
+    def worker():
+        for i in range(1000):
+            histogram.observe(0.01, error=i % 2 == 0)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert histogram.to_dict()["count"] == 8000
+    assert histogram.to_dict()["errors"] == 4000
+
+def test_parse_overrides():
+    assert parse_overrides("a.com=http://localhost:1/, b.com=http://localhost:2") == {
+        "a.com": "http://localhost:1", "b.com": "http://localhost:2"}
@@ -0,0 +1,56 @@
+from src.validation import lint_draft, MAX_MESSAGE_CHARS, StreamChecker
+from src.discovery import Insight
+
+ACTIVE_MESSAGE = """*Val Thorens today* ❄️
+Summit 180cm, base 95cm, -8°C. Lunch at La Folie Douce: https://example.com/folie
+
+--- 💡 SKI NERD TRIVIA ---
+Val Thorens sits at 2,300m, the highest resort in Europe.
+"""
+
+INSIGHTS = [Insight(title="Folie Douce", content="Apres", type="text", url="https://example.com/folie")]
+
+def test_clean_active_draft_passes():
+    assert lint_draft(ACTIVE_MESSAGE, "active", INSIGHTS) == []
+
+def test_placeholder_detected():
+    violations = lint_draft("Meet at [Venue Name] at 4pm, snow depth 120cm.", "hype_daily")
+    assert any("[Venue Name]" in v for v in violations)
+
+def test_banned_words_case_insensitive():
+    violations = lint_draft("An epic day. Woooooooow! Legends only.", "hype_daily")
+    assert len(violations) == 3
+
+def test_active_requires_section_and_link():
+    violations = lint_draft("Summit 180cm today.", "active", INSIGHTS)
+    assert any("TRIVIA" in v for v in violations)
+    assert any("link" in v for v in violations)
+
+def test_non_active_phase_skips_active_rules():
+    assert lint_draft("Summit 180cm today.", "planning_weekly", INSIGHTS) == []
+
+def test_length_limit():
+    violations = lint_draft("Snow " * (MAX_MESSAGE_CHARS // 4), "hype_daily")
+    assert any("Shorten" in v for v in violations)
+
+def test_empty_draft():
+    assert lint_draft("   ", "active") == ["The draft is empty."]
+
+def test_repeated_trivia_is_flagged():
+    used = ["Val Thorens sits at 2,300m - the highest resort in Europe!"]
+    violations = lint_draft(ACTIVE_MESSAGE, "active", INSIGHTS, used)
+    assert any("already used" in v for v in violations)
+    assert lint_draft(ACTIVE_MESSAGE, "active", INSIGHTS, ["Livigno is a duty free zone with cheap fuel."]) == []
+
+def test_stream_checker_reports_violations_once_certain():
+    checker = StreamChecker()
+    assert checker.feed("Summit 180cm at the EP") is None
+    assert checker.feed("ICENTRE of the valley, see [the map") is None
+    assert checker.feed("](https://example.com). ") is None
+    assert checker.feed("An EPIC") is None # could still become a longer word
+    assert checker.feed(" day!") == "Do not use the banned word 'EPIC'."
+
+def test_stream_checker_catches_placeholders_split_across_chunks():
+    checker = StreamChecker()
+    assert checker.feed("Dinner at [Rest") is None
+    assert checker.feed("aurant Name] tonight") == "Remove the placeholder '[Restaurant Name]' and use real data."
@@ -0,0 +1,99 @@
+from datetime import date
+from unittest.mock import patch, MagicMock
+from src.models import Trip
+from src.logic import Phase
+from src.integrations.weather import get_weather_batch
+from src.pipeline import weather_points, build_weather_info
+
+def _response(payload):
+    response = MagicMock()
+    response.json.return_value = payload
+    return response
+
+def _location(depth, snowfall):
+    return {"current": {"snow_depth": depth, "temperature_2m": -5, "wind_speed_10m": 10},
+            "daily": {"snowfall_sum": snowfall},
+            "hourly": {"time": ["2026-02-14T00:00"], "temperature_2m": [-5], "snow_depth": [depth]}}
+
+def test_batch_groups_by_elevation_and_dedupes():
+    points = [(45.3, 6.58, 3200), (45.3, 6.58, 1800), (45.3, 6.58, 3200), (46.0, 7.0, None)]
+    with patch("src.integrations.weather.get_transport") as mock_transport:
+        mock_get = mock_transport.return_value.get
+        mock_get.side_effect = [
+            _response([_location(2.0, [1, 2]), _location(1.0, [0])]),
+            _response(_location(0.5, [3])),
+        ]
+        results = get_weather_batch(points)
+
+    assert mock_get.call_count == 2
+    first_params = mock_get.call_args_list[0].kwargs["params"]
+    assert first_params["elevation"] == "3200,1800"
+    assert "elevation" not in mock_get.call_args_list[1].kwargs["params"]
+    assert results[(45.3, 6.58, 3200)]["current"]["snow_depth"] == 2.0
+    assert results[(46.0, 7.0, None)]["daily"]["snowfall_sum"] == [3]
+
+def test_build_weather_info_matches_legacy_shape():
+    trip = Trip(resort_name="Val Thorens", flight_out_date=date(2026, 2, 14),
+                ski_start_date=date(2026, 2, 15), ski_end_date=date(2026, 2, 21),
+                flight_back_date=date(2026, 2, 22), lat=45.3, lon=6.58, road_check="check",
+                summit_elevation=3200, base_elevation=1800, airport_lat=45.2, airport_lon=5.3)
+    fetched = {
+        (45.3, 6.58, 3200): _location(2.0, [1.25, 2, None]),
+        (45.3, 6.58, 1800): _location(1.0, [0]),
+        (45.2, 5.3, None): {"current": {"temperature_2m": 3, "wind_speed_10m": 5, "snowfall": 0}},
+    }
+    info = build_weather_info(trip, Phase.ACTIVE, fetched)
+    assert info == {"summit_snow_depth": 2.0, "base_snow_depth": 1.0,
+                    "weekly_snowfall_forecast_cm": 3.2, "temp_summit": -5, "wind_summit": 10}
+
+    assert "airport" in weather_points(trip, Phase.LOGISTICS_OUT)
+    info = build_weather_info(trip, Phase.LOGISTICS_OUT, fetched)
+    assert info["airport_temp"] == 3
+
+def test_cached_blocks_skip_network(tmp_path):
+    import src.cache
+    import src.integrations.weather as weather
+    src.cache.set_cache_enabled(True)
+    original = weather._cache
+    weather._cache = src.cache.DiskCache("weather", cache_dir=str(tmp_path))
+    try:
+        point = (45.3, 6.58, 3200)
+        with patch("src.integrations.weather.get_transport") as mock_transport:
+            mock_get = mock_transport.return_value.get
+            mock_get.return_value = _response(_location(2.0, [1, 2]))
+            first = get_weather_batch([point])
+            second = get_weather_batch([point])
+        assert mock_get.call_count == 1
+        assert second[point]["current"] == first[point]["current"]
+        assert second[point]["daily"]["snowfall_sum"] == [1, 2]
+
+        # Only the stale block is requested again
+        weather._cache._entries.pop(weather._cache_key(point, "current"))
+        with patch("src.integrations.weather.get_transport") as mock_transport:
+            mock_get = mock_transport.return_value.get
+            mock_get.return_value = _response(_location(3.0, []))
+            get_weather_batch([point])
+        params = mock_get.call_args.kwargs["params"]
+        assert "current" in params and "daily" not in params
+    finally:
+        weather._cache = original
+
+def test_trends_from_the_archive_reach_weather_info(tmp_path):
+    from src.forecast import ForecastArchive, set_archive
+    from src.pipeline import TripRun, archive_forecasts
+    from datetime import datetime, timezone
+    from tests.test_forecast import _response
+    trip = Trip(resort_name="Val Thorens", flight_out_date=date(2026, 2, 14),
+                ski_start_date=date(2026, 2, 15), ski_end_date=date(2026, 2, 21),
+                flight_back_date=date(2026, 2, 22), lat=45.3, lon=6.58, road_check="check")
+    run = TripRun("trip_0", trip, Phase.ACTIVE, resort_state=None)
+    point = (45.3, 6.58, None)
+    set_archive(ForecastArchive(str(tmp_path)))
+    try:
+        fetched = {point: _response(datetime.now(timezone.utc))}
+        archive_forecasts([run], fetched)
+    finally:
+        set_archive(None)
+    info = build_weather_info(trip, Phase.ACTIVE, fetched)
+    assert "wind_hold_hours_7d" in info and "freeze_thaw_cycles_7d" in info
+    assert (tmp_path / "45.30_6.58_auto.npz").exists()